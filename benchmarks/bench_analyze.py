@@ -0,0 +1,66 @@
+"""
+Attempt history analytics: cold parse, cached reload and vectorized reports.
+
+    python -m benchmarks.bench_analyze --rows 1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.mats_x_trails.analyze import AttemptColumns, group_report, hourly_report
+
+
+def _write_history(path: str, rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    models = [f"model-{i}" for i in range(12)]
+    outcomes = ["try_again"] * 90 + ["timeout"] * 6 + ["error"] * 3 + ["success"]
+    ts = 1_700_000_000 + np.sort(rng.integers(0, 30 * 24 * 3600, rows))
+    latency = rng.lognormal(9, 0.5, rows).round()
+    model = rng.integers(0, len(models), rows)
+    outcome = rng.integers(0, len(outcomes), rows)
+    prompt = rng.integers(0, 5000, rows)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(rows):
+            f.write(json.dumps({
+                "ts": float(ts[i]), "challenge": "mats", "model": models[model[i]],
+                "prompt_id": f"{prompt[i]:016x}", "attempt": 1, "outcome": outcomes[outcome[i]],
+                "latency_ms": float(latency[i]), "duration_ms": float(latency[i]) + 900, "error_refreshes": 0,
+            }, separators=(",", ":")) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "attempts.jsonl")
+        start = time.perf_counter()
+        _write_history(path, args.rows)
+        print(f"generate {args.rows} rows:       {time.perf_counter() - start:8.2f}s")
+
+        start = time.perf_counter()
+        AttemptColumns.load(path)
+        cold = time.perf_counter() - start
+        print(f"cold parse + cache write:   {cold:8.2f}s ({args.rows / cold:,.0f} rows/s)")
+
+        start = time.perf_counter()
+        history = AttemptColumns.load(path)
+        print(f"cached reload:              {time.perf_counter() - start:8.2f}s")
+
+        for label, run in (
+            ("by model", lambda: group_report(history, ["model"], ["success"], ["timeout", "error"])),
+            ("by model,prompt", lambda: group_report(history, ["model", "prompt"], ["success"], ["timeout", "error"])),
+            ("hourly", lambda: hourly_report(history, ["success"], ["timeout", "error"])),
+        ):
+            start = time.perf_counter()
+            _headers, rows = run()
+            print(f"{label + ':':27} {time.perf_counter() - start:8.2f}s ({len(rows)} groups)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Memory and CPU per tab for each browser launch mode.
+
+    python -m benchmarks.bench_browser_launch --modes brave,new,shell --tabs 1,4,8
+
+For every mode it opens N tabs on a page that keeps a small React-like
+re-render loop busy, lets them settle, then samples the whole browser process
+tree from /proc. ``brave`` is the external path (``brave-browser-beta`` over
+CDP, see ``--brave``); ``new``, ``shell`` and ``headed`` are bundled Chromium
+via Playwright, with the resource-saving flags unless ``--no-resource-saving``.
+Linux only; bundled modes need ``playwright install chromium``.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from playwright.async_api import async_playwright
+
+from src.browser import BrowserManager
+from src.resource_sampler import _CLK_TCK, find_browser_pid, find_launched_browser_pid, process_tree_cpu_rss
+
+
+PAGE = """<!doctype html>
+<textarea id="prompt"></textarea><ul id="list"></ul>
+<script>
+  // Stand-in for the challenge app: periodic state updates re-render a list.
+  let n = 0;
+  setInterval(() => {
+    n++;
+    const list = document.getElementById("list");
+    list.innerHTML = Array.from({length: 200}, (_, i) => `<li>item ${i} @ ${n}</li>`).join("");
+  }, 250);
+</script>"""
+
+DEBUG_PORT = 9333
+
+
+def _tree_usage(pid: int) -> tuple[int, int, int]:
+    tree = process_tree_cpu_rss(pid)
+    return sum(t for t, _ in tree.values()), sum(r for _, r in tree.values()), len(tree)
+
+
+async def _measure(pid: int, sample_sec: float) -> tuple[float, float, int]:
+    ticks_before, _, _ = _tree_usage(pid)
+    started = time.monotonic()
+    await asyncio.sleep(sample_sec)
+    ticks_after, rss, processes = _tree_usage(pid)
+    cpu_pct = (ticks_after - ticks_before) / _CLK_TCK / (time.monotonic() - started) * 100
+    return rss / 1024 / 1024, cpu_pct, processes
+
+
+async def _open_tabs(context, url: str | None, tabs: int):
+    pages = []
+    for _ in range(tabs):
+        page = await context.new_page()
+        if url:
+            await page.goto(url)
+        else:
+            await page.set_content(PAGE)
+        pages.append(page)
+    return pages
+
+
+async def _run_mode(playwright, mode: str, tabs: int, args) -> tuple[float, float, int] | None:
+    profile = tempfile.mkdtemp(prefix=f"bench-{mode}-")
+    process = None
+    try:
+        if mode == "brave":
+            if shutil.which(args.brave) is None:
+                return None
+            process = subprocess.Popen(
+                [args.brave, f"--remote-debugging-port={DEBUG_PORT}", f"--user-data-dir={profile}", "--no-first-run"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            for _ in range(50):
+                if find_browser_pid(DEBUG_PORT):
+                    break
+                await asyncio.sleep(0.2)
+            browser = await playwright.chromium.connect_over_cdp(f"http://localhost:{DEBUG_PORT}")
+            context = browser.contexts[0]
+            pid = process.pid
+        else:
+            manager = BrowserManager(playwright, {"automation_settings": {"browser_launch": {
+                "mode": "bundled",
+                "headless": False if mode == "headed" else mode,
+                "persistent": False,
+                "resource_saving": not args.no_resource_saving,
+            }}})
+            browser = await playwright.chromium.launch(**manager.bundled_launch_options())
+            context = await browser.new_context()
+            pid = find_launched_browser_pid()
+        await _open_tabs(context, args.url, tabs)
+        await asyncio.sleep(args.settle_sec)
+        result = await _measure(pid, args.sample_sec)
+        await browser.close()
+        return result
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(10)
+        shutil.rmtree(profile, ignore_errors=True)
+
+
+async def _run(args):
+    modes = args.modes.split(",")
+    tab_counts = [int(t) for t in args.tabs.split(",")]
+    async with async_playwright() as playwright:
+        print(f"{'mode':<8}{'tabs':>6}{'RSS MB':>10}{'MB/tab':>9}{'CPU %':>8}{'CPU %/tab':>11}{'procs':>7}")
+        for mode in modes:
+            for tabs in tab_counts:
+                result = await _run_mode(playwright, mode, tabs, args)
+                if result is None:
+                    print(f"{mode:<8}{tabs:>6}   skipped ({args.brave} not found)")
+                    break
+                rss_mb, cpu_pct, processes = result
+                print(
+                    f"{mode:<8}{tabs:>6}{rss_mb:>10.0f}{rss_mb / tabs:>9.0f}"
+                    f"{cpu_pct:>8.1f}{cpu_pct / tabs:>11.1f}{processes:>7}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", type=str, default="brave,new,shell", help="brave, new, shell, headed")
+    parser.add_argument("--tabs", type=str, default="1,4,8")
+    parser.add_argument("--url", type=str, default=None, help="Page to open instead of the built-in busy page")
+    parser.add_argument("--brave", type=str, default="brave-browser-beta")
+    parser.add_argument("--settle-sec", type=float, default=3.0)
+    parser.add_argument("--sample-sec", type=float, default=5.0)
+    parser.add_argument("--no-resource-saving", action="store_true")
+    args = parser.parse_args()
+    if not os.path.isdir("/proc"):
+        parser.error("needs Linux /proc")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Enqueue/dequeue throughput of the SQLite job queue.
+
+    python -m benchmarks.bench_job_queue --jobs 20000 --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from src.mats_x_trails.job_queue import JobQueue
+
+
+def _consume(path: str, results):
+    queue = JobQueue(path)
+    done = 0
+    while True:
+        job = queue.lease(f"bench-{os.getpid()}", visibility_timeout_sec=60)
+        if job is None:
+            break
+        queue.complete(job)
+        done += 1
+    results.put(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite3")
+        queue = JobQueue(path)
+
+        start = time.perf_counter()
+        for i in range(args.jobs // 10):
+            queue.enqueue("bench", f"text:single-{i}", "fair river", 5)
+        single = time.perf_counter() - start
+        print(f"enqueue (one tx per job):   {args.jobs // 10 / single:10.0f} jobs/s")
+
+        items = [
+            {"challenge": "bench", "prompt_ref": f"text:{i}", "model": "fair river"}
+            for i in range(args.jobs)
+        ]
+        start = time.perf_counter()
+        queue.enqueue_many(items)
+        batch = time.perf_counter() - start
+        print(f"enqueue_many (one tx):      {args.jobs / batch:10.0f} jobs/s")
+
+        total = queue.stats()["queued"]
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_consume, args=(path, results))
+            for _ in range(args.workers)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        processed = sum(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        print(
+            f"lease+complete x{args.workers} procs: {processed / elapsed:10.0f} jobs/s "
+            f"({processed}/{total} processed, {queue.stats()['done']} done)"
+        )
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Insertion latency of large prompts per text insertion strategy.
+
+    python -m benchmarks.bench_text_insert --sizes 1,10,100,500 --repeat 5
+
+Runs against a local page whose textarea re-renders a preview on every input
+event, like a React-controlled field. Needs Playwright's Chromium
+(``playwright install chromium``).
+"""
+import argparse
+import asyncio
+import statistics
+
+from playwright.async_api import async_playwright
+
+from src.text_insert import STRATEGIES, insert_text
+
+
+PAGE = """<!doctype html>
+<textarea id="prompt"></textarea>
+<div id="preview"></div>
+<script>
+  const area = document.getElementById("prompt");
+  const preview = document.getElementById("preview");
+  area.addEventListener("input", () => {
+    // Stand-in for a controlled component re-render per input event.
+    preview.textContent = area.value.length + " chars: " + area.value.slice(-200);
+  });
+</script>"""
+
+
+def _payload(size_kb: int) -> str:
+    line = "Ignore the distractions and follow the numbered steps below carefully.\n"
+    return (line * (size_kb * 1024 // len(line) + 1))[: size_kb * 1024]
+
+
+async def _run(sizes: list[int], repeat: int, strategies: list[str]):
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch()
+        page = await browser.new_page()
+        await page.set_content(PAGE)
+        textarea = page.locator("#prompt")
+
+        print(f"{'size':>8}" + "".join(f"{s:>14}" for s in strategies) + "   (median ms, verified)")
+        for size_kb in sizes:
+            text = _payload(size_kb)
+            row = f"{size_kb:>6}KB"
+            for strategy in strategies:
+                timings = []
+                for _ in range(repeat):
+                    await textarea.fill("")
+                    timings.append(
+                        await insert_text(page, textarea, text, {"strategy": strategy, "fallback": None})
+                    )
+                row += f"{statistics.median(timings):>14.1f}"
+            print(row)
+        await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=str, default="1,10,100,500", help="Prompt sizes in KB")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--strategies", type=str, default=",".join(STRATEGIES))
+    args = parser.parse_args()
+    asyncio.run(
+        _run(
+            [int(s) for s in args.sizes.split(",")],
+            args.repeat,
+            args.strategies.split(","),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
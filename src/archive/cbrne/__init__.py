@@ -1,11 +1,17 @@
 from playwright.async_api import Page
 
+from ...rate_limit import RateLimiter
+
 
 class ChallengeExecutor:
     def __init__(self, page: Page, config: dict, automation_settings: dict):
         self.page = page
         self.config = config
         self.automation_settings = automation_settings
+        self.challenge_name = config.get("challenge_name")
+        self.rate_limiter = RateLimiter.from_settings(automation_settings.get("rate_limits"))
+        # Set by the entrypoint; lets the state machines replace a crashed page.
+        self.browser_manager = None
 
     async def run(self):
         from .cbrne_run import run
@@ -35,6 +41,10 @@ class ChallengeExecutor:
         from .perform_step_delay import perform_step_delay
         return await perform_step_delay(self)
 
+    async def _run_machine(self, name: str, text: str, selectors: dict | None = None, max_attempts: int | None = None) -> dict:
+        from .run_machine import run_machine
+        return await run_machine(self, name, text, selectors, max_attempts)
+
     def _get_timeout(self, key: str, default: int) -> int:
         from .get_timeout import get_timeout
         return get_timeout(self, key, default)
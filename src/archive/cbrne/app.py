@@ -4,7 +4,7 @@ import logging
 from playwright.async_api import async_playwright
 
 from .config_loader import load_config
-from ..browser import BrowserManager
+from ...browser import BrowserManager
 from . import ChallengeExecutor
 
 
@@ -21,6 +21,7 @@ async def run_all(connect_to_existing_browser: bool = True):
             print("Failed to initialize browser or page. Exiting.")
             return
         executor = ChallengeExecutor(page, config, automation_settings)
+        executor.browser_manager = browser_manager
         await executor.run()
 
 
@@ -36,6 +37,7 @@ async def run_judge(connect_to_existing_browser: bool = True):
             print("Failed to initialize browser or page. Exiting.")
             return
         executor = ChallengeExecutor(page, config, automation_settings)
+        executor.browser_manager = browser_manager
         await executor.run_judging_loop()
 
 
@@ -51,6 +53,7 @@ async def run_intent(connect_to_existing_browser: bool = True):
             print("Failed to initialize browser or page. Exiting.")
             return
         executor = ChallengeExecutor(page, config, automation_settings)
+        executor.browser_manager = browser_manager
         await executor.run_intent_loop_2()
 
 
@@ -1,7 +1,8 @@
 def get_timeout(self, key: str, default: int) -> int:
-    return self.automation_settings.get("timeouts", {}).get(
-        key, self.automation_settings.get(key, default)
-    )
-
-
-
+    # Resolved once per executor: a ``timeouts`` entry wins over a top-level
+    # automation setting of the same name.
+    resolved = getattr(self, "_resolved_timeouts", None)
+    if resolved is None:
+        resolved = {**self.automation_settings, **(self.automation_settings.get("timeouts") or {})}
+        self._resolved_timeouts = resolved
+    return resolved.get(key, default)
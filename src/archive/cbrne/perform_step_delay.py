@@ -1,4 +1,4 @@
-from ..utils import perform_delay
+from .utils import perform_delay
 from .config import DEFAULT_DELAY_MIN, DEFAULT_DELAY_MAX
 
 
@@ -8,6 +8,8 @@ async def perform_step_delay(self):
         self.automation_settings.get("delay_min_sec", DEFAULT_DELAY_MIN),
         self.automation_settings.get("delay_max_sec", DEFAULT_DELAY_MAX),
         self.page,
+        rate_limiter=getattr(self, "rate_limiter", None),
+        challenge=self.config.get("challenge_name"),
     )
 
 
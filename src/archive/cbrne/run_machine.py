@@ -0,0 +1,24 @@
+from ...state_machine import StateMachine
+
+
+async def run_machine(self, name: str, text: str, selectors: dict | None = None, max_attempts: int | None = None) -> dict:
+    machine = StateMachine.load(name, self.config)
+    delay = None
+    if self.automation_settings.get("random_delay", False):
+        from .config import DEFAULT_DELAY_MIN, DEFAULT_DELAY_MAX
+        delay = (
+            self.automation_settings.get("delay_min_sec", DEFAULT_DELAY_MIN),
+            self.automation_settings.get("delay_max_sec", DEFAULT_DELAY_MAX),
+        )
+    return await machine.run(
+        self,
+        text,
+        selectors={k: v for k, v in (selectors or {}).items() if v},
+        timeouts={key: self._get_timeout(key, default) for key, default in machine.timeouts.items()},
+        max_attempts=max_attempts,
+        variables={
+            "base_url": self.config.get("base_url"),
+            "navigate": self.automation_settings.get("navigate_to_base_url", True),
+            "delay": delay,
+        },
+    )
@@ -1,6 +1,8 @@
 import logging
 from playwright.async_api import Page
 
+from ...text_insert import insert_text
+
 
 async def navigate_to_challenge(page: Page, base_url: str):
     if base_url not in page.url:
@@ -31,7 +33,7 @@ async def fill_prompt_and_submit(
     logging.info(f"Filling text area ('{prompt_selector}')")
     prompt_area = page.locator(prompt_selector)
     await prompt_area.wait_for(state="visible", timeout=prompt_visible_ms)
-    await prompt_area.fill(prompt_text)
+    await insert_text(page, prompt_area, prompt_text, _AUTOMATION_SETTINGS.get("text_insertion"))
 
     logging.info(f"Clicking submit prompt button ('{submit_selector}')")
     submit_button = page.locator(submit_selector)
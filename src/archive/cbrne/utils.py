@@ -1,5 +1,6 @@
 import os
 import logging
+from urllib.parse import urlparse
 from playwright.async_api import Page
 
 
@@ -14,7 +15,19 @@ async def take_screenshot(page: Page, stage: str):
         logging.error(f"Could not take screenshot: {e}")
 
 
-async def perform_delay(should_delay: bool, min_sec: float, max_sec: float, page: Page):
+async def perform_delay(
+    should_delay: bool,
+    min_sec: float,
+    max_sec: float,
+    page: Page,
+    rate_limiter=None,
+    action: str = "step",
+    challenge: str | None = None,
+):
+    # A shared rate limiter, when configured, replaces the fixed delay.
+    if rate_limiter is not None:
+        await rate_limiter.acquire(action, host=urlparse(page.url).hostname, challenge=challenge)
+        return
     if not should_delay:
         return
     import random
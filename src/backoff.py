@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import random
+
+
+class DecorrelatedJitterBackoff:
+    """
+    "Decorrelated jitter" backoff: each delay is drawn uniformly between the base
+    and three times the previous delay, capped. Workers that fail together
+    drift apart instead of retrying in lockstep.
+    """
+
+    def __init__(self, base_sec: float, cap_sec: float):
+        self.base = max(0.0, float(base_sec))
+        self.cap = max(self.base, float(cap_sec))
+        self._last = self.base
+
+    def next_delay(self) -> float:
+        upper = max(self.base, self._last * 3)
+        self._last = min(self.cap, random.uniform(self.base, upper))
+        return self._last
+
+    def reset(self):
+        self._last = self.base
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Breaker shared by every worker that talks to one host.
+
+    After ``failure_threshold`` consecutive failures it opens and workers park
+    on an event until the cool-down ends. The first worker through afterwards
+    becomes the single probe (half-open); its result either closes the breaker
+    and releases everyone, or reopens it with a longer, jittered cool-down.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        failure_threshold: int = 5,
+        open_base_sec: float = 10,
+        open_max_sec: float = 300,
+        probe_timeout_sec: float = 240,
+    ):
+        self.key = key
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.probe_timeout_sec = probe_timeout_sec
+        self._cooldown = DecorrelatedJitterBackoff(open_base_sec, open_max_sec)
+        self.state = CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self._probe_started = 0.0
+        self._changed = asyncio.Event()
+        self.times_opened = 0
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logging.warning(f"Circuit breaker [{self.key}] {self.state} -> {state}")
+        self.state = state
+        # Wake every parked worker, then start a fresh event for the next change.
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _wait_for_change(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def acquire(self) -> bool:
+        """
+        Waits until the caller may proceed. Returns True when the caller is the
+        half-open probe and must report its result.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN:
+                if now < self.open_until:
+                    await self._wait_for_change(self.open_until - now)
+                    continue
+                self._probe_started = now
+                self._transition(HALF_OPEN)
+                return True
+            # Half-open: a probe is in flight. Take over if it never reported back.
+            probe_deadline = self._probe_started + self.probe_timeout_sec
+            if now >= probe_deadline:
+                self._probe_started = now
+                return True
+            await self._wait_for_change(probe_deadline - now)
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != CLOSED:
+            self._cooldown.reset()
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        if self.state == OPEN:
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        cooldown = self._cooldown.next_delay()
+        self.open_until = asyncio.get_running_loop().time() + cooldown
+        self.times_opened += 1
+        logging.warning(
+            f"Circuit breaker [{self.key}] opening for {cooldown:.1f}s "
+            f"after {self.failures} failure(s)"
+        )
+        self._transition(OPEN)
+
+
+class CircuitBreakerRegistry:
+    """Hands out one shared CircuitBreaker per host."""
+
+    def __init__(self, settings: dict):
+        self.settings = settings
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def from_settings(cls, settings: dict | None) -> "CircuitBreakerRegistry | None":
+        if not settings or not settings.get("enabled", False):
+            return None
+        return cls(settings)
+
+    def get(self, host: str | None) -> CircuitBreaker:
+        key = host or "default"
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                key,
+                failure_threshold=self.settings.get("failure_threshold", 5),
+                open_base_sec=self.settings.get("open_base_sec", 10),
+                open_max_sec=self.settings.get("open_max_sec", 300),
+                probe_timeout_sec=self.settings.get("probe_timeout_sec", 240),
+            )
+            self._breakers[key] = breaker
+        return breaker
+
+    def states(self) -> dict:
+        return {
+            key: {"state": b.state, "failures": b.failures, "times_opened": b.times_opened}
+            for key, b in self._breakers.items()
+        }
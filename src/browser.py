@@ -1,3 +1,5 @@
+import asyncio
+import json
 import subprocess
 import time
 import signal
@@ -5,11 +7,31 @@ import os
 import sys
 import threading
 import requests
+from collections import deque
 from datetime import datetime
-from playwright.async_api import Playwright, Browser, Page
+from playwright.async_api import Playwright, Browser, BrowserContext, Page
 import logging
 
 
+# Chromium switches that trim a server browser's footprint without changing
+# what the challenge page sees; applied in bundled mode unless disabled.
+RESOURCE_SAVING_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-component-update",
+    "--disable-background-networking",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+]
+
+LAUNCH_MODES = ("external", "bundled")
+HEADLESS_MODES = ("new", "shell", False)
+
+
 class BrowserManager:
     """Manages the lifecycle of the automation browser, including process and connection."""
 
@@ -33,6 +55,39 @@ class BrowserManager:
 
         self.browser_init_wait_sec = automation_settings.get("browser_init_wait_sec", 5)
 
+        # external: Brave (or any Chromium) started as a process and driven over
+        # CDP; bundled: Playwright's own Chromium, launched headless.
+        self.launch_settings = automation_settings.get("browser_launch") or {}
+        self.launch_mode = self.launch_settings.get("mode", "external")
+        if self.launch_mode not in LAUNCH_MODES:
+            raise ValueError(f"browser_launch.mode must be one of {', '.join(LAUNCH_MODES)}, got {self.launch_mode!r}")
+        self._persistent_context: BrowserContext | None = None
+
+        # Cookies and localStorage exported from the logged-in profile; every
+        # context this manager creates starts from it instead of logging in.
+        storage = automation_settings.get("storage_state") or {}
+        self.storage_state_enabled = storage.get("enabled", False)
+        self.storage_state_path = storage.get("path", "hap_storage_state.json")
+        self.storage_state_max_age_sec = storage.get("max_age_sec", 3600)
+        self.storage_state_min_refresh_sec = storage.get("min_refresh_interval_sec", 30)
+        self._storage_state: dict | None = None
+        self._storage_state_at: float | None = None
+        self._storage_lock = asyncio.Lock()
+        self.storage_state_exports = 0
+        self.reauthentications = 0
+        self.context_create_ms: deque = deque(maxlen=100)
+
+        # Pages kept already at the challenge URL, one pool per (url, context).
+        page_pool = automation_settings.get("page_pool") or {}
+        self.page_pool_settings = page_pool if page_pool.get("enabled") else None
+        self._page_pools: dict[tuple, "WarmPagePool"] = {}
+        self._pool_contexts = 0
+
+        page_health = automation_settings.get("page_health", {})
+        self.heartbeat_interval_sec = page_health.get("heartbeat_interval_sec", 15)
+        self.heartbeat_timeout_ms = page_health.get("heartbeat_timeout_ms", 5000)
+        self.max_missed_heartbeats = page_health.get("max_missed_heartbeats", 3)
+
         self.browser_process = None
         self.browser: Browser | None = None
         self.page: Page | None = None
@@ -40,12 +95,26 @@ class BrowserManager:
         self.monitoring_active = False
         self.last_activity_time = datetime.now()
 
+        self._page_health: dict[Page, dict] = {}
+        self._watchdogs: dict[Page, asyncio.Task] = {}
+        self._disconnected_at: float | None = None
+        self._reconnect_lock = asyncio.Lock()
+        self.recovery_times: list[float] = []
+        self._cdp_sessions: dict = {}
+        self._owned_contexts: set = set()
+
     async def get_page(self, connect_to_existing: bool = True) -> Page | None:
         """
         Provides a Playwright page object, launching or connecting to a browser as
-        needed.
+        needed. In bundled mode the browser is always launched by Playwright.
         """
-        if connect_to_existing:
+        if self.launch_mode == "bundled":
+            try:
+                self.page = await self._launch_bundled()
+            except Exception as e:
+                print(f"Failed to launch bundled Chromium: {e}")
+                return None
+        elif connect_to_existing:
             if not self.ws_endpoint:
                 print(
                     "Error: browser_ws_endpoint not configured for connecting to "
@@ -60,6 +129,7 @@ class BrowserManager:
             self.browser = await self.playwright.chromium.connect_over_cdp(
                 self.ws_endpoint
             )
+            self._watch_browser()
 
             # Find the first non-blank page
             for p in self.browser.contexts[0].pages:
@@ -87,13 +157,485 @@ class BrowserManager:
                 self.browser = await self.playwright.chromium.connect_over_cdp(
                     ws_endpoint
                 )
+                self._watch_browser()
                 self.page = await self.browser.contexts[0].new_page()
                 print("Successfully connected to new browser and obtained a page.")
             except Exception as e:
                 print(f"Failed to connect to the new browser instance: {e}")
                 return None
 
-        return self.page
+        return self.watch_page(self.page)
+
+    def bundled_launch_options(self) -> dict:
+        """Keyword arguments for Playwright's Chromium launch in bundled mode."""
+        settings = self.launch_settings
+        headless = settings.get("headless", "new")
+        if headless is True:
+            headless = "new"
+        if headless not in HEADLESS_MODES:
+            raise ValueError(f"browser_launch.headless must be new, shell or false, got {headless!r}")
+        args = list(RESOURCE_SAVING_ARGS) if settings.get("resource_saving", True) else []
+        if settings.get("renderer_process_limit"):
+            args.append(f"--renderer-process-limit={settings['renderer_process_limit']}")
+        args += settings.get("args") or []
+        options = {"headless": headless is not False, "args": args}
+        channel = settings.get("channel")
+        if headless == "new" and channel is None:
+            # The "chromium" channel runs full Chromium in the new headless mode;
+            # without it Playwright picks the slimmer (and more detectable) headless shell.
+            channel = "chromium"
+        if channel:
+            options["channel"] = channel
+        if settings.get("executable_path"):
+            options["executable_path"] = settings["executable_path"]
+        return options
+
+    @property
+    def bundled_user_data_dir(self) -> str:
+        return self.launch_settings.get("user_data_dir") or f"{self.automation_profile_dir}-chromium"
+
+    async def _launch_bundled(self) -> Page:
+        options = self.bundled_launch_options()
+        context_options = {}
+        if self.launch_settings.get("viewport"):
+            context_options["viewport"] = self.launch_settings["viewport"]
+        persistent = self.launch_settings.get("persistent", True)
+        mode = "headed" if not options["headless"] else f"headless {self.launch_settings.get('headless', 'new')}"
+        print(
+            f"🚀 Launching bundled Chromium ({mode}, "
+            f"{'profile ' + self.bundled_user_data_dir if persistent else 'ephemeral profile'})"
+        )
+        if persistent:
+            context = await self.playwright.chromium.launch_persistent_context(
+                self.bundled_user_data_dir, **options, **context_options
+            )
+            self._persistent_context = context
+            self.browser = context.browser
+        else:
+            self.browser = await self.playwright.chromium.launch(**options)
+            self._persistent_context = None
+            # A clean profile can still start logged in from a saved snapshot.
+            saved = self._load_storage_state() if self.storage_state_enabled else None
+            if saved is not None:
+                context_options["storage_state"] = saved
+            context = await self.browser.new_context(**context_options)
+        await self._block_resources(context)
+        self._watch_browser()
+        return context.pages[0] if context.pages else await context.new_page()
+
+    async def _block_resources(self, context: BrowserContext):
+        """Aborts requests of the configured resource types (images, media, fonts, ...)."""
+        blocked = set(self.launch_settings.get("block_resources") or [])
+        if not blocked:
+            return
+
+        async def handle(route):
+            if route.request.resource_type in blocked:
+                await route.abort()
+            else:
+                await route.fallback()
+
+        await context.route("**/*", handle)
+
+    @property
+    def default_context(self) -> BrowserContext:
+        """The context pages open in unless an isolated one is requested."""
+        if self._persistent_context is not None:
+            return self._persistent_context
+        return self.browser.contexts[0]
+
+    def _connected(self) -> bool:
+        if self.browser is not None:
+            return self.browser.is_connected()
+        return self._persistent_context is not None and self._disconnected_at is None
+
+    async def new_page(self) -> Page:
+        """Opens an additional page in the already connected browser context."""
+        if not self.browser and not self._persistent_context:
+            raise RuntimeError("Browser is not connected; call get_page() first.")
+        return self.watch_page(await self.default_context.new_page())
+
+    async def new_context(self, **context_options) -> BrowserContext:
+        """
+        Creates an isolated browser context in the connected browser. With a
+        storage-state snapshot enabled it starts logged in unless the caller
+        passes its own ``storage_state``.
+        """
+        if not self.browser:
+            raise RuntimeError("Browser is not connected; call get_page() first.")
+        if self.storage_state_enabled and "storage_state" not in context_options:
+            context_options["storage_state"] = await self.storage_state()
+        started = time.perf_counter()
+        context = await self.browser.new_context(**context_options)
+        self.context_create_ms.append((time.perf_counter() - started) * 1000)
+        self._owned_contexts.add(context)
+        if self.launch_mode == "bundled":
+            await self._block_resources(context)
+        return context
+
+    def _load_storage_state(self) -> dict | None:
+        """The snapshot file, if it exists and is younger than ``max_age_sec``."""
+        try:
+            saved_at = os.path.getmtime(self.storage_state_path)
+            if time.time() - saved_at >= self.storage_state_max_age_sec:
+                return None
+            with open(self.storage_state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._storage_state, self._storage_state_at = state, saved_at
+        return state
+
+    def _save_storage_state(self, state: dict):
+        # Session cookies: readable by the owner only, replaced atomically.
+        tmp_path = f"{self.storage_state_path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.storage_state_path)
+
+    async def storage_state(self, refresh: bool = False) -> dict:
+        """
+        Cookies and localStorage of the logged-in profile (the default
+        context). The snapshot is kept in memory and in ``storage_state.path``
+        and re-exported once it is older than ``max_age_sec`` or when
+        ``refresh`` is set. Refreshes requested within
+        ``min_refresh_interval_sec`` of the last export reuse it, so workers
+        that see the session expire together trigger one export.
+        """
+        async with self._storage_lock:
+            now = time.time()
+            if self._storage_state is None:
+                self._load_storage_state()
+            age = now - self._storage_state_at if self._storage_state_at is not None else None
+            if age is not None:
+                if refresh and age < self.storage_state_min_refresh_sec:
+                    return self._storage_state
+                if not refresh and age < self.storage_state_max_age_sec:
+                    return self._storage_state
+            state = await self.default_context.storage_state()
+            self._save_storage_state(state)
+            self._storage_state, self._storage_state_at = state, now
+            self.storage_state_exports += 1
+            logging.info(
+                f"🔑 Exported storage state: {len(state.get('cookies', []))} cookie(s), "
+                f"{len(state.get('origins', []))} origin(s) with localStorage"
+            )
+            return state
+
+    async def reauthenticate(
+        self, page: Page, url: str | None = None, ready_selector: str | None = None, ready_timeout_ms: int = 30000
+    ) -> Page | None:
+        """
+        Replaces a page whose session expired with one in a new context built
+        from a refreshed snapshot, opened at ``url`` (the page's own URL is
+        usually the login redirect). Returns None when that cannot help: no
+        snapshot is configured, or the page already belongs to the profile
+        the snapshot is taken from.
+        """
+        if not self.storage_state_enabled or page.context not in self._owned_contexts:
+            return None
+        state = await self.storage_state(refresh=True)
+        fresh = await self.replace_page(
+            page, new_context=True, ready_selector=ready_selector, ready_timeout_ms=ready_timeout_ms,
+            storage_state=state, url=url,
+        )
+        self.reauthentications += 1
+        return fresh
+
+    def storage_state_summary(self) -> dict:
+        created = sorted(self.context_create_ms)
+        return {
+            "age_sec": round(time.time() - self._storage_state_at, 1) if self._storage_state_at else None,
+            "exports": self.storage_state_exports,
+            "reauthentications": self.reauthentications,
+            "contexts_created": len(created),
+            "context_create_p50_ms": round(created[len(created) // 2], 1) if created else None,
+        }
+
+    def _watch_browser(self):
+        self._disconnected_at = None
+
+        def on_disconnected(_browser):
+            self._disconnected_at = time.monotonic()
+            logging.warning("🔌 Lost the CDP connection to the browser.")
+
+        if self.browser is not None:
+            self.browser.on("disconnected", on_disconnected)
+        else:
+            self._persistent_context.on("close", on_disconnected)
+
+    def watch_page(self, page: Page) -> Page:
+        """Tracks crash events for a page and starts its heartbeat watchdog."""
+        if page in self._page_health:
+            return page
+        health = {"crashed_at": None, "unresponsive_at": None, "missed": 0}
+        self._page_health[page] = health
+
+        def on_crash(_page):
+            health["crashed_at"] = time.monotonic()
+            logging.warning(f"💥 Page crashed: {page.url}")
+
+        page.on("crash", on_crash)
+        if self.heartbeat_interval_sec:
+            self._watchdogs[page] = asyncio.create_task(self._heartbeat(page, health))
+        return page
+
+    async def _heartbeat(self, page: Page, health: dict):
+        """
+        Pings the page with a trivial evaluate. A page that misses several beats
+        is closed so that workers blocked on it fail fast and get a fresh one.
+        """
+        while not page.is_closed():
+            await asyncio.sleep(self.heartbeat_interval_sec)
+            try:
+                await asyncio.wait_for(
+                    page.evaluate("1"), self.heartbeat_timeout_ms / 1000
+                )
+                health["missed"] = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if page.is_closed():
+                    return
+                health["missed"] += 1
+                if health["missed"] >= self.max_missed_heartbeats:
+                    health["unresponsive_at"] = time.monotonic()
+                    logging.warning(
+                        f"🫀 Page missed {health['missed']} heartbeats; closing it: {page.url}"
+                    )
+                    await self._close_quietly(page)
+                    return
+
+    async def _close_quietly(self, page: Page):
+        try:
+            await asyncio.wait_for(page.close(), 5)
+        except Exception:
+            pass
+
+    def is_page_usable(self, page: Page) -> bool:
+        """The flag checks of :meth:`is_page_healthy`, without the heartbeat."""
+        if self._disconnected_at is not None or page.is_closed():
+            return False
+        health = self._page_health.get(page, {})
+        return not (health.get("crashed_at") or health.get("unresponsive_at"))
+
+    async def is_page_healthy(self, page: Page) -> bool:
+        """Cheap health check: known crash/close/disconnect flags, then one heartbeat."""
+        if not self.is_page_usable(page):
+            return False
+        try:
+            await asyncio.wait_for(page.evaluate("1"), self.heartbeat_timeout_ms / 1000)
+            return True
+        except Exception:
+            return False
+
+    async def _reconnect(self):
+        async with self._reconnect_lock:
+            if self._connected() and self._disconnected_at is None:
+                return
+            # Pooled pages died with the connection; pools refill on next use.
+            await self.close_page_pools()
+            if self.launch_mode == "bundled":
+                print("🔁 Relaunching bundled Chromium...")
+                await self._launch_bundled()
+                return
+            endpoint = self.ws_endpoint or f"http://localhost:{self.remote_debugging_port}"
+            if not self.check_browser_debugging():
+                await asyncio.to_thread(self.start_browser_process)
+            print(f"🔁 Reconnecting to browser at {endpoint}...")
+            self.browser = await self.playwright.chromium.connect_over_cdp(endpoint)
+            self._watch_browser()
+
+    async def recover_page(
+        self,
+        page: Page,
+        url: str | None = None,
+        ready_selector: str | None = None,
+        ready_timeout_ms: int = 30000,
+    ) -> Page:
+        """
+        Replaces a crashed, closed or hung page with a fresh one navigated to the
+        same URL (reconnecting first if the CDP connection dropped) and records
+        the time taken to recover.
+        """
+        health = self._page_health.pop(page, {})
+        detected_at = (
+            health.get("crashed_at")
+            or health.get("unresponsive_at")
+            or self._disconnected_at
+            or time.monotonic()
+        )
+        watchdog = self._watchdogs.pop(page, None)
+        if watchdog:
+            watchdog.cancel()
+        target_url = url or (page.url if page.url != "about:blank" else None)
+
+        new_page = None
+        context = None
+        if self._disconnected_at is None and self._connected():
+            await self._close_quietly(page)
+            context = page.context
+        else:
+            await self._reconnect()
+        pool = self.page_pool(target_url, ready_selector, ready_timeout_ms, context)
+        if pool is not None:
+            try:
+                new_page = await pool.get()
+            except Exception as e:
+                logging.warning(f"Page pool could not supply a page: {e}")
+        if new_page is None:
+            try:
+                new_page = await context.new_page() if context is not None else None
+            except Exception:
+                new_page = None
+            if new_page is None:
+                new_page = await self.default_context.new_page()
+            if target_url:
+                await new_page.goto(target_url)
+            if ready_selector:
+                await new_page.locator(ready_selector).wait_for(
+                    state="visible", timeout=ready_timeout_ms
+                )
+        self.watch_page(new_page)
+        if self.page is page:
+            self.page = new_page
+
+        elapsed = time.monotonic() - detected_at
+        self.recovery_times.append(elapsed)
+        summary = self.recovery_summary()
+        logging.info(
+            f"♻️ Recovered page in {elapsed:.2f}s "
+            f"(MTTR {summary['mttr_sec']:.2f}s over {summary['recoveries']} recoveries)"
+        )
+        return new_page
+
+    def page_pool(
+        self,
+        url: str | None,
+        ready_selector: str | None = None,
+        ready_timeout_ms: int = 30000,
+        context: BrowserContext | None = None,
+    ) -> "WarmPagePool | None":
+        """
+        The warm pool for ``url`` in ``context`` (default context if None),
+        created and started on first use; None when pooling is off.
+        """
+        if self.page_pool_settings is None or not url or url == "about:blank":
+            return None
+        context = context or self.default_context
+        pool = self._page_pools.get((url, context))
+        if pool is None:
+            pool = WarmPagePool(self, url, context, self.page_pool_settings, ready_selector, ready_timeout_ms)
+            self._pool_contexts += 1
+            pool.label = "default" if context is self.default_context else f"context-{self._pool_contexts}"
+            self._page_pools[(url, context)] = pool
+            pool.start()
+        return pool
+
+    async def open_page(
+        self,
+        url: str | None,
+        ready_selector: str | None = None,
+        ready_timeout_ms: int = 30000,
+        context: BrowserContext | None = None,
+        pooled: bool = True,
+    ) -> Page:
+        """
+        A page at ``url`` with ``ready_selector`` visible: from the warm pool
+        when one is configured (and ``pooled``), otherwise opened and
+        navigated here.
+        """
+        pool = self.page_pool(url, ready_selector, ready_timeout_ms, context) if pooled else None
+        if pool is not None:
+            return await pool.get()
+        page = self.watch_page(await (context or self.default_context).new_page())
+        if url and url != "about:blank":
+            await page.goto(url)
+        if ready_selector:
+            await page.locator(ready_selector).wait_for(state="visible", timeout=ready_timeout_ms)
+        return page
+
+    def page_pool_summary(self) -> dict:
+        """Metrics per pool, keyed ``"<url> (<context>)"`` so pools on one URL stay apart."""
+        return {f"{url} ({pool.label})": pool.metrics() for (url, _), pool in self._page_pools.items()}
+
+    async def close_page_pools(self, context: BrowserContext | None = None):
+        """Closes every pool, or only those warming pages in ``context``."""
+        keys = [key for key in self._page_pools if context is None or key[1] is context]
+        for key in keys:
+            await self._page_pools.pop(key).close()
+
+    def recovery_summary(self) -> dict:
+        times = self.recovery_times
+        return {
+            "recoveries": len(times),
+            "mttr_sec": sum(times) / len(times) if times else 0.0,
+            "max_sec": max(times) if times else 0.0,
+        }
+
+    def pages(self) -> list[Page]:
+        """Open pages currently tracked by the health watchdog."""
+        return [page for page in self._page_health if not page.is_closed()]
+
+    def _forget_page(self, page: Page):
+        self._page_health.pop(page, None)
+        self._cdp_sessions.pop(page, None)
+        watchdog = self._watchdogs.pop(page, None)
+        if watchdog:
+            watchdog.cancel()
+
+    async def cdp_session(self, page: Page):
+        """Returns a CDP session for the page, reused until the page is forgotten."""
+        session = self._cdp_sessions.get(page)
+        if session is None:
+            session = await page.context.new_cdp_session(page)
+            await session.send("Performance.enable")
+            self._cdp_sessions[page] = session
+        return session
+
+    async def page_metrics(self, page: Page) -> dict:
+        """Returns CDP ``Performance.getMetrics`` for a page as a name -> value dict."""
+        session = await self.cdp_session(page)
+        result = await session.send("Performance.getMetrics")
+        return {m["name"]: m["value"] for m in result.get("metrics", [])}
+
+    async def replace_page(
+        self,
+        page: Page,
+        new_context: bool = False,
+        ready_selector: str | None = None,
+        ready_timeout_ms: int = 30000,
+        storage_state: dict | None = None,
+        url: str | None = None,
+    ) -> Page:
+        """
+        Opens a fresh page at the same URL (or ``url``) and closes the old one.
+        With ``new_context`` the page gets a brand-new context that carries
+        over the old context's cookies and localStorage, or ``storage_state``
+        when given.
+        """
+        old_context = page.context
+        if new_context:
+            state = storage_state if storage_state is not None else await old_context.storage_state()
+            context = await self.new_context(storage_state=state)
+        else:
+            context = old_context
+        target_url = url or page.url
+        # Only same-context swaps draw from the pool: a pool for a context
+        # that is about to be dropped would only keep it alive.
+        fresh = await self.open_page(target_url, ready_selector, ready_timeout_ms, context, pooled=context is old_context)
+
+        self._forget_page(page)
+        await self._close_quietly(page)
+        if old_context is not context and old_context in self._owned_contexts:
+            await self.close_page_pools(old_context)
+            if not old_context.pages:
+                self._owned_contexts.discard(old_context)
+                await old_context.close()
+        if self.page is page:
+            self.page = fresh
+        return fresh
 
     def get_brave_command(self):
         return (
@@ -224,4 +766,238 @@ class BrowserManager:
         """Stop the activity monitoring."""
         self.monitoring_active = False
         if self.monitor_thread and self.monitor_thread.is_alive():
-            self.monitor_thread.join(timeout=5)   
\ No newline at end of file
+            self.monitor_thread.join(timeout=5)   
+
+
+class PageRecycler:
+    """
+    Per-page recycling policy. At an attempt boundary it swaps in a fresh page
+    (or context) once the current page has served ``max_attempts_per_page``
+    attempts or its JS heap crosses ``max_js_heap_mb``, logging heap and attempt
+    latency before the recycle and again once the fresh page has warmed up.
+    The recycler follows its page (``page``) across jobs and recycles, so
+    long-running modes that reuse a page keep counting.
+    """
+
+    def __init__(self, browser_manager: BrowserManager, settings: dict):
+        self.browser_manager = browser_manager
+        self.max_attempts = settings.get("max_attempts_per_page", 0)
+        self.max_heap_mb = settings.get("max_js_heap_mb", 0)
+        self.check_every = max(1, int(settings.get("heap_check_every_attempts", 10)))
+        self.recycle_context = settings.get("mode", "page") == "context"
+        self.window = max(1, int(settings.get("latency_window", 20)))
+        self.attempts_on_page = 0
+        self.latencies: deque = deque(maxlen=self.window)
+        self.recycles = 0
+        self._before: dict | None = None
+        # The page being counted; None until the first boundary.
+        self.page: Page | None = None
+
+    @classmethod
+    def from_settings(
+        cls, browser_manager: BrowserManager | None, settings: dict | None
+    ) -> "PageRecycler | None":
+        if browser_manager is None or not settings:
+            return None
+        if not (settings.get("max_attempts_per_page") or settings.get("max_js_heap_mb")):
+            return None
+        return cls(browser_manager, settings)
+
+    def on_attempt(self, record: dict):
+        self.attempts_on_page += 1
+        if record.get("duration_ms") is not None:
+            self.latencies.append(record["duration_ms"])
+
+    def _avg_latency_ms(self) -> float | None:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+    async def _heap_mb(self, page: Page) -> float | None:
+        try:
+            metrics = await self.browser_manager.page_metrics(page)
+            return metrics.get("JSHeapUsedSize", 0) / (1024 * 1024)
+        except Exception as e:
+            logging.debug(f"Could not read JS heap size: {e}")
+            return None
+
+    async def maybe_recycle(
+        self, page: Page, ready_selector: str | None = None, ready_timeout_ms: int = 30000
+    ) -> Page:
+        if page is not self.page:
+            if self.page is not None:
+                # Swapped by page recovery since the last boundary: a new page, a new count.
+                self.attempts_on_page = 0
+                self.latencies.clear()
+                self._before = None
+            self.page = page
+        if self._before and self.attempts_on_page >= self.window:
+            await self._log_after(page)
+
+        reason = None
+        heap_mb = None
+        if self.max_attempts and self.attempts_on_page >= self.max_attempts:
+            reason = f"{self.attempts_on_page} attempts on this page"
+        elif (
+            self.max_heap_mb
+            and self.attempts_on_page
+            and self.attempts_on_page % self.check_every == 0
+        ):
+            heap_mb = await self._heap_mb(page)
+            if heap_mb is not None and heap_mb >= self.max_heap_mb:
+                reason = f"JS heap {heap_mb:.1f} MB >= {self.max_heap_mb} MB"
+        if reason is None:
+            return page
+
+        if heap_mb is None:
+            heap_mb = await self._heap_mb(page)
+        self._before = {"heap_mb": heap_mb, "avg_latency_ms": self._avg_latency_ms()}
+        logging.info(
+            f"♻️ Recycling {'context' if self.recycle_context else 'page'} ({reason}); "
+            f"before: heap {_fmt(heap_mb, 'MB')}, avg attempt "
+            f"{_fmt(self._before['avg_latency_ms'], 'ms')} over last {len(self.latencies)}"
+        )
+        fresh = await self.browser_manager.replace_page(
+            page, self.recycle_context, ready_selector, ready_timeout_ms
+        )
+        self.recycles += 1
+        self.page = fresh
+        self.attempts_on_page = 0
+        self.latencies.clear()
+        logging.info(f"♻️ Fresh page ready; heap {_fmt(await self._heap_mb(fresh), 'MB')}")
+        return fresh
+
+    async def _log_after(self, page: Page):
+        before = self._before
+        self._before = None
+        logging.info(
+            f"♻️ After recycle #{self.recycles}: heap {_fmt(await self._heap_mb(page), 'MB')} "
+            f"(was {_fmt(before['heap_mb'], 'MB')}), avg attempt "
+            f"{_fmt(self._avg_latency_ms(), 'ms')} (was {_fmt(before['avg_latency_ms'], 'ms')})"
+        )
+
+
+class WarmPagePool:
+    """
+    Keeps ``size`` pages already navigated to one URL with the ready selector
+    (the prompt textarea) visible, so a worker that needs a new page skips
+    navigation and app boot. :meth:`get` hands out a ready page at once (a hit)
+    or opens one inline when the pool is empty (a miss); either way the pool
+    refills in the background. Pages idle longer than ``max_idle_sec`` are
+    closed and replaced rather than handed out.
+    """
+
+    def __init__(
+        self,
+        browser_manager: BrowserManager,
+        url: str,
+        context: BrowserContext,
+        settings: dict,
+        ready_selector: str | None = None,
+        ready_timeout_ms: int = 30000,
+    ):
+        self.browser_manager = browser_manager
+        self.url = url
+        self.context = context
+        self.size = max(1, int(settings.get("size", 2)))
+        self.ready_selector = settings.get("ready_selector") or ready_selector or "textarea"
+        self.ready_timeout_ms = settings.get("ready_timeout_ms", ready_timeout_ms)
+        self.max_idle_sec = settings.get("max_idle_sec", 600)
+        self.retry_delay_sec = settings.get("retry_delay_sec", 5)
+        self.label = "default"
+        self._ready: deque = deque()
+        self._warming: set[asyncio.Task] = set()
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.warm_failures = 0
+        self.warm_ms: deque = deque(maxlen=100)
+
+    def start(self):
+        self._replenish()
+
+    async def _warm(self) -> Page:
+        started = time.perf_counter()
+        page = self.browser_manager.watch_page(await self.context.new_page())
+        try:
+            await page.goto(self.url)
+            await page.locator(self.ready_selector).wait_for(state="visible", timeout=self.ready_timeout_ms)
+        except BaseException:
+            self.browser_manager._forget_page(page)
+            await self.browser_manager._close_quietly(page)
+            raise
+        self.warm_ms.append((time.perf_counter() - started) * 1000)
+        return page
+
+    async def _warm_into_pool(self):
+        try:
+            page = await self._warm()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.warm_failures += 1
+            logging.warning(f"🔥 Could not warm a page for {self.url}: {e}")
+            await asyncio.sleep(self.retry_delay_sec)
+            return
+        if self._closed:
+            await self._discard(page)
+        else:
+            self._ready.append((page, time.monotonic()))
+
+    def _replenish(self):
+        if self._closed:
+            return
+        for _ in range(self.size - len(self._ready) - len(self._warming)):
+            task = asyncio.create_task(self._warm_into_pool())
+            self._warming.add(task)
+            task.add_done_callback(self._warmed)
+
+    def _warmed(self, task: asyncio.Task):
+        self._warming.discard(task)
+        if not task.cancelled():
+            self._replenish()
+
+    async def _discard(self, page: Page):
+        self.discarded += 1
+        self.browser_manager._forget_page(page)
+        await self.browser_manager._close_quietly(page)
+
+    async def get(self) -> Page:
+        while self._ready:
+            page, warmed_at = self._ready.popleft()
+            if not self.browser_manager.is_page_usable(page) or time.monotonic() - warmed_at > self.max_idle_sec:
+                await self._discard(page)
+                continue
+            self.hits += 1
+            self._replenish()
+            return page
+        self.misses += 1
+        self._replenish()
+        return await self._warm()
+
+    def metrics(self) -> dict:
+        served = self.hits + self.misses
+        warm_ms = sorted(self.warm_ms)
+        return {
+            "size": self.size,
+            "ready": len(self._ready),
+            "warming": len(self._warming),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / served, 3) if served else None,
+            "discarded": self.discarded,
+            "warm_failures": self.warm_failures,
+            "warm_p50_ms": round(warm_ms[len(warm_ms) // 2]) if warm_ms else None,
+        }
+
+    async def close(self):
+        self._closed = True
+        for task in list(self._warming):
+            task.cancel()
+        await asyncio.gather(*self._warming, return_exceptions=True)
+        while self._ready:
+            page, _ = self._ready.popleft()
+            await self._discard(page)
+
+
+def _fmt(value: float | None, unit: str) -> str:
+    return "n/a" if value is None else f"{value:.1f} {unit}"
@@ -0,0 +1,151 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+
+import yaml
+
+
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal ctypes binding: one watch on a directory, readable from asyncio."""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch the directory, not the file: editors often save by renaming a
+        # temp file over the original, which would orphan a file watch.
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def changed_names(self) -> set[str]:
+        names = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset < len(data):
+            _wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            names.add(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ConfigWatcher:
+    """
+    Keeps a validated snapshot of a YAML config file current while a run goes
+    on. Changes are picked up with inotify on Linux (polling the mtime
+    elsewhere), parsed and passed through ``validate`` as a whole; only a
+    config that passes replaces the snapshot, so readers never see a half
+    applied edit. Consumers compare ``version`` at safe points (attempt
+    boundaries) and re-read ``snapshot`` when it moved.
+    """
+
+    def __init__(self, path: str, snapshot: dict, validate=None, poll_interval_sec: float = 1.0, debounce_sec: float = 0.2):
+        self.path = os.path.abspath(path)
+        self.snapshot = snapshot
+        self.version = 0
+        self.validate = validate
+        self.poll_interval_sec = poll_interval_sec
+        self.debounce_sec = debounce_sec
+        self.last_errors: list[str] = []
+        self._stamp = self._file_stamp()
+        self._inotify: _Inotify | None = None
+        self._task: asyncio.Task | None = None
+        self._pending: asyncio.TimerHandle | None = None
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            return None
+
+    def start(self):
+        if self._task is not None or self._inotify is not None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            self._inotify = _Inotify(os.path.dirname(self.path))
+            loop.add_reader(self._inotify.fd, self._on_inotify)
+            logging.info(f"Watching {self.path} for changes (inotify)")
+        except (OSError, AttributeError) as e:
+            self._inotify = None
+            logging.info(f"inotify unavailable ({e}); polling {self.path} every {self.poll_interval_sec}s")
+            self._task = asyncio.create_task(self._poll())
+
+    def stop(self):
+        if self._inotify is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._pending is not None:
+            self._pending.cancel()
+
+    def _on_inotify(self):
+        if os.path.basename(self.path) not in self._inotify.changed_names():
+            return
+        # Saves often arrive as several events; reload once they settle.
+        if self._pending is not None:
+            self._pending.cancel()
+        self._pending = asyncio.get_running_loop().call_later(self.debounce_sec, self.reload)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval_sec)
+            self.reload()
+
+    def reload(self) -> bool:
+        """Re-reads the file; returns True when a new snapshot was installed."""
+        self._pending = None
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                candidate = yaml.safe_load(f)
+            if not isinstance(candidate, dict):
+                raise ValueError(["top level must be a mapping"])
+            errors = self.validate(candidate) if self.validate else []
+            if errors:
+                raise ValueError(errors)
+        except (OSError, yaml.YAMLError, ValueError) as e:
+            errors = e.args[0] if isinstance(e, ValueError) and isinstance(e.args[0], list) else [str(e)]
+            self.last_errors = errors
+            logging.error(
+                f"Rejected config change in {self.path}; keeping version {self.version}:\n  "
+                + "\n  ".join(errors)
+            )
+            return False
+        changed = sorted(
+            key for key in set(candidate) | set(self.snapshot)
+            if candidate.get(key) != self.snapshot.get(key)
+        )
+        self.snapshot = candidate
+        self.version += 1
+        self.last_errors = []
+        logging.info(f"🔄 Config version {self.version} loaded from {self.path}; changed: {', '.join(changed) or 'nothing'}")
+        return True
@@ -1,5 +1,3 @@
-from .agent_track_submit_retry import agent_track_submit_with_retry
-
-__all__ = ["agent_track_submit_with_retry"]
-
+from .agent_track_submit_retry import agent_track_submit_with_retry, run_agent_track_machine
 
+__all__ = ["agent_track_submit_with_retry", "run_agent_track_machine"]
@@ -3,7 +3,16 @@ import time
 import random
 import yaml
 import os
+from urllib.parse import urlparse
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from ..backoff import DecorrelatedJitterBackoff
+from ..outcome_classifier import HOST_FAILURE_ACTIONS
+from .config_loader import get_challenge_config
+from .prompt_dedup import prompt_id
+from .settings import LoopSettings, resolve_loop_settings
+from ..pipeline import Pipeline
+from ..state_machine import StateMachine, action
+from ..text_insert import insert_text
 
 
 
@@ -26,60 +35,67 @@ def load_task_config(config_path: str = None) -> dict:
         return {}
 
 
-async def select_model_from_dropdown(self, model_name: str, timeouts: dict | None = None, config: dict | None = None):
+def context_config(self) -> dict | None:
+    """
+    The full config a context runs with: the config watcher's latest snapshot
+    merged for the context's challenge when hot reload is on, otherwise the
+    context's own config (already merged for its challenge). None when the
+    context carries no config.
+    """
+    config_watcher = getattr(self, "config_watcher", None)
+    if config_watcher is not None:
+        snapshot = config_watcher.snapshot or {}
+        challenge_name = getattr(self, "challenge_name", None)
+        if challenge_name:
+            return get_challenge_config(snapshot, challenge_name) or snapshot
+        return snapshot
+    own_config = getattr(self, "config", None)
+    return own_config if isinstance(own_config, dict) else None
+
+
+def task_config_of(full_config: dict | None) -> dict:
+    """The ``agent_track_submit`` section of ``full_config``; config.yaml when there is no config."""
+    if full_config is None:
+        return load_task_config()
+    return full_config.get("agent_track_submit") or {}
+
+
+def _notify_attempt(self, record: dict):
+    """Hands a finished attempt record to any listeners registered on the context."""
+    for listener in getattr(self, "attempt_listeners", ()):
+        try:
+            listener(record)
+        except Exception as e:
+            logging.warning(f"Attempt listener failed: {e}")
+
+
+async def select_model_from_dropdown(
+    self,
+    model_name: str,
+    timeouts: dict | None = None,
+    config: dict | None = None,
+    settings: LoopSettings | None = None,
+):
     """
     Select a specific model from the dropdown menu.
     This function opens the dropdown, finds the specified model, and selects it.
     """
-    if timeouts is None:
-        timeouts = {}
-    if config is None:
-        config = {}
+    if settings is None:
+        # Standalone call: resolve once from the context's (live) config.
+        settings = resolve_loop_settings(task_config_of(context_config(self)), timeouts, config)
+    dropdown = settings.dropdown
+    task_logging = settings.messages
 
-    # Load task-specific configuration
-    task_config = load_task_config()
-    task_timeouts = task_config.get("timeouts", {})
-    task_selectors = task_config.get("selectors", {})
-    task_logging = task_config.get("logging", {})
-    task_flags = task_config.get("flags", {})
-
-    # Get timeout settings from config
-    dropdown_open_ms = timeouts.get("dropdown_open_ms", task_timeouts.get("dropdown_open_ms", 5000))
-    dropdown_item_click_ms = timeouts.get("dropdown_item_click_ms", task_timeouts.get("dropdown_item_click_ms", 3000))
-    aria_poll_ms = timeouts.get("dropdown_aria_expanded_poll_ms", task_timeouts.get("dropdown_aria_expanded_poll_ms", 100))
-    aria_max_checks = timeouts.get("dropdown_aria_expanded_max_checks", task_timeouts.get("dropdown_aria_expanded_max_checks", 20))
-    post_selection_wait_ms = timeouts.get("post_selection_wait_ms", task_timeouts.get("post_selection_wait_ms", 100))
-
-    # Get selector settings - use the working selectors we discovered
-    dropdown_button_selector = task_selectors.get(
-        "dropdown_button", 
-        'button[aria-haspopup="menu"][data-state="closed"]:not([data-testid="user-menu-trigger"])'
-    )
-    dropdown_menu_selector = task_selectors.get(
-        "dropdown_menu", 
-        'div[role="menu"]'
-    )
-    raw_model_item_selector = task_selectors.get(
-        "model_item", 
-        'div[role="menuitem"]:has-text("{model_name}")'
-    )
     # Interpolate model name if the selector template contains a placeholder
-    model_item_selector = raw_model_item_selector.format(model_name=model_name)
-    dropdown_button_fallbacks: list[str] = task_selectors.get(
-        "dropdown_button_fallbacks",
-        [
-            'button:has(svg.lucide-bot):has(svg.lucide-chevron-down):not([data-testid="user-menu-trigger"])',
-            'button[aria-haspopup="menu"]:not([data-testid="user-menu-trigger"])',
-        ],
-    )
+    model_item_selector = dropdown.model_item.format(model_name=model_name)
 
     try:
         logging.info(task_logging.get("selecting_model", f"Selecting model: {model_name}").format(model_name=model_name))
         
         # Strategy 1: Try the primary selector, then configured fallbacks
-        dropdown_button = self.page.locator(dropdown_button_selector)
+        dropdown_button = self.page.locator(dropdown.button)
         if await dropdown_button.count() == 0:
-            for fallback in dropdown_button_fallbacks:
+            for fallback in dropdown.button_fallbacks:
                 candidate = self.page.locator(fallback)
                 if await candidate.count() > 0:
                     dropdown_button = candidate
@@ -92,7 +108,7 @@ async def select_model_from_dropdown(self, model_name: str, timeouts: dict | Non
         # Use the first found button
         button = dropdown_button.first
         try:
-            button_text = await button.text_content(timeout=dropdown_open_ms)
+            button_text = await button.text_content(timeout=dropdown.open_ms)
         except Exception:
             button_text = None
         logging.info(task_logging.get("found_dropdown_button", f"Found dropdown button: {(button_text or '').strip()[:50]}").format(preview=(button_text or "").strip()[:50]))
@@ -100,38 +116,38 @@ async def select_model_from_dropdown(self, model_name: str, timeouts: dict | Non
         # Click the dropdown button to open it
         await button.click()
 
-        dropdown_menu = self.page.locator(dropdown_menu_selector)
+        dropdown_menu = self.page.locator(dropdown.menu)
 
         # Fast path: skip aria polling and extra waits if enabled
-        if task_flags.get("fast_dropdown", False):
-            await dropdown_menu.wait_for(state="visible", timeout=dropdown_open_ms)
+        if dropdown.fast:
+            await dropdown_menu.wait_for(state="visible", timeout=dropdown.open_ms)
             model_item = dropdown_menu.locator(model_item_selector)
-            await model_item.wait_for(state="visible", timeout=dropdown_open_ms)
+            await model_item.wait_for(state="visible", timeout=dropdown.open_ms)
             await model_item.scroll_into_view_if_needed()
-            await model_item.click(timeout=dropdown_item_click_ms)
+            await model_item.click(timeout=dropdown.item_click_ms)
         else:
             # Wait for dropdown to indicate it is open (aria-expanded=true) with short polling
             try:
-                for _ in range(int(aria_max_checks)):
+                for _ in range(dropdown.aria_max_checks):
                     expanded = await button.get_attribute('aria-expanded')
                     if expanded == 'true':
                         break
-                    await self.page.wait_for_timeout(int(aria_poll_ms))
+                    await self.page.wait_for_timeout(dropdown.aria_poll_ms)
             except Exception:
                 pass
 
             # Wait for the dropdown menu to appear
-            await dropdown_menu.wait_for(state="visible", timeout=dropdown_open_ms)
+            await dropdown_menu.wait_for(state="visible", timeout=dropdown.open_ms)
 
             # Scope the search to the opened dropdown menu only
             model_item = dropdown_menu.locator(model_item_selector)
-            await model_item.wait_for(state="visible", timeout=dropdown_open_ms)
+            await model_item.wait_for(state="visible", timeout=dropdown.open_ms)
             await model_item.scroll_into_view_if_needed()
-            await model_item.click(timeout=dropdown_item_click_ms)
+            await model_item.click(timeout=dropdown.item_click_ms)
 
         # Optional small wait for selection to take effect
-        if not task_flags.get("skip_post_selection_wait", False):
-            await self.page.wait_for_timeout(int(post_selection_wait_ms))
+        if not dropdown.skip_post_selection_wait:
+            await self.page.wait_for_timeout(dropdown.post_selection_wait_ms)
         
         logging.info(task_logging.get("model_selected", f"Successfully selected model: {model_name}").format(model_name=model_name))
         
@@ -142,6 +158,63 @@ async def select_model_from_dropdown(self, model_name: str, timeouts: dict | Non
         pass
 
 
+@action("select_model")
+async def _select_model_state(run, state) -> str:
+    """State machine action: picks ``run.vars["model"]`` in the dropdown when one is given."""
+    model_name = run.vars.get("model")
+    if not model_name:
+        return "skipped"
+    await select_model_from_dropdown(run.ctx, model_name, settings=run.vars.get("loop_settings"))
+    return "ok"
+
+
+async def run_agent_track_machine(self, text: str, model_name: str = None, name: str = "agent_track_submit", config: dict | None = None) -> dict:
+    """
+    Runs the agent track as a declarative state machine (see state_machines.yaml).
+    Selectors, timeouts, delays and the retry budget come from the same resolved
+    settings as agent_track_submit_with_retry; the machine's own transitions
+    replace the hand-written control flow.
+    """
+    full_config = context_config(self)
+    automation_settings = (
+        (full_config or {}).get("automation_settings") or getattr(self, "automation_settings", None) or {}
+    )
+    settings = resolve_loop_settings(
+        task_config_of(full_config), automation_settings.get("timeouts") or {}, config
+    )
+    machine = StateMachine.load(name, getattr(self, "config", None))
+    retry = settings.retry
+    return await machine.run(
+        self,
+        text,
+        selectors={
+            "textarea": settings.selectors.textarea,
+            "submit": settings.selectors.submit_button,
+            "try_again": settings.selectors.try_again_button,
+        },
+        timeouts={
+            "prompt_visible_ms": settings.timeouts.prompt_visible_ms,
+            "submit_template_enable_ms": settings.timeouts.enable_wait_ms,
+            "submit_prompt_click_ms": settings.timeouts.submit_click_ms,
+            "try_again_button_visible_ms": settings.timeouts.try_again_visible_ms,
+            "try_again_button_click_ms": settings.timeouts.try_again_click_ms,
+            "post_refresh_wait_ms": settings.timeouts.post_refresh_wait_ms,
+        },
+        max_attempts=retry.max_retries,
+        variables={
+            "base_url": (getattr(self, "config", None) or {}).get("base_url"),
+            "model": model_name,
+            "loop_settings": settings,
+            "delay": (retry.delay_min_sec, retry.delay_max_sec if retry.random_delay else retry.delay_min_sec),
+            "record": {
+                "challenge": getattr(self, "challenge_name", None),
+                "model": model_name,
+                "prompt_id": prompt_id(text),
+            },
+        },
+    )
+
+
 async def agent_track_submit_with_retry(self, text: str, model_name: str = None, timeouts: dict | None = None, config: dict | None = None):
     """
     Enhanced version of agent_track_submit that continues looping with "Try Again" button
@@ -153,206 +226,452 @@ async def agent_track_submit_with_retry(self, text: str, model_name: str = None,
     if config is None:
         config = {}
 
-    # Load task-specific configuration
-    task_config = load_task_config()
-    task_retry_settings = task_config.get("retry_settings", {})
-    task_timeouts = task_config.get("timeouts", {})
-    task_selectors = task_config.get("selectors", {})
-    task_logging = task_config.get("logging", {})
-    task_flags = task_config.get("flags", {})
-
-    # Get configuration settings
-    max_retries = config.get("max_retries", task_retry_settings.get("max_retries", 1000))
-    delay_min_sec = config.get("delay_min_sec", task_retry_settings.get("delay_min_sec", 4))
-    delay_max_sec = config.get("delay_max_sec", task_retry_settings.get("delay_max_sec", 12))
-    random_delay = config.get("random_delay", task_retry_settings.get("random_delay", False))
-    refresh_on_error = config.get("refresh_on_error", task_retry_settings.get("refresh_on_error", False))
-    error_refresh_delay_sec = config.get("error_refresh_delay_sec", task_retry_settings.get("error_refresh_delay_sec", 3))
-    max_error_refreshes = config.get("max_error_refreshes", task_retry_settings.get("max_error_refreshes", 10))
-    
-    # Get timeout settings from config
-    prompt_visible_ms = timeouts.get("prompt_visible_ms", task_timeouts.get("prompt_visible_ms", 10000))
-    submit_click_ms = timeouts.get("submit_prompt_click_ms", task_timeouts.get("submit_prompt_click_ms", 5000))
-    enable_wait_ms = timeouts.get("submit_template_enable_ms", task_timeouts.get("submit_template_enable_ms", 30000))
-    try_again_button_visible_ms = timeouts.get("try_again_button_visible_ms", task_timeouts.get("try_again_button_visible_ms", 180000))
-    try_again_button_click_ms = timeouts.get("intent_button_click_ms", task_timeouts.get("try_again_button_click_ms", 3000))
-
-    textarea_selector = task_selectors.get(
-        "textarea", 
-        'textarea'
-    )
-    submit_button_selector = task_selectors.get(
-        "submit_button", 
-        'button:has-text("Submit Template")'
-    )
-    try_again_button_selector = task_selectors.get(
-        "try_again_button", 
-        'button:has-text("Try Again")'
-    )
+    # A config watcher, when attached, supplies live config snapshots; the
+    # resolved settings are swapped only at attempt boundaries.
+    config_watcher = getattr(self, "config_watcher", None)
+    base_timeouts = (getattr(self, "automation_settings", None) or {}).get("timeouts") or {}
+
+    def resolve_settings():
+        full_config = context_config(self)
+        call_timeouts = timeouts
+        if config_watcher is not None:
+            # Timeouts passed by the caller that are just the old automation
+            # defaults follow the file; genuine per-call overrides still win.
+            live = (full_config.get("automation_settings") or {}).get("timeouts") or {}
+            call_timeouts = {
+                **live,
+                **{k: v for k, v in timeouts.items() if base_timeouts.get(k, object()) != v},
+            }
+        # A live snapshot is re-merged for this context's challenge, so
+        # challenge_specific_configs overrides survive hot reload.
+        return resolve_loop_settings(task_config_of(full_config), call_timeouts, config)
+
+    settings = resolve_settings()
+    settings_version = config_watcher.version if config_watcher else 0
+    retry_cap = None
+
+    # Near-duplicates of prompts that already lost on this model are skipped or
+    # run with a smaller budget, depending on the configured policy.
+    current_prompt_id = prompt_id(text)
+    prompt_dedup = getattr(self, "prompt_dedup", None)
+    if prompt_dedup is not None:
+        verdict = prompt_dedup.check(text, model_name)
+        if verdict["action"] == "skip":
+            return {
+                "attempts": 0,
+                "error_refreshes": 0,
+                "outcomes": {},
+                "page_recoveries": 0,
+                "skipped": verdict,
+            }
+        if verdict["action"] == "deprioritize":
+            retry_cap = prompt_dedup.deprioritized_max_retries
+
+    def effective_max_retries() -> int:
+        if retry_cap is None:
+            return settings.retry.max_retries
+        return min(settings.retry.max_retries, retry_cap)
+
+    max_retries = effective_max_retries()
+
+    challenge_name = getattr(self, "challenge_name", None)
+    text_insertion = (getattr(self, "automation_settings", None) or {}).get("text_insertion")
+
+    # A shared rate limiter, when configured, replaces the fixed per-worker delays.
+    rate_limiter = getattr(self, "rate_limiter", None)
+
+    async def acquire_rate_limit(action: str):
+        if rate_limiter is not None:
+            await rate_limiter.acquire(
+                action,
+                host=urlparse(self.page.url).hostname,
+                challenge=challenge_name,
+                model=model_name,
+            )
+
+    # Live dashboard, when attached: the current phase is a plain attribute
+    # write, so tracking costs nothing measurable per attempt.
+    worker_state = getattr(self, "worker_state", None)
+    if worker_state is not None:
+        worker_state.model = model_name
+
+    def enter_phase(phase: str):
+        if worker_state is not None:
+            worker_state.enter(phase, attempt_count)
+
+    async def pause_between_attempts(log_key: str, log_default: str):
+        if rate_limiter is not None:
+            return
+        enter_phase("pause")
+        if settings.retry.random_delay:
+            delay = random.uniform(settings.retry.delay_min_sec, settings.retry.delay_max_sec)
+        else:
+            delay = settings.retry.delay_min_sec
+        logging.info(settings.messages.get(log_key, log_default).format(delay=delay))
+        await self.page.wait_for_timeout(delay * 1000)
+
+    # Error refreshes back off with decorrelated jitter so workers that fail
+    # together do not reload in lockstep; a success resets the backoff.
+    error_backoff = DecorrelatedJitterBackoff(settings.retry.error_refresh_delay_sec, settings.retry.error_refresh_max_delay_sec)
+    breakers = getattr(self, "circuit_breakers", None)
+    breaker = breakers.get(urlparse(self.page.url).hostname) if breakers else None
+    holding_probe = False
+
+    async def breaker_gate():
+        """Parks while the host's breaker is open; may make this worker the probe."""
+        nonlocal holding_probe
+        if breaker is None or holding_probe:
+            return
+        holding_probe = await breaker.acquire()
+
+    def breaker_result(ok: bool):
+        nonlocal holding_probe
+        if breaker is None:
+            return
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        holding_probe = False
+
+    # With a BrowserManager attached, a crashed, closed or hung page is swapped
+    # for a fresh one instead of burning error refreshes on a dead tab.
+    browser_manager = getattr(self, "browser_manager", None)
+    page_recoveries = 0
+
+    async def recover_unhealthy_page() -> bool:
+        nonlocal page_recoveries
+        if browser_manager is None or await browser_manager.is_page_healthy(self.page):
+            return False
+        enter_phase("recover_page")
+        try:
+            self.page = await browser_manager.recover_page(
+                self.page, ready_selector=settings.selectors.textarea, ready_timeout_ms=settings.timeouts.prompt_visible_ms
+            )
+        except Exception as e:
+            logging.error(f"Could not recover page: {e}")
+            return False
+        page_recoveries += 1
+        return True
+
+    page_recycler = getattr(self, "page_recycler", None)
+    # Ring-buffered Playwright tracing; only failing attempts are kept.
+    tracer = getattr(self, "attempt_tracer", None)
+
+    # Preparation for the next attempt that does not need the page (today: the
+    # next submit's rate-limit token) overlaps with waiting on this one.
+    pipeline = Pipeline()
 
     attempt_count = 0
     error_refresh_count = 0
-    
-    while attempt_count < max_retries:
-        attempt_count += 1
-        logging.info(task_logging.get("starting_attempt", "Starting attempt {attempt}/{max_retries}").format(
-            attempt=attempt_count, max_retries=max_retries
+
+    async def refresh_after_error():
+        nonlocal error_refresh_count
+        error_refresh_count += 1
+        enter_phase("refresh")
+        logging.info(settings.messages.get("error_refresh_triggered", "Error occurred, refreshing page and continuing (error refresh {count}/{max})").format(
+            count=error_refresh_count, max=settings.retry.max_error_refreshes
         ))
+        # Wait before refreshing
+        await self.page.wait_for_timeout(error_backoff.next_delay() * 1000)
+        await breaker_gate()
+        await acquire_rate_limit("reload")
+        await self.page.reload()
+        logging.info(settings.messages.get("error_refresh_completed", "Page refreshed after error, continuing workflow"))
+        # Wait for page to load after refresh
+        await self.page.wait_for_timeout(settings.timeouts.post_refresh_wait_ms)
+    outcome_counts: dict[str, int] = {}
 
-        try:
-            # Select model from dropdown first (if model_name is provided)
-            if model_name:
-                await select_model_from_dropdown(self, model_name, timeouts, config)
-            
-            # Fill the intent textarea
-            logging.info(task_logging.get("filling_textarea", "Filling intent textarea for agent-track-submit"))
-            textarea = self.page.locator(textarea_selector)
-            await textarea.wait_for(state="visible", timeout=prompt_visible_ms)
-            await textarea.fill(text)
-
-            # Submit the template
-            logging.info(task_logging.get("waiting_submit_button", "Waiting for 'Submit Template' button to enable, then clicking"))
-            submit_button = self.page.locator(submit_button_selector)
-            await submit_button.wait_for(state="visible", timeout=prompt_visible_ms)
-
-            if not task_flags.get("skip_submit_enable_wait", False):
-                start_time = time.time()
-                polling_interval = task_timeouts.get("polling_interval_ms", 200)
-                enable_wait_fallback = task_timeouts.get("enable_wait_fallback_ms", 30000)
-                while True:
+    # Known-bad states (rate limit, 5xx, logged out, refusal) end a wait early
+    # and map to an action instead of running into the full timeout.
+    outcome_classifier = getattr(self, "outcome_classifier", None)
+    relogins = 0
+
+    async def apply_verdict(verdict) -> bool:
+        """Carries out a classified state's action; False means stop the loop."""
+        nonlocal relogins
+        logging.warning(f"🚦 Classified {verdict.state} ({verdict.evidence}); action: {verdict.action}")
+        if verdict.action == "retry":
+            enter_phase("try_again")
+            try_again = self.page.locator(settings.selectors.try_again_button)
+            if await try_again.is_visible():
+                await try_again.click(timeout=settings.timeouts.try_again_click_ms)
+            else:
+                await acquire_rate_limit("reload")
+                await self.page.reload()
+                await self.page.wait_for_timeout(settings.timeouts.post_refresh_wait_ms)
+            await pause_between_attempts("waiting_before_next", "Waiting {delay:.2f} seconds before next attempt")
+            return True
+        if verdict.action == "backoff":
+            enter_phase("backoff")
+            delay = error_backoff.next_delay()
+            logging.info(f"Backing off {delay:.1f}s before reloading")
+            await self.page.wait_for_timeout(delay * 1000)
+            await breaker_gate()
+            await acquire_rate_limit("reload")
+            await self.page.reload()
+            await self.page.wait_for_timeout(settings.timeouts.post_refresh_wait_ms)
+            return True
+        if verdict.action == "refresh":
+            if error_refresh_count >= settings.retry.max_error_refreshes:
+                return False
+            await refresh_after_error()
+            return True
+        if verdict.action == "relogin":
+            # One re-login per failure streak: expiring again straight after a
+            # fresh snapshot means the source profile is logged out too.
+            if browser_manager is not None and relogins == 0:
+                enter_phase("relogin")
+                try:
+                    fresh = await browser_manager.reauthenticate(
+                        self.page,
+                        url=(getattr(self, "config", None) or {}).get("base_url"),
+                        ready_selector=settings.selectors.textarea,
+                        ready_timeout_ms=settings.timeouts.prompt_visible_ms,
+                    )
+                except Exception as e:
+                    logging.error(f"Could not restore the session from the stored login: {e}")
+                    fresh = None
+                if fresh is not None:
+                    relogins += 1
+                    self.page = fresh
+                    logging.info("🔑 Restored the session from a refreshed storage-state snapshot")
+                    return True
+            logging.error("Session expired and no stored login is available; stopping instead of retrying")
+        return False
+
+    async def classify_page():
+        if outcome_classifier is None:
+            return None
+        return await outcome_classifier.check(self.page)
+
+    attempt_recorded = False
+
+    def record_attempt(outcome: str, attempt_started: float, submitted_at: float | None, action: str | None = None):
+        nonlocal attempt_recorded, relogins
+        if attempt_recorded:
+            return
+        attempt_recorded = True
+        now = time.time()
+        outcome_counts[outcome] = outcome_counts.get(outcome, 0) + 1
+        # A classified refusal or failing verdict is still the judge answering:
+        # only states that point at the host (backoff, refresh, relogin) or an
+        # unclassified timeout/error count against its breaker.
+        judged = outcome == "try_again" or action == "retry"
+        if judged:
+            error_backoff.reset()
+            relogins = 0
+        breaker_result(judged if action is None else action not in HOST_FAILURE_ACTIONS)
+        if tracer is not None:
+            tracer.mark(outcome)
+        _notify_attempt(self, {
+            "ts": now,
+            "challenge": challenge_name,
+            "model": model_name,
+            "prompt_id": current_prompt_id,
+            "attempt": attempt_count,
+            "outcome": outcome,
+            "latency_ms": round((now - submitted_at) * 1000) if submitted_at else None,
+            "duration_ms": round((now - attempt_started) * 1000),
+            "error_refreshes": error_refresh_count,
+        })
+
+    try:
+        while attempt_count < max_retries:
+            if config_watcher is not None and config_watcher.version != settings_version:
+                # Attempt boundary: nothing is in flight, so new settings apply cleanly.
+                settings = resolve_settings()
+                settings_version = config_watcher.version
+                max_retries = effective_max_retries()
+                error_backoff = DecorrelatedJitterBackoff(
+                    settings.retry.error_refresh_delay_sec, settings.retry.error_refresh_max_delay_sec
+                )
+                logging.info(f"Applied config version {settings_version} before attempt {attempt_count + 1}")
+                if attempt_count >= max_retries:
+                    break
+            attempt_count += 1
+            attempt_started = time.time()
+            submitted_at = None
+            attempt_recorded = False
+            enter_phase("start")
+            logging.info(settings.messages.get("starting_attempt", "Starting attempt {attempt}/{max_retries}").format(
+                attempt=attempt_count, max_retries=max_retries
+            ))
+
+            try:
+                if page_recycler is not None:
+                    # Attempt boundary: nothing is in flight, so a swap loses no work.
                     try:
-                        if not await submit_button.is_disabled():
+                        self.page = await page_recycler.maybe_recycle(
+                            self.page, settings.selectors.textarea, settings.timeouts.prompt_visible_ms
+                        )
+                    except Exception as e:
+                        logging.warning(f"Page recycle failed, keeping current page: {e}")
+
+                if tracer is not None:
+                    await tracer.begin(self.page, f"attempt-{attempt_count}")
+
+                await breaker_gate()
+
+                # Select model from dropdown first (if model_name is provided)
+                if model_name:
+                    enter_phase("select_model")
+                    await select_model_from_dropdown(self, model_name, settings=settings)
+            
+                # Fill the intent textarea
+                enter_phase("fill")
+                logging.info(settings.messages.get("filling_textarea", "Filling intent textarea for agent-track-submit"))
+                textarea = self.page.locator(settings.selectors.textarea)
+                await textarea.wait_for(state="visible", timeout=settings.timeouts.prompt_visible_ms)
+                await insert_text(self.page, textarea, text, text_insertion, browser_manager)
+
+                # Submit the template
+                enter_phase("submit")
+                logging.info(settings.messages.get("waiting_submit_button", "Waiting for 'Submit Template' button to enable, then clicking"))
+                submit_button = self.page.locator(settings.selectors.submit_button)
+                await submit_button.wait_for(state="visible", timeout=settings.timeouts.prompt_visible_ms)
+
+                if not settings.flags.skip_submit_enable_wait:
+                    start_time = time.time()
+                    polling_interval = settings.timeouts.polling_interval_ms
+                    enable_wait_fallback = settings.timeouts.enable_wait_fallback_ms
+                    while True:
+                        try:
+                            if not await submit_button.is_disabled():
+                                break
+                        except Exception:
+                            pass
+                        if (time.time() - start_time) * 1000 > (settings.timeouts.enable_wait_ms or enable_wait_fallback):
+                            logging.warning(settings.messages.get("button_timeout_warning", "'Submit Template' button did not enable within timeout; attempting click anyway"))
                             break
-                    except Exception:
-                        pass
-                    if (time.time() - start_time) * 1000 > (enable_wait_ms or enable_wait_fallback):
-                        logging.warning(task_logging.get("button_timeout_warning", "'Submit Template' button did not enable within timeout; attempting click anyway"))
-                        break
-                    await self.page.wait_for_timeout(polling_interval)
+                        await self.page.wait_for_timeout(polling_interval)
 
-            await submit_button.click(timeout=submit_click_ms)
+                if rate_limiter is not None:
+                    await pipeline.take("submit_token", lambda: acquire_rate_limit("submit"))
+                await submit_button.click(timeout=settings.timeouts.submit_click_ms)
+                submitted_at = time.time()
+                if rate_limiter is not None and attempt_count < max_retries:
+                    pipeline.prefetch("submit_token", acquire_rate_limit("submit"))
 
-            # Wait for the "Try Again" button to appear
-            logging.info(task_logging.get("waiting_try_again", "Waiting for 'Try Again' button to appear"))
-            try_again_button = self.page.locator(try_again_button_selector)
+                # Wait for the "Try Again" button to appear
+                enter_phase("wait_outcome")
+                logging.info(settings.messages.get("waiting_try_again", "Waiting for 'Try Again' button to appear"))
+                try_again_button = self.page.locator(settings.selectors.try_again_button)
 
-            # Wait for the button to be visible with extended timeout. If it doesn't appear, continue to next attempt.
-            if not task_flags.get("skip_wait_try_again_visible", False):
-                try:
-                    await try_again_button.wait_for(state="visible", timeout=try_again_button_visible_ms)
-                except PlaywrightTimeoutError:
-                    # Timeout waiting for 'Try Again'. If configured, refresh the page before continuing.
-                    if refresh_on_error and error_refresh_count < max_error_refreshes:
-                        error_refresh_count += 1
-                        logging.info(task_logging.get("error_refresh_triggered", "Error occurred, refreshing page and continuing (error refresh {count}/{max})").format(
-                            count=error_refresh_count, max=max_error_refreshes
-                        ))
-                        await self.page.wait_for_timeout(error_refresh_delay_sec * 1000)
-                        await self.page.reload()
-                        logging.info(task_logging.get("error_refresh_completed", "Page refreshed after error, continuing workflow"))
-                        await self.page.wait_for_timeout(task_timeouts.get("post_refresh_wait_ms", 2000))
-                    else:
-                        # Apply delay between attempts if not refreshing
-                        if random_delay:
-                            delay = random.uniform(delay_min_sec, delay_max_sec)
+                # Wait for the button to be visible with extended timeout. If it doesn't appear, continue to next attempt.
+                if not settings.flags.skip_wait_try_again_visible:
+                    verdict = None
+                    try:
+                        if outcome_classifier is None:
+                            await try_again_button.wait_for(state="visible", timeout=settings.timeouts.try_again_visible_ms)
                         else:
-                            delay = delay_min_sec
-                        logging.info(task_logging.get("waiting_before_next", "Waiting {delay:.2f} seconds before next attempt").format(
-                            delay=delay
+                            verdict = await outcome_classifier.wait(
+                                self.page, {"try_again": try_again_button}, settings.timeouts.try_again_visible_ms
+                            )
+                            if verdict.state == "timeout":
+                                raise PlaywrightTimeoutError(verdict.evidence)
+                    except PlaywrightTimeoutError:
+                        record_attempt("timeout", attempt_started, submitted_at)
+                        if await recover_unhealthy_page():
+                            continue
+                        # Timeout waiting for 'Try Again'. If configured, refresh the page before continuing.
+                        if settings.retry.refresh_on_error and error_refresh_count < settings.retry.max_error_refreshes:
+                            await refresh_after_error()
+                        else:
+                            # Apply delay between attempts if not refreshing
+                            await pause_between_attempts("waiting_before_next", "Waiting {delay:.2f} seconds before next attempt")
+                        continue
+                    except Exception as e:
+                        # Non-timeout error (frame detach, navigation, etc.). Log and refresh if configured.
+                        record_attempt("error", attempt_started, submitted_at)
+                        logging.error(settings.messages.get("error_during_attempt", "Error during attempt {attempt}: {error}").format(
+                            attempt=attempt_count, error=f"Try Again wait failed: {str(e)}"
                         ))
-                        await self.page.wait_for_timeout(delay * 1000)
-                    continue
-                except Exception as e:
-                    # Non-timeout error (frame detach, navigation, etc.). Log and refresh if configured.
-                    logging.error(task_logging.get("error_during_attempt", "Error during attempt {attempt}: {error}").format(
-                        attempt=attempt_count, error=f"Try Again wait failed: {str(e)}"
+                        if await recover_unhealthy_page():
+                            continue
+                        if settings.retry.refresh_on_error and error_refresh_count < settings.retry.max_error_refreshes:
+                            await refresh_after_error()
+                            continue
+                        raise
+                    if verdict is not None and verdict.action is not None:
+                        record_attempt(verdict.state, attempt_started, submitted_at, verdict.action)
+                        if attempt_count < max_retries and await apply_verdict(verdict):
+                            continue
+                        break
+
+                record_attempt("try_again", attempt_started, submitted_at)
+
+                # Check if we've reached max retries
+                if attempt_count >= max_retries:
+                    logging.info(settings.messages.get("reached_max_retries", "Reached maximum retries ({max_retries}). Stopping.").format(
+                        max_retries=max_retries
                     ))
-                    if refresh_on_error and error_refresh_count < max_error_refreshes:
-                        error_refresh_count += 1
-                        logging.info(task_logging.get("error_refresh_triggered", "Error occurred, refreshing page and continuing (error refresh {count}/{max})").format(
-                            count=error_refresh_count, max=max_error_refreshes
-                        ))
-                        await self.page.wait_for_timeout(error_refresh_delay_sec * 1000)
-                        await self.page.reload()
-                        logging.info(task_logging.get("error_refresh_completed", "Page refreshed after error, continuing workflow"))
-                        await self.page.wait_for_timeout(task_timeouts.get("post_refresh_wait_ms", 2000))
-                        continue
-                    raise
+                    break
             
-            # Check if we've reached max retries
-            if attempt_count >= max_retries:
-                logging.info(task_logging.get("reached_max_retries", "Reached maximum retries ({max_retries}). Stopping.").format(
-                    max_retries=max_retries
+                # Click the "Try Again" button
+                logging.info(settings.messages.get("clicking_try_again", "Clicking 'Try Again' button (attempt {attempt})").format(
+                    attempt=attempt_count
                 ))
-                break
-            
-            # Click the "Try Again" button
-            logging.info(task_logging.get("clicking_try_again", "Clicking 'Try Again' button (attempt {attempt})").format(
-                attempt=attempt_count
-            ))
-            await try_again_button.click(timeout=try_again_button_click_ms)
-            
-            # Apply delay between attempts
-            if random_delay:
-                delay = random.uniform(delay_min_sec, delay_max_sec)
-            else:
-                delay = delay_min_sec
-            
-            logging.info(task_logging.get("waiting_before_next", "Waiting {delay:.2f} seconds before next attempt").format(
-                delay=delay
-            ))
-            await self.page.wait_for_timeout(delay * 1000)
-            
-        except Exception as e:
-            logging.error(task_logging.get("error_during_attempt", "Error during attempt {attempt}: {error}").format(
-                attempt=attempt_count, error=str(e)
-            ))
+                enter_phase("try_again")
+                await try_again_button.click(timeout=settings.timeouts.try_again_click_ms)
             
-            # Handle error refresh if enabled
-            if refresh_on_error and error_refresh_count < max_error_refreshes:
-                error_refresh_count += 1
-                logging.info(task_logging.get("error_refresh_triggered", "Error occurred, refreshing page and continuing (error refresh {count}/{max})").format(
-                    count=error_refresh_count, max=max_error_refreshes
-                ))
-                
-                # Wait before refreshing
-                await self.page.wait_for_timeout(error_refresh_delay_sec * 1000)
-                
-                # Refresh the page
-                await self.page.reload()
-                logging.info(task_logging.get("error_refresh_completed", "Page refreshed after error, continuing workflow"))
-                
-                # Wait for page to load after refresh
-                await self.page.wait_for_timeout(task_timeouts.get("post_refresh_wait_ms", 2000))
-                
-                # Continue to next attempt without incrementing attempt count
-                continue
-            elif refresh_on_error and error_refresh_count >= max_error_refreshes:
-                logging.error(task_logging.get("error_refresh_limit_reached", "Maximum error refreshes ({max}) reached, stopping workflow").format(
-                    max=max_error_refreshes
-                ))
-                break
+                # Apply delay between attempts
+                await pause_between_attempts("waiting_before_next", "Waiting {delay:.2f} seconds before next attempt")
             
-            if attempt_count >= max_retries:
-                logging.error(task_logging.get("error_max_retries", "Reached maximum retries ({max_retries}). Stopping due to error.").format(
-                    max_retries=max_retries
+            except Exception as e:
+                logging.error(settings.messages.get("error_during_attempt", "Error during attempt {attempt}: {error}").format(
+                    attempt=attempt_count, error=str(e)
                 ))
-                break
+                # An error is often the symptom (no textarea while logged out,
+                # a 502 page); the classifier names the cause when it can.
+                verdict = None if attempt_recorded else await classify_page()
+                record_attempt(verdict.state if verdict else "error", attempt_started, submitted_at, verdict.action if verdict else None)
+                if verdict is not None:
+                    if attempt_count < max_retries and await apply_verdict(verdict):
+                        continue
+                    break
+                if await recover_unhealthy_page():
+                    continue
+
+                # Handle error refresh if enabled
+                if settings.retry.refresh_on_error and error_refresh_count < settings.retry.max_error_refreshes:
+                    await refresh_after_error()
+                    # Continue to next attempt without incrementing attempt count
+                    continue
+                elif settings.retry.refresh_on_error and error_refresh_count >= settings.retry.max_error_refreshes:
+                    logging.error(settings.messages.get("error_refresh_limit_reached", "Maximum error refreshes ({max}) reached, stopping workflow").format(
+                        max=settings.retry.max_error_refreshes
+                    ))
+                    break
             
-            # Wait before retrying on error
-            if random_delay:
-                delay = random.uniform(delay_min_sec, delay_max_sec)
-            else:
-                delay = delay_min_sec
+                if attempt_count >= max_retries:
+                    logging.error(settings.messages.get("error_max_retries", "Reached maximum retries ({max_retries}). Stopping due to error.").format(
+                        max_retries=max_retries
+                    ))
+                    break
             
-            logging.info(task_logging.get("waiting_after_error", "Waiting {delay:.2f} seconds before retrying after error").format(
-                delay=delay
-            ))
-            await self.page.wait_for_timeout(delay * 1000)
+                # Wait before retrying on error
+                await pause_between_attempts("waiting_after_error", "Waiting {delay:.2f} seconds before retrying after error")
+    finally:
+        enter_phase("idle")
+        pipeline.cancel_all()
+        if tracer is not None:
+            # Closes the last chunk; one left unmarked by an escaping exception
+            # is kept as "unknown".
+            await tracer.end()
 
-    logging.info(task_logging.get("completed_retry", "Completed agent_track_submit_with_retry after {attempts} attempts").format(
+    logging.info(settings.messages.get("completed_retry", "Completed agent_track_submit_with_retry after {attempts} attempts").format(
         attempts=attempt_count
     ))
+    if pipeline.stats.steps:
+        logging.info(f"Pipelined preparation saved {pipeline.stats.saved_sec():.2f}s: {pipeline.stats.summary()}")
+    return {
+        "attempts": attempt_count,
+        "error_refreshes": error_refresh_count,
+        "outcomes": outcome_counts,
+        "page_recoveries": page_recoveries,
+        "pipeline": pipeline.stats.summary(),
+    }
 
 __all__ = ["agent_track_submit_with_retry"]
 
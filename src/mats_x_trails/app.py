@@ -1,32 +1,383 @@
 import asyncio
 import argparse
+import contextlib
 import logging
 import os
+import socket
 from playwright.async_api import async_playwright
 
-from .config_loader import load_config
-from ..browser import BrowserManager
-from .agent_track_submit_retry import agent_track_submit_with_retry
+from .config_loader import get_challenge_config, load_config, resolve_config_path
+from .settings import validate_config
+from ..browser import BrowserManager, PageRecycler
+from .agent_track_submit_retry import agent_track_submit_with_retry, run_agent_track_machine
+from .job_queue import JobQueue
+from .history import AttemptHistory
+from .prompt_dedup import PromptDedup
+from .mutation import MutationGenerator
+from .prompt_dedup import prompt_id
+from . import sharding
+from ..rate_limit import RateLimiter
+from ..backoff import CircuitBreakerRegistry
+from ..resource_sampler import ResourceSampler
+from ..profiling import ProfileSession
+from ..tracing import TracingService
+from ..config_watch import ConfigWatcher
+from ..outcome_classifier import OutcomeClassifier
+from .dashboard import Dashboard
 
 
-async def run_agent_track_submit_retry(connect_to_existing_browser: bool = True, text: str = "", model: str = None):
+class TaskContext:
+    """Minimal executor-like object handed to the task functions as ``self``."""
+
+    def __init__(self, page, config, automation_settings, challenge_name: str | None = None):
+        self.page = page
+        self.config = config
+        self.automation_settings = automation_settings
+        self.challenge_name = challenge_name
+        # Callables invoked with a record dict after every attempt.
+        self.attempt_listeners: list = []
+        # Shared pacing for submits and reloads; None falls back to fixed delays.
+        self.rate_limiter = None
+        # Per-host circuit breakers shared by all workers; None disables them.
+        self.circuit_breakers = None
+        # Lets the task swap in a fresh page after a crash or hang.
+        self.browser_manager = None
+        # Recycling policy of the page this context runs on; None never recycles.
+        self.page_recycler = None
+        # Per-worker ring of Playwright trace chunks; None disables tracing.
+        self.attempt_tracer = None
+        # Near-duplicate check against prompts that already failed; None disables it.
+        self.prompt_dedup = None
+        # Live config snapshots applied at attempt boundaries; None disables hot reload.
+        self.config_watcher = None
+        # Phase and attempt shown on the live dashboard; None when it is off.
+        self.worker_state = None
+        # Spots rate limits, 5xx and expired sessions while waiting; None waits out timeouts.
+        self.outcome_classifier = None
+
+
+class SharedServices:
+    """Cross-worker helpers built once per process and attached to every TaskContext."""
+
+    def __init__(
+        self,
+        automation_settings: dict,
+        browser_manager: BrowserManager | None = None,
+        config: dict | None = None,
+    ):
+        self.automation_settings = automation_settings
+        self.browser_manager = browser_manager
+        hot_reload = automation_settings.get("hot_reload") or {}
+        self.config_watcher = None
+        if config is not None and hot_reload.get("enabled", False):
+            self.config_watcher = ConfigWatcher(
+                resolve_config_path(),
+                config,
+                validate_config,
+                poll_interval_sec=hot_reload.get("poll_interval_sec", 1.0),
+            )
+        self.rate_limiter = RateLimiter.from_settings(automation_settings.get("rate_limits"))
+        self.circuit_breakers = CircuitBreakerRegistry.from_settings(
+            automation_settings.get("circuit_breaker")
+        )
+        self.tracing = TracingService.from_settings(automation_settings.get("tracing"))
+        self.history = AttemptHistory.from_settings(automation_settings.get("history"))
+        self.prompt_dedup = PromptDedup.from_settings(
+            automation_settings.get("prompt_dedup"), self.history
+        )
+        self.dashboard = Dashboard.from_settings(automation_settings.get("dashboard"))
+        self.outcome_classifier = OutcomeClassifier.from_settings(
+            automation_settings.get("outcome_classifier")
+        )
+        self._page_recyclers: list[PageRecycler] = []
+
+    def page_recycler(self, page) -> PageRecycler | None:
+        """The recycling policy for ``page``, shared by every job that runs on it."""
+        for recycler in self._page_recyclers:
+            if recycler.page is page:
+                return recycler
+        recycler = PageRecycler.from_settings(
+            self.browser_manager, self.automation_settings.get("recycling")
+        )
+        if recycler:
+            recycler.page = page
+            self._page_recyclers.append(recycler)
+        return recycler
+
+    def attach(self, ctx: TaskContext) -> TaskContext:
+        ctx.rate_limiter = self.rate_limiter
+        ctx.circuit_breakers = self.circuit_breakers
+        ctx.browser_manager = self.browser_manager
+        ctx.page_recycler = self.page_recycler(ctx.page)
+        if ctx.page_recycler:
+            ctx.attempt_listeners.append(ctx.page_recycler.on_attempt)
+        ctx.attempt_tracer = self.tracing.tracer() if self.tracing else None
+        ctx.prompt_dedup = self.prompt_dedup
+        ctx.outcome_classifier = self.outcome_classifier
+        if self.config_watcher:
+            self.config_watcher.start()
+            ctx.config_watcher = self.config_watcher
+        if self.history:
+            ctx.attempt_listeners.append(self.history.on_attempt)
+        if self.prompt_dedup:
+            ctx.attempt_listeners.append(self.prompt_dedup.on_attempt)
+        if self.dashboard:
+            self.dashboard.track(ctx)
+            self.dashboard.start()
+        return ctx
+
+    def close(self):
+        if self.dashboard:
+            self.dashboard.stop()
+        if self.config_watcher:
+            self.config_watcher.stop()
+        if self.tracing:
+            self.tracing.close()
+        if self.history:
+            self.history.close()
+        if self.prompt_dedup:
+            self.prompt_dedup.close()
+
+
+def load_prompt_text(rel_path: str) -> str:
+    """Reads a prompt file, resolving relative paths against this package directory."""
+    base_dir = os.path.dirname(__file__)
+    prompt_path = os.path.join(base_dir, rel_path)
+    with open(prompt_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def resolve_prompt_ref(prompt_ref: str) -> str:
+    """Turns a queued prompt reference into text: ``text:...`` inline, else a file."""
+    if prompt_ref.startswith("text:"):
+        return prompt_ref[len("text:"):]
+    return load_prompt_text(prompt_ref)
+
+
+def report_page_recovery(browser_manager: BrowserManager):
+    recovery = browser_manager.recovery_summary()
+    if recovery["recoveries"]:
+        print(
+            f"♻️ Page recoveries: {recovery['recoveries']}, "
+            f"MTTR {recovery['mttr_sec']:.2f}s, max {recovery['max_sec']:.2f}s"
+        )
+
+
+def start_resource_sampler(browser_manager: BrowserManager, automation_settings: dict):
+    """Starts the background resource sampler when ``resource_sampler.enabled`` is set."""
+    sampler = ResourceSampler.from_settings(
+        browser_manager, automation_settings.get("resource_sampler")
+    )
+    if sampler:
+        sampler.start()
+    return sampler
+
+
+def owns_single_run(config: dict, shard: sharding.Shard | None, runner: str, text: str, model: str | None) -> bool:
+    """A one-prompt run belongs to exactly one shard; the others record it and stand down."""
+    pid = prompt_id(text)
+    item = {"key": sharding.item_key(None, pid, model), "prompt_id": pid, "model": model}
+    path = sharding.manifest_path(sharding.history_path(config))
+    if sharding.plan(shard, runner, [item], path):
+        return True
+    logging.info(f"Prompt {pid} x {model} belongs to another shard; nothing to do on shard {shard}")
+    return False
+
+
+def profile_session(prefix: str | None):
+    """A ProfileSession when ``--profile`` was given, otherwise a no-op context."""
+    return ProfileSession(prefix) if prefix else contextlib.nullcontext()
+
+
+async def run_agent_track_submit_retry(
+    connect_to_existing_browser: bool = True, text: str = "", model: str = None, shard: sharding.Shard | None = None
+):
+    config = load_config()
+    if not config or not owns_single_run(config, shard, "app", text, model):
+        return
+    automation_settings = config.get("automation_settings", {})
+    async with async_playwright() as playwright:
+        browser_manager = BrowserManager(playwright, config)
+        page = await browser_manager.get_page(connect_to_existing=connect_to_existing_browser)
+        if not page:
+            print("Failed to initialize browser or page. Exiting.")
+            return
+        services = SharedServices(automation_settings, browser_manager, config)
+        ctx = services.attach(TaskContext(page, config, automation_settings))
+        sampler = start_resource_sampler(browser_manager, automation_settings)
+        try:
+            await agent_track_submit_with_retry(ctx, text, model, automation_settings.get("timeouts", {}))
+        finally:
+            if sampler:
+                await sampler.stop()
+            services.close()
+            report_page_recovery(browser_manager)
+
+
+async def run_state_machine(
+    connect_to_existing_browser: bool = True,
+    name: str = "agent_track_submit",
+    text: str = "",
+    model: str = None,
+    shard: sharding.Shard | None = None,
+):
+    """Runs one prompt through a declarative state machine and logs its per-transition timings."""
+    config = load_config()
+    if not config or not owns_single_run(config, shard, "machine", text, model):
+        return
+    automation_settings = config.get("automation_settings", {})
+    async with async_playwright() as playwright:
+        browser_manager = BrowserManager(playwright, config)
+        page = await browser_manager.get_page(connect_to_existing=connect_to_existing_browser)
+        if not page:
+            print("Failed to initialize browser or page. Exiting.")
+            return
+        services = SharedServices(automation_settings, browser_manager, config)
+        ctx = services.attach(TaskContext(page, config, automation_settings))
+        sampler = start_resource_sampler(browser_manager, automation_settings)
+        try:
+            summary = await run_agent_track_machine(ctx, text, model, name)
+            for transition, timing in summary["transitions"].items():
+                logging.info(f"   {transition}: {timing['count']}x, mean {timing['mean_ms']}ms, max {timing['max_ms']}ms")
+        finally:
+            if sampler:
+                await sampler.stop()
+            services.close()
+            report_page_recovery(browser_manager)
+
+
+async def _keep_lease(queue: JobQueue, job, visibility_timeout_sec: float):
+    """Extends the job lease periodically so long runs are not handed to another worker."""
+    while True:
+        await asyncio.sleep(visibility_timeout_sec / 3)
+        if not queue.extend_lease(job, visibility_timeout_sec):
+            logging.warning(f"Lease on job {job.id} was lost to another worker.")
+            return
+
+
+async def run_queue_worker(
+    connect_to_existing_browser: bool = True,
+    queue_path: str = "",
+    challenge: str | None = None,
+    drain: bool = False,
+):
+    """Consumes jobs from the durable queue until it is empty (``drain``) or forever."""
+    config = load_config()
+    if not config:
+        return
+    automation_settings = config.get("automation_settings", {})
+    queue_settings = config.get("job_queue", {})
+    visibility_timeout_sec = queue_settings.get("visibility_timeout_sec", 600)
+    poll_interval_sec = queue_settings.get("poll_interval_sec", 5)
+    retry_delay_sec = queue_settings.get("retry_delay_sec", 30)
+    queue = JobQueue(
+        queue_path or queue_settings.get("path", "hap_jobs.sqlite3"),
+        queue_settings.get("max_deliveries", 3),
+    )
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    async with async_playwright() as playwright:
+        browser_manager = BrowserManager(playwright, config)
+        page = await browser_manager.get_page(connect_to_existing=connect_to_existing_browser)
+        if not page:
+            print("Failed to initialize browser or page. Exiting.")
+            return
+        services = SharedServices(automation_settings, browser_manager, config)
+        current_base_url = None
+        logging.info(f"Queue worker {worker_id} consuming from {queue.path}")
+        sampler = start_resource_sampler(browser_manager, automation_settings)
+        try:
+            while True:
+                job = queue.lease(worker_id, visibility_timeout_sec, challenge)
+                if job is None:
+                    if drain:
+                        logging.info("Queue drained; worker exiting.")
+                        break
+                    await asyncio.sleep(poll_interval_sec)
+                    continue
+
+                logging.info(f"Leased {job} (delivery {job.deliveries})")
+                heartbeat = asyncio.create_task(
+                    _keep_lease(queue, job, visibility_timeout_sec)
+                )
+                # Each job runs with its challenge's merged config, like an orchestrator job.
+                job_config = get_challenge_config(config, job.challenge) if job.challenge else config
+                job_settings = job_config.get("automation_settings", {})
+                ctx = services.attach(TaskContext(page, job_config, job_settings, job.challenge))
+                try:
+                    base_url = job_config.get("base_url")
+                    if base_url and base_url != current_base_url:
+                        await ctx.page.goto(base_url)
+                        current_base_url = base_url
+                    text = resolve_prompt_ref(job.prompt_ref)
+                    outcome = await agent_track_submit_with_retry(
+                        ctx,
+                        text,
+                        job.model,
+                        job_settings.get("timeouts", {}),
+                        {
+                            **job_config.get("agent_track_submit", {}).get("retry_settings", {}),
+                            "max_retries": job.retry_budget,
+                        },
+                    )
+                    result = {"worker": worker_id}
+                    if outcome.get("skipped"):
+                        result["skipped"] = outcome["skipped"]
+                    if not queue.complete(job, result):
+                        logging.warning(f"Job {job.id} was already finished elsewhere.")
+                except Exception as e:
+                    logging.error(f"Job {job.id} failed: {e}")
+                    queue.fail(job, str(e), retry_delay_sec)
+                finally:
+                    heartbeat.cancel()
+                    if services.dashboard:
+                        services.dashboard.untrack(ctx)
+                    # Recovery or recycling may have swapped the page during the job.
+                    page = ctx.page
+        finally:
+            queue.close()
+            if sampler:
+                await sampler.stop()
+            services.close()
+            report_page_recovery(browser_manager)
+
+
+async def run_mutation_campaign(
+    connect_to_existing_browser: bool = True,
+    model: str = None,
+    count: int | None = None,
+    shard: sharding.Shard | None = None,
+):
+    """Runs generated prompt variants one after another as they come off the buffer."""
     config = load_config()
     if not config:
         return
     automation_settings = config.get("automation_settings", {})
+    mutation_settings = config.setdefault("mutation", {})
+    if count is not None:
+        mutation_settings["count"] = count
+    generator = MutationGenerator.from_config(config, shard, model)
+    limits = {"max_retries": mutation_settings.get("variant_max_retries", 3)}
     async with async_playwright() as playwright:
         browser_manager = BrowserManager(playwright, config)
         page = await browser_manager.get_page(connect_to_existing=connect_to_existing_browser)
         if not page:
             print("Failed to initialize browser or page. Exiting.")
             return
-        class Dummy:
-            def __init__(self, page, config, automation_settings):
-                self.page = page
-                self.config = config
-                self.automation_settings = automation_settings
-        ctx = Dummy(page, config, automation_settings)
-        await agent_track_submit_with_retry(ctx, text, model, automation_settings.get("timeouts", {}))
+        services = SharedServices(automation_settings, browser_manager, config)
+        ctx = services.attach(TaskContext(page, config, automation_settings))
+        try:
+            async for variant in generator.variants():
+                logging.info(
+                    f"🧬 Variant {variant['variant_id']} of {variant['seed_ref']} "
+                    f"via {' > '.join(variant['transforms'])}"
+                )
+                await agent_track_submit_with_retry(
+                    ctx, variant["text"], model, automation_settings.get("timeouts", {}), limits
+                )
+        finally:
+            services.close()
+            report_page_recovery(browser_manager)
 
 
 async def main():
@@ -39,11 +390,7 @@ async def main():
             first_item = prompts_cfg[0] or {}
             rel_path = first_item.get("file")
             if isinstance(rel_path, str) and rel_path.strip():
-                # Resolve path relative to this package directory
-                base_dir = os.path.dirname(__file__)
-                prompt_path = os.path.join(base_dir, rel_path)
-                with open(prompt_path, "r", encoding="utf-8") as f:
-                    default_text = f.read()
+                default_text = load_prompt_text(rel_path)
     except Exception:
         # Fallback to the static default_text if anything goes wrong
         pass
@@ -52,9 +399,45 @@ async def main():
     parser.add_argument("--launch-browser", action="store_true")
     parser.add_argument("--text", type=str, default=default_text)
     parser.add_argument("--model", type=str, default=None)
+    parser.add_argument("--queue", type=str, default=None, help="Consume jobs from this SQLite job queue")
+    parser.add_argument("--challenge", type=str, default=None, help="Only lease queue jobs for this challenge")
+    parser.add_argument("--drain", action="store_true", help="Exit once the job queue is empty")
+    parser.add_argument(
+        "--profile", nargs="?", const="hap_profile", default=None, metavar="PREFIX",
+        help="Profile the run and write PREFIX.pstats/.collapsed/.coroutines.txt",
+    )
+    parser.add_argument(
+        "--mutate", nargs="?", type=int, const=-1, default=None, metavar="COUNT",
+        help="Run generated variants of the seed prompts (see the mutation config section)",
+    )
+    parser.add_argument(
+        "--machine", type=str, default=None, metavar="NAME",
+        help="Run the prompt through a declarative state machine (see state_machines.yaml)",
+    )
+    parser.add_argument(
+        "--shard", type=str, default=None, metavar="I/N",
+        help="Run only this machine's slice I of N of the work (by stable content hash)",
+    )
     args = parser.parse_args()
+    try:
+        shard = sharding.Shard.parse(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+    if shard is not None and args.queue:
+        parser.error("--shard applies when enqueuing (job_queue enqueue --shard); each machine consumes its own queue")
     connect_to_existing = not args.launch_browser
-    await run_agent_track_submit_retry(connect_to_existing, args.text, args.model)
+    with profile_session(args.profile):
+        if args.mutate is not None:
+            count = args.mutate if args.mutate >= 0 else None
+            await run_mutation_campaign(connect_to_existing, args.model, count, shard)
+            return
+        if args.machine:
+            await run_state_machine(connect_to_existing, args.machine, args.text, args.model, shard)
+            return
+        if args.queue:
+            await run_queue_worker(connect_to_existing, args.queue, args.challenge, args.drain)
+            return
+        await run_agent_track_submit_retry(connect_to_existing, args.text, args.model, shard)
 
 
 if __name__ == "__main__":
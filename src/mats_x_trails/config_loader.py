@@ -2,18 +2,36 @@ import yaml
 import os
 from typing import Any, Dict
 
+from .settings import validate_config
 
-def load_config(config_path: str = "src/mats_x_trails/config.yaml") -> Dict[str, Any] | None:
-    """Loads the YAML configuration file for mats_x_trails package."""
+
+DEFAULT_CONFIG_PATH = "src/mats_x_trails/config.yaml"
+
+
+def resolve_config_path(config_path: str = DEFAULT_CONFIG_PATH) -> str:
+    """The config file actually used: ``HAP_MATS_CONFIG_PATH`` replaces the default."""
     env_path = os.getenv("HAP_MATS_CONFIG_PATH")
-    if env_path and (config_path == "src/mats_x_trails/config.yaml" or not config_path):
-        config_path = env_path
+    if env_path and (config_path == DEFAULT_CONFIG_PATH or not config_path):
+        return env_path
+    return config_path
+
+
+def load_config(config_path: str = DEFAULT_CONFIG_PATH) -> Dict[str, Any] | None:
+    """Loads the YAML configuration file for mats_x_trails package."""
+    config_path = resolve_config_path(config_path)
     try:
         with open(config_path, "r") as f:
             config = yaml.safe_load(f)
             if not config:
                 print(f"Warning: {config_path} is empty or invalid.")
                 return None
+            errors = validate_config(config)
+            if errors:
+                # Report everything at once so a bad config fails before any browser work.
+                print(f"Error: {config_path} has {len(errors)} invalid setting(s):")
+                for error in errors:
+                    print(f"  - {error}")
+                return None
             return config
     except FileNotFoundError:
         print(f"Error: Configuration file '{config_path}' not found.")
@@ -0,0 +1,393 @@
+import asyncio
+import argparse
+import contextvars
+import itertools
+import json
+import logging
+import os
+import time
+from playwright.async_api import async_playwright
+
+from .config_loader import load_config
+from ..browser import BrowserManager
+from .agent_track_submit_retry import agent_track_submit_with_retry
+from .settings import resolve_loop_settings
+from .app import (
+    SharedServices,
+    TaskContext,
+    load_prompt_text,
+    profile_session,
+    start_resource_sampler,
+)
+
+
+DEFAULT_SOCKET_PATH = "/tmp/hap-mats-daemon.sock"
+
+# Prompts can be hundreds of kilobytes, so allow long JSON lines on the socket.
+_STREAM_LIMIT = 16 * 1024 * 1024
+
+# Loop types a job may request, keyed by the CLI command name.
+LOOPS = {
+    "agent-track-submit-retry": agent_track_submit_with_retry,
+}
+
+_current_job: contextvars.ContextVar = contextvars.ContextVar(
+    "hap_daemon_job", default=None
+)
+
+
+class _JobLogHandler(logging.Handler):
+    """Forwards log records emitted inside a job's task to that job's client."""
+
+    def emit(self, record):
+        job = _current_job.get()
+        if job is None or not job.streaming:
+            return
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        job.events.put_nowait(
+            {
+                "event": "log",
+                "job_id": job.job_id,
+                "level": record.levelname,
+                "message": message,
+            }
+        )
+
+
+class _Job:
+    def __init__(self, job_id: int, spec: dict, text: str):
+        self.job_id = job_id
+        self.spec = spec
+        self.text = text
+        self.events: asyncio.Queue = asyncio.Queue()
+        self.streaming = True
+
+
+class AutomationDaemon:
+    """
+    Keeps Playwright, the BrowserManager and a set of pages warm and runs jobs
+    submitted over a local Unix socket, one job per page at a time.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        socket_path: str | None = None,
+        page_count: int | None = None,
+        connect_to_existing: bool = True,
+    ):
+        self.config = config
+        self.automation_settings = config.get("automation_settings", {})
+        daemon_settings = config.get("daemon", {})
+        self.socket_path = socket_path or daemon_settings.get(
+            "socket_path", DEFAULT_SOCKET_PATH
+        )
+        self.page_count = max(1, int(page_count or daemon_settings.get("pages", 1)))
+        self.connect_to_existing = connect_to_existing
+        self.services = SharedServices(self.automation_settings, config=config)
+
+        self.browser_manager: BrowserManager | None = None
+        self.sampler = None
+        self._pages: asyncio.Queue = asyncio.Queue()
+        self._job_ids = itertools.count(1)
+        self._tasks: set[asyncio.Task] = set()
+        self._shutdown = asyncio.Event()
+        self._completed = 0
+        self._failed = 0
+
+    async def serve(self):
+        log_handler = _JobLogHandler()
+        log_handler.setFormatter(logging.Formatter("%(message)s"))
+        logging.getLogger().addHandler(log_handler)
+        try:
+            async with async_playwright() as playwright:
+                self.browser_manager = BrowserManager(playwright, self.config)
+                self.services.browser_manager = self.browser_manager
+                page = await self.browser_manager.get_page(
+                    connect_to_existing=self.connect_to_existing
+                )
+                if not page:
+                    print("Failed to initialize browser or page. Exiting.")
+                    return
+                await self._warm_pages(page)
+                self.sampler = start_resource_sampler(
+                    self.browser_manager, self.automation_settings
+                )
+
+                if os.path.exists(self.socket_path):
+                    os.unlink(self.socket_path)
+                server = await asyncio.start_unix_server(
+                    self._handle_client, path=self.socket_path, limit=_STREAM_LIMIT
+                )
+                print(
+                    f"Daemon listening on {self.socket_path} with "
+                    f"{self.page_count} warm page(s)"
+                )
+                async with server:
+                    await self._shutdown.wait()
+
+                for task in list(self._tasks):
+                    task.cancel()
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+                if self.sampler:
+                    await self.sampler.stop()
+                await self.browser_manager.close_page_pools()
+                self.services.close()
+        finally:
+            logging.getLogger().removeHandler(log_handler)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _warm_pages(self, page):
+        """Fills the page pool, pointing extra pages at the same challenge URL."""
+        self._pages.put_nowait(page)
+        target_url = self.config.get("base_url") or page.url
+        for _ in range(self.page_count - 1):
+            extra = await self.browser_manager.new_page()
+            if target_url and target_url != "about:blank":
+                await extra.goto(target_url)
+            self._pages.put_nowait(extra)
+        # Spares for recoveries and recycles, beyond the worker pages.
+        loop_settings = resolve_loop_settings(
+            self.config.get("agent_track_submit") or {}, self.automation_settings.get("timeouts")
+        )
+        self.browser_manager.page_pool(
+            target_url, loop_settings.selectors.textarea, loop_settings.timeouts.prompt_visible_ms
+        )
+
+    def _create_job(self, spec: dict) -> _Job:
+        loop_name = spec.get("loop", "agent-track-submit-retry")
+        if loop_name not in LOOPS:
+            raise ValueError(
+                f"Unknown loop '{loop_name}'. Available: {', '.join(sorted(LOOPS))}"
+            )
+        text = spec.get("text")
+        if not text and spec.get("prompt_file"):
+            try:
+                text = load_prompt_text(spec["prompt_file"])
+            except OSError as e:
+                raise ValueError(f"Could not read prompt_file '{spec['prompt_file']}': {e.strerror or e}")
+        if not text:
+            raise ValueError("Job needs either 'text' or 'prompt_file'.")
+        limits = spec.get("limits", {})
+        if not isinstance(limits, dict):
+            raise ValueError("'limits' must be a mapping of retry settings.")
+        if not isinstance(spec.get("timeouts", {}), dict):
+            raise ValueError("'timeouts' must be a mapping of timeout names to values.")
+        return _Job(next(self._job_ids), spec, text)
+
+    async def _run_job(self, job: _Job):
+        _current_job.set(job)
+        spec = job.spec
+        started = time.monotonic()
+        page = None
+        ctx = None
+        result = {"event": "result", "job_id": job.job_id}
+        # Everything after this point reports a result, so the client never waits forever.
+        try:
+            page = await self._pages.get()
+            ctx = self.services.attach(
+                TaskContext(page, self.config, self.automation_settings)
+            )
+            job.events.put_nowait({"event": "started", "job_id": job.job_id})
+            timeouts = {
+                **self.automation_settings.get("timeouts", {}),
+                **spec.get("timeouts", {}),
+            }
+            await LOOPS[spec.get("loop", "agent-track-submit-retry")](
+                ctx, job.text, spec.get("model"), timeouts, spec.get("limits", {})
+            )
+            result["status"] = "completed"
+            self._completed += 1
+        except asyncio.CancelledError:
+            result["status"] = "cancelled"
+            raise
+        except Exception as e:
+            logging.error(f"Job {job.job_id} failed: {e}")
+            result["status"] = "failed"
+            result["error"] = str(e)
+            self._failed += 1
+        finally:
+            if ctx is not None and self.services.dashboard:
+                self.services.dashboard.untrack(ctx)
+            if page is not None:
+                # A page swapped by recovery during the job replaces the original.
+                self._pages.put_nowait(ctx.page if ctx is not None else page)
+            result["elapsed_sec"] = round(time.monotonic() - started, 3)
+            job.events.put_nowait(result)
+            job.events.put_nowait(None)
+
+    async def _handle_client(self, reader, writer):
+        try:
+            request = json.loads(await reader.readline() or b"{}")
+            op = request.get("op", "submit")
+            if op == "status":
+                await _send(writer, self.status())
+            elif op == "shutdown":
+                await _send(writer, {"event": "shutdown"})
+                self._shutdown.set()
+            elif op == "submit":
+                await self._stream_job(request.get("job") or {}, writer)
+            else:
+                await _send(writer, {"event": "error", "message": f"Unknown op '{op}'"})
+        except (json.JSONDecodeError, ValueError) as e:
+            await _send(writer, {"event": "error", "message": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _stream_job(self, spec: dict, writer):
+        job = self._create_job(spec)
+        await _send(
+            writer,
+            {"event": "accepted", "job_id": job.job_id, "idle_pages": self._pages.qsize()},
+        )
+        task = asyncio.create_task(self._run_job(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        while True:
+            event = await job.events.get()
+            if event is None:
+                break
+            try:
+                await _send(writer, event)
+            except ConnectionError:
+                # Client went away; the job keeps running without an audience.
+                job.streaming = False
+                break
+
+    def status(self) -> dict:
+        return {
+            "event": "status",
+            "pages": self.page_count,
+            "idle_pages": self._pages.qsize(),
+            "running": len(self._tasks),
+            "completed": self._completed,
+            "failed": self._failed,
+            "rate_limiter": (
+                self.services.rate_limiter.metrics() if self.services.rate_limiter else None
+            ),
+            "page_recovery": (
+                self.browser_manager.recovery_summary() if self.browser_manager else None
+            ),
+            "page_pool": (
+                self.browser_manager.page_pool_summary()
+                if self.browser_manager and self.browser_manager.page_pool_settings
+                else None
+            ),
+            "storage_state": (
+                self.browser_manager.storage_state_summary()
+                if self.browser_manager and self.browser_manager.storage_state_enabled
+                else None
+            ),
+            "circuit_breakers": (
+                self.services.circuit_breakers.states()
+                if self.services.circuit_breakers
+                else None
+            ),
+            "resources": self.sampler.summary() if self.sampler else None,
+            "tracing": self.services.tracing.summary() if self.services.tracing else None,
+            "campaign": self.services.dashboard.snapshot() if self.services.dashboard else None,
+            "classified_outcomes": (
+                self.services.outcome_classifier.summary() if self.services.outcome_classifier else None
+            ),
+        }
+
+
+async def _send(writer, event: dict):
+    writer.write((json.dumps(event) + "\n").encode("utf-8"))
+    await writer.drain()
+
+
+async def send_request(request: dict, socket_path: str = DEFAULT_SOCKET_PATH) -> dict | None:
+    """
+    Sends one request to the daemon, printing streamed events as they arrive.
+    Returns the final result, status or error event.
+    """
+    reader, writer = await asyncio.open_unix_connection(socket_path, limit=_STREAM_LIMIT)
+    final = None
+    try:
+        await _send(writer, request)
+        async for raw in reader:
+            event = json.loads(raw)
+            kind = event.get("event")
+            if kind == "log":
+                print(f"[job {event['job_id']}] {event['level']}: {event['message']}")
+            elif kind in ("accepted", "started"):
+                print(f"[job {event['job_id']}] {kind}")
+            else:
+                print(json.dumps(event))
+                final = event
+    finally:
+        writer.close()
+    return final
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="MATS x Trails Automation Daemon")
+    parser.add_argument("--socket", type=str, default=None)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve")
+    serve.add_argument("--launch-browser", action="store_true")
+    serve.add_argument("--pages", type=int, default=None)
+    serve.add_argument("--profile", nargs="?", const="hap_profile", default=None, metavar="PREFIX")
+
+    submit = subparsers.add_parser("submit")
+    submit.add_argument("--text", type=str, default=None)
+    submit.add_argument("--prompt-file", type=str, default=None)
+    submit.add_argument("--model", type=str, default=None)
+    submit.add_argument("--loop", type=str, default="agent-track-submit-retry")
+    submit.add_argument("--max-retries", type=int, default=None)
+    submit.add_argument("--max-error-refreshes", type=int, default=None)
+
+    subparsers.add_parser("status")
+    subparsers.add_parser("shutdown")
+
+    args = parser.parse_args()
+    config = load_config() or {}
+    socket_path = args.socket or config.get("daemon", {}).get(
+        "socket_path", DEFAULT_SOCKET_PATH
+    )
+
+    if args.command == "serve":
+        if not config:
+            return
+        daemon = AutomationDaemon(
+            config, socket_path, args.pages, connect_to_existing=not args.launch_browser
+        )
+        with profile_session(args.profile):
+            await daemon.serve()
+        return
+
+    if args.command == "submit":
+        limits = {}
+        if args.max_retries is not None:
+            limits["max_retries"] = args.max_retries
+        if args.max_error_refreshes is not None:
+            limits["max_error_refreshes"] = args.max_error_refreshes
+        job = {
+            "text": args.text,
+            "prompt_file": args.prompt_file,
+            "model": args.model,
+            "loop": args.loop,
+            "limits": limits,
+        }
+        request = {"op": "submit", "job": job}
+    else:
+        request = {"op": args.command}
+
+    try:
+        await send_request(request, socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"Error: no daemon listening on {socket_path}.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    asyncio.run(main())
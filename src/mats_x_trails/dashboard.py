@@ -0,0 +1,277 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+
+
+_IDLE_PHASES = ("idle", "pause")
+
+
+class WorkerState:
+    """What one worker is doing right now; the retry loop writes it, the dashboard reads it."""
+
+    __slots__ = ("name", "challenge", "model", "phase", "since", "attempt", "attempts", "last_outcome", "error_refreshes", "_loop_refreshes")
+
+    def __init__(self, name: str, challenge: str | None = None):
+        self.name = name
+        self.challenge = challenge
+        self.model = None
+        self.phase = "idle"
+        self.since = time.monotonic()
+        self.attempt = 0
+        self.attempts = 0
+        self.last_outcome = None
+        self.error_refreshes = 0
+        self._loop_refreshes = 0
+
+    def enter(self, phase: str, attempt: int | None = None):
+        self.phase = phase
+        self.since = time.monotonic()
+        if attempt is not None:
+            self.attempt = attempt
+
+
+class _LogRing(logging.Handler):
+    def __init__(self, lines: deque):
+        super().__init__()
+        self.lines = lines
+        self.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s", "%H:%M:%S"))
+
+    def emit(self, record):
+        try:
+            self.lines.append(self.format(record))
+        except Exception:
+            pass
+
+
+class Dashboard:
+    """
+    Live campaign view built from in-memory counters. Attempt records and
+    worker phases only bump counters; a separate task takes a snapshot every
+    ``refresh_sec`` and hands rendering and file writes to a thread, so the
+    attempt coroutines never wait on the terminal or the disk. The snapshot is
+    drawn on the terminal (when stdout is a tty) and/or written atomically to
+    ``status_path`` for headless runs.
+    """
+
+    def __init__(self, settings: dict | None = None):
+        settings = settings or {}
+        self.terminal = settings.get("terminal", True)
+        self.status_path = settings.get("status_path", "hap_status.json")
+        self.refresh_sec = settings.get("refresh_sec", 1.0)
+        self.success_outcomes = set(settings.get("success_outcomes", ["success"]))
+        self.workers: list[WorkerState] = []
+        self._names: dict[str, int] = {}
+        self.started = time.time()
+        self.attempts = 0
+        self.successes = 0
+        self.error_refreshes = 0
+        self.outcomes: dict[str, int] = {}
+        self._recent = deque()
+        self._latencies = deque(maxlen=settings.get("latency_window", 500))
+        self._log = deque(maxlen=settings.get("log_lines", 8))
+        self._log_handler = None
+        self._muted: list[tuple[logging.Handler, int]] = []
+        self._task: asyncio.Task | None = None
+        self._drawing = False
+
+    @classmethod
+    def from_settings(cls, settings: dict | None) -> "Dashboard | None":
+        if not settings or not settings.get("enabled", False):
+            return None
+        return cls(settings)
+
+    def track(self, ctx) -> WorkerState:
+        """Registers a worker context; its attempts and phases show up from now on."""
+        base = ctx.challenge_name or "worker"
+        self._names[base] = self._names.get(base, 0) + 1
+        worker = WorkerState(f"{base}-{self._names[base]}", ctx.challenge_name)
+        self.workers.append(worker)
+        ctx.worker_state = worker
+        ctx.attempt_listeners.append(lambda record: self.on_attempt(worker, record))
+        return worker
+
+    def untrack(self, ctx):
+        """Drops a finished worker from the table; its attempts stay in the totals."""
+        if ctx.worker_state in self.workers:
+            self.workers.remove(ctx.worker_state)
+
+    def on_attempt(self, worker: WorkerState, record: dict):
+        outcome = record.get("outcome")
+        self.attempts += 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if outcome in self.success_outcomes:
+            self.successes += 1
+        if record.get("latency_ms") is not None:
+            self._latencies.append(record["latency_ms"])
+        now = time.monotonic()
+        self._recent.append(now)
+        while self._recent and now - self._recent[0] > 60:
+            self._recent.popleft()
+        # error_refreshes counts up within one loop call and restarts with the next.
+        refreshes = record.get("error_refreshes") or 0
+        added = refreshes - worker._loop_refreshes if refreshes >= worker._loop_refreshes else refreshes
+        worker._loop_refreshes = refreshes
+        worker.error_refreshes += added
+        self.error_refreshes += added
+        worker.attempts += 1
+        worker.last_outcome = outcome
+        worker.model = record.get("model") or worker.model
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 60:
+            self._recent.popleft()
+        latencies = sorted(self._latencies)
+
+        def percentile(q: float):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        return {
+            "ts": time.time(),
+            "uptime_sec": round(time.time() - self.started, 1),
+            "attempts": self.attempts,
+            "attempts_per_min": len(self._recent),
+            "successes": self.successes,
+            "error_refreshes": self.error_refreshes,
+            "in_flight": sum(1 for w in self.workers if w.phase not in _IDLE_PHASES),
+            "outcomes": dict(self.outcomes),
+            "latency_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "samples": len(latencies),
+            },
+            "workers": [
+                {
+                    "name": w.name,
+                    "challenge": w.challenge,
+                    "model": w.model,
+                    "phase": w.phase,
+                    "phase_sec": round(now - w.since, 1),
+                    "attempt": w.attempt,
+                    "attempts": w.attempts,
+                    "last_outcome": w.last_outcome,
+                    "error_refreshes": w.error_refreshes,
+                }
+                for w in self.workers
+            ],
+            "log": list(self._log),
+        }
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._drawing = self.terminal and sys.stdout.isatty()
+        if self.terminal and not self._drawing:
+            logging.info("Dashboard: stdout is not a terminal; only writing the status file")
+        if self._drawing:
+            # Log lines would scroll the view away; show the latest ones inside it instead.
+            self._log_handler = _LogRing(self._log)
+            root = logging.getLogger()
+            for handler in root.handlers:
+                if type(handler) is logging.StreamHandler and handler.stream in (sys.stdout, sys.stderr):
+                    self._muted.append((handler, handler.level))
+                    handler.setLevel(logging.CRITICAL + 1)
+            root.addHandler(self._log_handler)
+            sys.stdout.write("\x1b[?1049h\x1b[?25l")
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.to_thread(self._emit, self.snapshot())
+            await asyncio.sleep(self.refresh_sec)
+
+    def _emit(self, snapshot: dict):
+        if self._drawing:
+            sys.stdout.write("\x1b[H\x1b[2J" + render(snapshot))
+            sys.stdout.flush()
+        if self.status_path:
+            write_status(self.status_path, snapshot)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        snapshot = self.snapshot()
+        if self._drawing:
+            sys.stdout.write("\x1b[?25h\x1b[?1049l")
+            logging.getLogger().removeHandler(self._log_handler)
+            for handler, level in self._muted:
+                handler.setLevel(level)
+            self._muted.clear()
+            self._drawing = False
+            sys.stdout.write(render(snapshot))
+            sys.stdout.flush()
+        if self.status_path:
+            write_status(self.status_path, snapshot)
+
+
+def write_status(path: str, snapshot: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def _seconds(ms):
+    return "-" if ms is None else f"{ms / 1000:.1f}s"
+
+
+def render(snapshot: dict) -> str:
+    uptime = int(snapshot["uptime_sec"])
+    latency = snapshot["latency_ms"]
+    lines = [
+        f"HAP campaign  up {uptime // 3600}:{uptime % 3600 // 60:02d}:{uptime % 60:02d}"
+        f"   attempts {snapshot['attempts']} ({snapshot['attempts_per_min']}/min)"
+        f"   successes {snapshot['successes']}   error refreshes {snapshot['error_refreshes']}"
+        f"   in flight {snapshot['in_flight']}/{len(snapshot['workers'])}",
+        f"latency  p50 {_seconds(latency['p50'])}  p95 {_seconds(latency['p95'])}"
+        f"  p99 {_seconds(latency['p99'])}  (last {latency['samples']})",
+        "outcomes " + ("  ".join(f"{k} {v}" for k, v in sorted(snapshot["outcomes"].items(), key=lambda kv: -kv[1])) or "-"),
+        "",
+        f"{'worker':<18}{'phase':<15}{'for':>8}{'attempt':>9}  {'model':<20}{'last':<12}{'refreshes':>9}",
+    ]
+    for w in snapshot["workers"]:
+        lines.append(
+            f"{w['name'][:17]:<18}{w['phase']:<15}{w['phase_sec']:>7.1f}s{w['attempt']:>9}  "
+            f"{(w['model'] or '-')[:19]:<20}{(w['last_outcome'] or '-'):<12}{w['error_refreshes']:>9}"
+        )
+    if snapshot.get("log"):
+        lines += ["", "recent log"] + [f"  {line[:160]}" for line in snapshot["log"]]
+    return "\n".join(lines) + "\n"
+
+
+async def watch(path: str, refresh_sec: float):
+    """Draws a status file written by a headless run, e.g. from another machine or shell."""
+    while True:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            age = time.time() - snapshot["ts"]
+            sys.stdout.write("\x1b[H\x1b[2J" + render(snapshot) + f"\n(status file {path}, {age:.0f}s old)\n")
+        except (OSError, ValueError, KeyError) as e:
+            sys.stdout.write(f"\x1b[H\x1b[2JWaiting for {path}: {e}\n")
+        sys.stdout.flush()
+        await asyncio.sleep(refresh_sec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the live status of a headless campaign")
+    parser.add_argument("status_path", nargs="?", default="hap_status.json")
+    parser.add_argument("--refresh-sec", type=float, default=1.0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(watch(args.status_path, args.refresh_sec))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
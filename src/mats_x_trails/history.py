@@ -0,0 +1,45 @@
+import json
+import logging
+import os
+
+
+DEFAULT_HISTORY_PATH = "hap_attempts.jsonl"
+
+
+class AttemptHistory:
+    """
+    Append-only JSONL log of attempt records, fed by the attempt listener hook.
+    Survives restarts, so later runs (and other tools) can learn from earlier ones.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH):
+        self.path = path
+        self._file = None
+
+    @classmethod
+    def from_settings(cls, settings: dict | None) -> "AttemptHistory | None":
+        if not settings or not settings.get("enabled", False):
+            return None
+        return cls(settings.get("path", DEFAULT_HISTORY_PATH))
+
+    def on_attempt(self, record: dict):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def records(self):
+        """Yields every stored record, skipping lines cut short by a crash."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"Skipping corrupt history line {line_no} in {self.path}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,305 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+from . import sharding
+from .history import DEFAULT_HISTORY_PATH
+from .prompt_dedup import prompt_id
+
+
+DEFAULT_QUEUE_PATH = "hap_jobs.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedupe_key TEXT UNIQUE,
+    challenge TEXT NOT NULL,
+    prompt_ref TEXT NOT NULL,
+    model TEXT,
+    retry_budget INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    deliveries INTEGER NOT NULL DEFAULT 0,
+    lease_token TEXT,
+    lease_owner TEXT,
+    visible_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, visible_at);
+"""
+
+
+class Job:
+    """A leased queue item. ``lease_token`` must be presented to finish it."""
+
+    __slots__ = (
+        "id",
+        "challenge",
+        "prompt_ref",
+        "model",
+        "retry_budget",
+        "deliveries",
+        "lease_token",
+    )
+
+    def __init__(self, id, challenge, prompt_ref, model, retry_budget, deliveries, lease_token):
+        self.id = id
+        self.challenge = challenge
+        self.prompt_ref = prompt_ref
+        self.model = model
+        self.retry_budget = retry_budget
+        self.deliveries = deliveries
+        self.lease_token = lease_token
+
+    def __repr__(self):
+        return (
+            f"Job(id={self.id}, challenge={self.challenge!r}, "
+            f"prompt_ref={self.prompt_ref!r}, model={self.model!r})"
+        )
+
+
+class JobQueue:
+    """
+    Durable SQLite-backed queue of (challenge, prompt ref, model, retry budget)
+    items shared by any number of worker processes.
+
+    A leased job stays invisible to other workers until its visibility timeout
+    expires; a worker that crashes therefore only delays its job. Completion is
+    idempotent and guarded by the lease token, so a late duplicate finish from a
+    worker whose lease already expired is ignored.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, max_deliveries: int = 3):
+        self.path = path
+        self.max_deliveries = max_deliveries
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(
+        self,
+        challenge: str,
+        prompt_ref: str,
+        model: str | None = None,
+        retry_budget: int = 1,
+        dedupe_key: str | None = None,
+    ) -> int | None:
+        """Adds a job and returns its id, or None if ``dedupe_key`` already exists."""
+        cur = self.conn.execute(
+            "INSERT OR IGNORE INTO jobs (dedupe_key, challenge, prompt_ref, model, "
+            "retry_budget, visible_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (dedupe_key, challenge, prompt_ref, model, retry_budget, 0.0, time.time()),
+        )
+        return cur.lastrowid if cur.rowcount else None
+
+    def enqueue_many(self, items: list[dict]) -> int:
+        """Adds many jobs in one transaction; returns the number inserted."""
+        now = time.time()
+        rows = [
+            (
+                item.get("dedupe_key"),
+                item["challenge"],
+                item["prompt_ref"],
+                item.get("model"),
+                item.get("retry_budget", 1),
+                0.0,
+                now,
+            )
+            for item in items
+        ]
+        with self._transaction():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (dedupe_key, challenge, prompt_ref, "
+                "model, retry_budget, visible_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self.conn.total_changes - before
+
+    def lease(
+        self,
+        worker_id: str,
+        visibility_timeout_sec: float = 300,
+        challenge: str | None = None,
+    ) -> Job | None:
+        """Leases the oldest visible job, optionally restricted to one challenge."""
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._transaction():
+            # Jobs whose lease expired too many times are parked as dead letters.
+            self.conn.execute(
+                "UPDATE jobs SET status = 'dead', finished_at = ? "
+                "WHERE status = 'queued' AND visible_at <= ? AND deliveries >= ?",
+                (now, now, self.max_deliveries),
+            )
+            query = (
+                "SELECT id, challenge, prompt_ref, model, retry_budget, deliveries "
+                "FROM jobs WHERE status = 'queued' AND visible_at <= ?"
+            )
+            params: list = [now]
+            if challenge is not None:
+                query += " AND challenge = ?"
+                params.append(challenge)
+            row = self.conn.execute(
+                query + " ORDER BY visible_at, id LIMIT 1", params
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET lease_token = ?, lease_owner = ?, visible_at = ?, "
+                "deliveries = deliveries + 1 WHERE id = ?",
+                (token, worker_id, now + visibility_timeout_sec, row[0]),
+            )
+        return Job(*row[:5], row[5] + 1, token)
+
+    def extend_lease(self, job: Job, visibility_timeout_sec: float = 300) -> bool:
+        """Pushes the lease deadline out; False means the lease was lost."""
+        cur = self.conn.execute(
+            "UPDATE jobs SET visible_at = ? "
+            "WHERE id = ? AND lease_token = ? AND status = 'queued'",
+            (time.time() + visibility_timeout_sec, job.id, job.lease_token),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, job: Job, result: dict | None = None) -> bool:
+        """Marks the job done. Returns False if it was already finished or lost."""
+        cur = self.conn.execute(
+            "UPDATE jobs SET status = 'done', finished_at = ?, result = ?, "
+            "lease_token = NULL WHERE id = ? AND lease_token = ? AND status = 'queued'",
+            (time.time(), json.dumps(result or {}), job.id, job.lease_token),
+        )
+        return cur.rowcount == 1
+
+    def fail(self, job: Job, error: str = "", retry_delay_sec: float = 0) -> bool:
+        """
+        Releases the lease after a failed run. The job becomes visible again after
+        ``retry_delay_sec`` unless it has used up ``max_deliveries``.
+        """
+        now = time.time()
+        status = "dead" if job.deliveries >= self.max_deliveries else "queued"
+        cur = self.conn.execute(
+            "UPDATE jobs SET status = ?, visible_at = ?, result = ?, lease_token = NULL, "
+            "finished_at = CASE WHEN ? = 'dead' THEN ? ELSE NULL END "
+            "WHERE id = ? AND lease_token = ? AND status = 'queued'",
+            (
+                status,
+                now + retry_delay_sec,
+                json.dumps({"error": error}),
+                status,
+                now,
+                job.id,
+                job.lease_token,
+            ),
+        )
+        return cur.rowcount == 1
+
+    def stats(self) -> dict:
+        now = time.time()
+        counts = dict(
+            self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        )
+        leased = self.conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND visible_at > ?",
+            (now,),
+        ).fetchone()[0]
+        return {
+            "queued": counts.get("queued", 0) - leased,
+            "leased": leased,
+            "done": counts.get("done", 0),
+            "dead": counts.get("dead", 0),
+        }
+
+    def _transaction(self):
+        return _ImmediateTransaction(self.conn)
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE takes the write lock up front so concurrent leases serialize."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MATS x Trails job queue")
+    parser.add_argument("--db", type=str, default=os.getenv("HAP_JOB_QUEUE", DEFAULT_QUEUE_PATH))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = subparsers.add_parser("enqueue")
+    enqueue.add_argument("--challenge", type=str, required=True)
+    enqueue.add_argument("--prompt-ref", type=str, action="append", required=True)
+    enqueue.add_argument("--model", type=str, action="append", default=None)
+    enqueue.add_argument("--retry-budget", type=int, default=1)
+    enqueue.add_argument("--allow-duplicates", action="store_true")
+    enqueue.add_argument("--shard", type=str, default=None, metavar="I/N", help="Enqueue only slice I of N of the prompt x model pairs")
+    enqueue.add_argument(
+        "--manifest", type=str, default=None,
+        help="Shard manifest path (default: next to the default attempt history)",
+    )
+
+    subparsers.add_parser("stats")
+
+    args = parser.parse_args()
+    shard = None
+    if args.command == "enqueue":
+        try:
+            shard = sharding.Shard.parse(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    queue = JobQueue(args.db)
+    try:
+        if args.command == "enqueue":
+            items = []
+            for prompt_ref in args.prompt_ref:
+                for model in args.model or [None]:
+                    key = None
+                    if not args.allow_duplicates:
+                        key = json.dumps([args.challenge, prompt_ref, model])
+                    items.append(
+                        {
+                            "challenge": args.challenge,
+                            "prompt_ref": prompt_ref,
+                            "model": model,
+                            "retry_budget": args.retry_budget,
+                            "dedupe_key": key,
+                        }
+                    )
+            if shard is not None:
+                from .app import resolve_prompt_ref
+
+                prompt_ids = {ref: prompt_id(resolve_prompt_ref(ref)) for ref in args.prompt_ref}
+                for item in items:
+                    item["prompt_id"] = prompt_ids[item["prompt_ref"]]
+                    item["key"] = sharding.item_key(item["challenge"], item["prompt_id"], item["model"])
+                manifest = args.manifest or sharding.manifest_path(DEFAULT_HISTORY_PATH)
+                items = [
+                    {k: v for k, v in item.items() if k not in ("key", "prompt_id")}
+                    for item in sharding.plan(shard, "job_queue", items, manifest)
+                ]
+            added = queue.enqueue_many(items)
+            print(f"Enqueued {added} job(s) ({len(items) - added} duplicate(s) skipped).")
+        elif args.command == "stats":
+            print(json.dumps(queue.stats()))
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import asyncio
+import argparse
+import logging
+import time
+from playwright.async_api import async_playwright
+
+from .config_loader import load_config, get_challenge_config
+from ..browser import BrowserManager
+from .agent_track_submit_retry import agent_track_submit_with_retry
+from .prompt_dedup import prompt_id
+from . import sharding
+from .settings import resolve_loop_settings
+from .app import (
+    SharedServices,
+    TaskContext,
+    load_prompt_text,
+    profile_session,
+    start_resource_sampler,
+)
+
+
+class ChallengeStats:
+    """Per-challenge throughput counters fed by the attempt listener hook."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.monotonic()
+        self.attempts = 0
+        self.outcomes: dict[str, int] = {}
+        self.jobs_done = 0
+        self.jobs_failed = 0
+
+    def on_attempt(self, record: dict):
+        self.attempts += 1
+        outcome = record.get("outcome", "unknown")
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def summary(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            "challenge": self.name,
+            "attempts": self.attempts,
+            "attempts_per_min": round(self.attempts / elapsed * 60, 2) if elapsed else 0.0,
+            "outcomes": dict(self.outcomes),
+            "jobs_done": self.jobs_done,
+            "jobs_failed": self.jobs_failed,
+            "elapsed_sec": round(elapsed, 1),
+        }
+
+
+class _ChallengeRun:
+    def __init__(self, entry: dict, merged_config: dict, context):
+        self.name = entry["name"]
+        self.entry = entry
+        self.config = merged_config
+        self.automation_settings = merged_config.get("automation_settings", {})
+        self.context = context
+        self.concurrency = max(1, int(entry.get("concurrency", 1)))
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.idle_pages: asyncio.Queue = asyncio.Queue()
+        self.stats = ChallengeStats(self.name)
+        self.jobs: list[tuple[str, str | None]] = []
+
+
+class Orchestrator:
+    """
+    Runs several challenges at once. Each challenge gets its merged config from
+    ``get_challenge_config``, its own browser context and a concurrency limit,
+    while a shared semaphore caps the number of jobs running across all of them.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        global_concurrency: int | None = None,
+        shard: sharding.Shard | None = None,
+    ):
+        self.config = config
+        self.shard = shard
+        self.settings = config.get("orchestrator", {})
+        self.global_concurrency = max(
+            1, int(global_concurrency or self.settings.get("global_concurrency", 4))
+        )
+        self.isolate_contexts = self.settings.get("isolate_contexts", True)
+        self.report_interval_sec = self.settings.get("report_interval_sec", 60)
+        self._global = asyncio.Semaphore(self.global_concurrency)
+        # One set of limiters and breakers for every challenge so host-level
+        # budgets hold across them.
+        self.services = SharedServices(config.get("automation_settings", {}), config=config)
+        self.runs: list[_ChallengeRun] = []
+        self.browser_manager: BrowserManager | None = None
+
+    def challenge_entries(self, only: list[str] | None = None) -> list[dict]:
+        entries = self.settings.get("challenges")
+        if not entries:
+            names = self.config.get("challenge_specific_configs", {}) or {}
+            entries = [{"name": name} for name in names]
+        if only:
+            entries = [entry for entry in entries if entry.get("name") in only]
+        return entries
+
+    def _jobs_for(self, run: _ChallengeRun) -> list[tuple[str, str | None]]:
+        prompts = run.entry.get("prompts") or run.config.get("prompts", [])
+        texts = []
+        for prompt in prompts:
+            if prompt.get("text"):
+                texts.append(prompt["text"])
+            elif prompt.get("file"):
+                texts.append(load_prompt_text(prompt["file"]))
+        models = run.entry.get("models") or [run.entry.get("model")]
+        return [(text, model) for text in texts for model in models]
+
+    async def run(self, browser_manager: BrowserManager, only: list[str] | None = None) -> list[dict]:
+        self.browser_manager = browser_manager
+        self.services.browser_manager = browser_manager
+        for entry in self.challenge_entries(only):
+            merged = get_challenge_config(self.config, entry["name"])
+            if not merged or not merged.get("base_url"):
+                logging.error(f"Challenge '{entry['name']}' has no base_url; skipping.")
+                continue
+            if self.isolate_contexts:
+                context = await browser_manager.new_context()
+            else:
+                context = browser_manager.default_context
+            run = _ChallengeRun(entry, merged, context)
+            self.runs.append(run)
+            # Starts warming spare pages now so the first jobs find them ready.
+            self._page_pool(run)
+
+        if not self.runs:
+            logging.error("No runnable challenges configured.")
+            return []
+        for run in self.runs:
+            run.jobs = self._jobs_for(run)
+        if self.shard is not None:
+            self._shard_jobs()
+
+        reporter = asyncio.create_task(self._report_periodically())
+        try:
+            await asyncio.gather(*(self._run_challenge(run) for run in self.runs))
+        finally:
+            reporter.cancel()
+            self.services.close()
+            pools = browser_manager.page_pool_summary() if browser_manager.page_pool_settings else {}
+            for name, metrics in pools.items():
+                logging.info(f"🔥 Page pool {name}: {metrics['hits']} hit(s), {metrics['misses']} miss(es), hit rate {metrics['hit_rate']}")
+            await browser_manager.close_page_pools()
+        summaries = [run.stats.summary() for run in self.runs]
+        _print_summary(summaries)
+        return summaries
+
+    def _shard_jobs(self):
+        """Keeps this machine's slice of every challenge's prompt x model jobs."""
+        items = []
+        for run in self.runs:
+            for text, model in run.jobs:
+                pid = prompt_id(text)
+                items.append({
+                    "key": sharding.item_key(run.name, pid, model),
+                    "prompt_id": pid,
+                    "model": model,
+                    "challenge": run.name,
+                    "run": run,
+                    "job": (text, model),
+                })
+            run.jobs = []
+        path = sharding.manifest_path(sharding.history_path(self.config))
+        for item in sharding.plan(self.shard, "orchestrator", items, path):
+            item["run"].jobs.append(item["job"])
+
+    async def _run_challenge(self, run: _ChallengeRun):
+        jobs = list(run.jobs)
+        dedup = self.services.prompt_dedup
+        if dedup is not None:
+            # Known-loser look-alikes queue behind everything else.
+            jobs.sort(key=lambda job: dedup.check(*job)["action"] != "submit")
+        logging.info(
+            f"[{run.name}] {len(jobs)} job(s), concurrency {run.concurrency}, "
+            f"base_url {run.config['base_url']}"
+        )
+        await asyncio.gather(*(self._run_job(run, text, model) for text, model in jobs))
+
+    def _page_pool(self, run: _ChallengeRun):
+        loop_settings = resolve_loop_settings(
+            run.config.get("agent_track_submit") or {}, run.automation_settings.get("timeouts")
+        )
+        return self.browser_manager.page_pool(
+            run.config["base_url"], loop_settings.selectors.textarea, loop_settings.timeouts.prompt_visible_ms, run.context
+        )
+
+    async def _checkout_page(self, run: _ChallengeRun):
+        if not run.idle_pages.empty():
+            return run.idle_pages.get_nowait()
+        pool = self._page_pool(run)
+        if pool is not None:
+            return await pool.get()
+        page = self.browser_manager.watch_page(await run.context.new_page())
+        await page.goto(run.config["base_url"])
+        return page
+
+    async def _run_job(self, run: _ChallengeRun, text: str, model: str | None):
+        async with run.semaphore, self._global:
+            page = await self._checkout_page(run)
+            ctx = self.services.attach(
+                TaskContext(page, run.config, run.automation_settings, run.name)
+            )
+            ctx.attempt_listeners.append(run.stats.on_attempt)
+            limits = {
+                **run.config.get("agent_track_submit", {}).get("retry_settings", {}),
+                **run.entry.get("limits", {}),
+            }
+            try:
+                await agent_track_submit_with_retry(
+                    ctx, text, model, run.automation_settings.get("timeouts", {}), limits
+                )
+                run.stats.jobs_done += 1
+            except Exception as e:
+                logging.error(f"[{run.name}] job failed (model={model}): {e}")
+                run.stats.jobs_failed += 1
+            finally:
+                if self.services.dashboard:
+                    self.services.dashboard.untrack(ctx)
+                run.idle_pages.put_nowait(ctx.page)
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.report_interval_sec)
+            for run in self.runs:
+                s = run.stats.summary()
+                logging.info(
+                    f"[{s['challenge']}] {s['attempts']} attempts, "
+                    f"{s['attempts_per_min']}/min, outcomes {s['outcomes']}"
+                )
+
+
+def _print_summary(summaries: list[dict]):
+    print("\nPer-challenge throughput")
+    print(f"{'challenge':<28}{'attempts':>10}{'per min':>10}{'jobs ok':>9}{'failed':>8}  outcomes")
+    for s in summaries:
+        print(
+            f"{s['challenge']:<28}{s['attempts']:>10}{s['attempts_per_min']:>10}"
+            f"{s['jobs_done']:>9}{s['jobs_failed']:>8}  {s['outcomes']}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="MATS x Trails multi-challenge orchestrator")
+    parser.add_argument("--launch-browser", action="store_true")
+    parser.add_argument("--global-concurrency", type=int, default=None)
+    parser.add_argument("--challenge", action="append", default=None, help="Only run these challenges")
+    parser.add_argument("--profile", nargs="?", const="hap_profile", default=None, metavar="PREFIX")
+    parser.add_argument("--shard", type=str, default=None, metavar="I/N", help="Run only slice I of N of the jobs")
+    args = parser.parse_args()
+    try:
+        args.shard = sharding.Shard.parse(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+
+    config = load_config()
+    if not config:
+        return
+    with profile_session(args.profile):
+        await _run(config, args)
+
+
+async def _run(config: dict, args):
+    async with async_playwright() as playwright:
+        browser_manager = BrowserManager(playwright, config)
+        page = await browser_manager.get_page(connect_to_existing=not args.launch_browser)
+        if not page:
+            print("Failed to initialize browser or page. Exiting.")
+            return
+        orchestrator = Orchestrator(config, args.global_concurrency, args.shard)
+        sampler = start_resource_sampler(browser_manager, config.get("automation_settings", {}))
+        try:
+            await orchestrator.run(browser_manager, args.challenge)
+        finally:
+            if sampler:
+                await sampler.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    asyncio.run(main())
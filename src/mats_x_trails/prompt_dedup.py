@@ -0,0 +1,267 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from .history import AttemptHistory
+
+
+_MASK32 = 0xFFFFFFFF
+
+# Bumped whenever signature() changes; index entries from another version are ignored.
+SIGNATURE_VERSION = 2
+
+_SHINGLE_BASE = np.uint64(0x100000001B3)
+
+
+def prompt_id(text: str) -> str:
+    """Stable short id for a prompt's exact text."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _shingle_hashes(data: bytes, shingle_size: int) -> np.ndarray:
+    """32-bit hash of every ``shingle_size``-byte window of ``data``, computed in one pass over the windows."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if len(raw) < shingle_size:
+        raw = np.pad(raw, (0, shingle_size - len(raw)))
+    windows = np.lib.stride_tricks.sliding_window_view(raw, shingle_size)
+    h = np.zeros(len(windows), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for k in range(shingle_size):
+            h = h * _SHINGLE_BASE + windows[:, k]
+        # splitmix64 finalizer spreads the polynomial hash over all 64 bits.
+        h ^= h >> np.uint64(30)
+        h *= np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(27)
+        h *= np.uint64(0x94D049BB133111EB)
+        h ^= h >> np.uint64(31)
+    return h >> np.uint64(32)
+
+
+def signature(text: str, num_bins: int = 64, shingle_size: int = 5) -> tuple[int, ...]:
+    """
+    One-permutation MinHash over character shingles: each shingle is hashed
+    once, the hash picks a bin and the bin keeps its minimum. Empty bins borrow
+    from the next filled one so short texts still compare fairly.
+    """
+    # Lower-cased with whitespace runs collapsed to single spaces.
+    data = " ".join(text.lower().split()).encode("utf-8")
+    shift = num_bins.bit_length() - 1
+    empty = _MASK32 + 1
+    hashes = _shingle_hashes(data, shingle_size)
+    mins = np.full(num_bins, empty, dtype=np.uint64)
+    np.minimum.at(mins, hashes & np.uint64(num_bins - 1), hashes >> np.uint64(shift))
+    bins = mins.tolist()
+    if all(v == empty for v in bins):
+        return tuple(bins)
+    for i in range(num_bins):
+        if bins[i] == empty:
+            j, distance = i, 0
+            while bins[j] == empty:
+                j = (j + 1) % num_bins
+                distance += 1
+            # Offset by the distance so borrowed values differ from the donor's.
+            bins[i] = bins[j] + (distance << (32 - shift))
+    return tuple(bins)
+
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class MinHashIndex:
+    """LSH index over prompt signatures: ``bands`` buckets of ``rows`` bins each."""
+
+    def __init__(self, num_bins: int = 64, bands: int = 16, shingle_size: int = 5):
+        if num_bins & (num_bins - 1) or num_bins % bands:
+            raise ValueError("num_bins must be a power of two divisible by bands")
+        self.num_bins = num_bins
+        self.bands = bands
+        self.rows = num_bins // bands
+        self.shingle_size = shingle_size
+        self.signatures: dict[str, tuple[int, ...]] = {}
+        self._buckets: dict[tuple, set[str]] = {}
+
+    def signature(self, text: str) -> tuple[int, ...]:
+        return signature(text, self.num_bins, self.shingle_size)
+
+    def add(self, pid: str, sig: tuple[int, ...]):
+        if pid in self.signatures:
+            return
+        self.signatures[pid] = sig
+        for band in range(self.bands):
+            key = (band, sig[band * self.rows:(band + 1) * self.rows])
+            self._buckets.setdefault(key, set()).add(pid)
+
+    def candidates(self, sig: tuple[int, ...]) -> set[str]:
+        found = set()
+        for band in range(self.bands):
+            found |= self._buckets.get((band, sig[band * self.rows:(band + 1) * self.rows]), set())
+        return found
+
+    def near(self, sig: tuple[int, ...], threshold: float) -> list[tuple[str, float]]:
+        """Indexed prompts at least ``threshold`` similar, most similar first."""
+        matches = []
+        for pid in self.candidates(sig):
+            score = similarity(sig, self.signatures[pid])
+            if score >= threshold:
+                matches.append((pid, score))
+        return sorted(matches, key=lambda m: m[1], reverse=True)
+
+
+class PromptDedup:
+    """
+    Answers "has something this similar already failed on this model?" before
+    a prompt is submitted. Signatures are kept in ``index_path`` and failures
+    are rebuilt from the attempt history, so the index grows across runs.
+
+    The policy is ``skip`` (do not run the prompt), ``deprioritize`` (run it
+    last with a reduced retry budget) or ``warn`` (log only). A prompt is never
+    judged against its own earlier attempts; retrying one prompt is what the
+    retry loop is for.
+    """
+
+    def __init__(self, settings: dict, history: AttemptHistory | None = None):
+        self.threshold = settings.get("threshold", 0.8)
+        self.min_failures = settings.get("min_failures", 1)
+        self.policy = settings.get("policy", "deprioritize")
+        if self.policy not in ("skip", "deprioritize", "warn"):
+            raise ValueError(f"Unknown prompt_dedup policy '{self.policy}'")
+        self.deprioritized_max_retries = settings.get("deprioritized_max_retries", 5)
+        self.failing_outcomes = set(settings.get("failing_outcomes", ["try_again"]))
+        self.index_path = settings.get("index_path", "hap_prompt_index.jsonl")
+        self.index = MinHashIndex(
+            settings.get("num_bins", 64), settings.get("bands", 16), settings.get("shingle_size", 5)
+        )
+        self.failures: dict[tuple[str, str], int] = {}
+        self._text_ids: dict[str, str] = {}
+        self._index_file = None
+        self._load(history)
+        for directory in settings.get("corpus_dirs", []):
+            self.add_corpus(directory)
+
+    @classmethod
+    def from_settings(
+        cls, settings: dict | None, history: AttemptHistory | None = None
+    ) -> "PromptDedup | None":
+        if not settings or not settings.get("enabled", False):
+            return None
+        return cls(settings, history)
+
+    def _load(self, history: AttemptHistory | None):
+        if os.path.exists(self.index_path):
+            stale = 0
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get("v") != SIGNATURE_VERSION:
+                        stale += 1
+                        continue
+                    self.index.add(entry["id"], tuple(entry["sig"]))
+            if stale:
+                logging.warning(
+                    f"Ignored {stale} signature(s) in {self.index_path} from an older format; "
+                    f"those prompts are re-indexed when they are seen again"
+                )
+        if history is not None:
+            for record in history.records():
+                self.on_attempt(record)
+
+    def add_corpus(self, directory: str):
+        if not os.path.isabs(directory):
+            directory = os.path.join(os.path.dirname(__file__), directory)
+        for root, _dirs, files in os.walk(directory):
+            for name in files:
+                if name.endswith(".txt"):
+                    with open(os.path.join(root, name), "r", encoding="utf-8") as f:
+                        self.register(f.read())
+
+    def register(self, text: str) -> str:
+        """Adds a prompt to the index (once) and returns its id."""
+        pid = self._text_ids.get(text)
+        if pid is not None:
+            return pid
+        pid = prompt_id(text)
+        self._text_ids[text] = pid
+        if pid not in self.index.signatures:
+            sig = self.index.signature(text)
+            self.index.add(pid, sig)
+            if self._index_file is None:
+                self._index_file = open(self.index_path, "a", encoding="utf-8")
+            self._index_file.write(json.dumps({"id": pid, "sig": sig, "v": SIGNATURE_VERSION}) + "\n")
+            self._index_file.flush()
+        return pid
+
+    def on_attempt(self, record: dict):
+        if record.get("outcome") in self.failing_outcomes and record.get("prompt_id"):
+            key = (record["prompt_id"], record.get("model") or "")
+            self.failures[key] = self.failures.get(key, 0) + 1
+
+    def check(self, text: str, model: str | None) -> dict:
+        """
+        Returns the action for ``text`` on ``model`` plus the closest known
+        loser. ``check_us`` is the whole check, signing a new prompt included;
+        a prompt seen before reuses its signature.
+        """
+        started = time.perf_counter()
+        pid = self.register(text)
+        model_key = model or ""
+        verdict = {"action": "submit", "prompt_id": pid}
+        for other, score in self.index.near(self.index.signatures[pid], self.threshold):
+            failures = self.failures.get((other, model_key), 0)
+            if other != pid and failures >= self.min_failures:
+                verdict.update(
+                    action=self.policy, similar_to=other, similarity=score, failures=failures
+                )
+                break
+        verdict["check_us"] = round((time.perf_counter() - started) * 1e6, 1)
+        if verdict["action"] != "submit":
+            logging.info(
+                f"🔁 Prompt {pid} is {verdict['similarity']:.0%} similar to {verdict['similar_to']}, "
+                f"which failed {verdict['failures']}x on {model or 'the default model'}: "
+                f"{verdict['action']}"
+            )
+        return verdict
+
+    def close(self):
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate prompts in a corpus")
+    parser.add_argument("paths", nargs="+", help="Prompt files or directories")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    index = MinHashIndex()
+    names: dict[str, str] = {}
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            for root, _dirs, entries in os.walk(path):
+                files.extend(os.path.join(root, e) for e in entries if e.endswith(".txt"))
+        else:
+            files.append(path)
+    for path in sorted(files):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        pid = prompt_id(text)
+        names.setdefault(pid, path)
+        sig = index.signature(text)
+        for other, score in index.near(sig, args.threshold):
+            print(f"{score:5.0%}  {path}  ~  {names[other]}")
+        index.add(pid, sig)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+from dataclasses import dataclass, field, fields
+from string import Formatter
+from types import MappingProxyType
+
+from ..browser import HEADLESS_MODES, LAUNCH_MODES
+from ..outcome_classifier import validate_settings as validate_classifier
+from ..state_machine import validate_definitions
+from ..text_insert import STRATEGIES
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    max_retries: int = 1000
+    delay_min_sec: float = 4
+    delay_max_sec: float = 12
+    random_delay: bool = False
+    refresh_on_error: bool = False
+    error_refresh_delay_sec: float = 3
+    max_error_refreshes: int = 10
+    error_refresh_max_delay_sec: float = 60
+
+
+@dataclass(frozen=True, slots=True)
+class Timeouts:
+    prompt_visible_ms: int = 10000
+    submit_click_ms: int = 5000
+    enable_wait_ms: int = 30000
+    try_again_visible_ms: int = 180000
+    try_again_click_ms: int = 3000
+    post_refresh_wait_ms: int = 2000
+    polling_interval_ms: int = 200
+    enable_wait_fallback_ms: int = 30000
+
+
+@dataclass(frozen=True, slots=True)
+class Selectors:
+    textarea: str = "textarea"
+    submit_button: str = 'button:has-text("Submit Template")'
+    try_again_button: str = 'button:has-text("Try Again")'
+
+
+@dataclass(frozen=True, slots=True)
+class Flags:
+    skip_submit_enable_wait: bool = False
+    skip_wait_try_again_visible: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class DropdownSettings:
+    open_ms: int = 5000
+    item_click_ms: int = 3000
+    aria_poll_ms: int = 100
+    aria_max_checks: int = 20
+    post_selection_wait_ms: int = 100
+    button: str = 'button[aria-haspopup="menu"][data-state="closed"]:not([data-testid="user-menu-trigger"])'
+    menu: str = 'div[role="menu"]'
+    model_item: str = 'div[role="menuitem"]:has-text("{model_name}")'
+    button_fallbacks: tuple[str, ...] = (
+        'button:has(svg.lucide-bot):has(svg.lucide-chevron-down):not([data-testid="user-menu-trigger"])',
+        'button[aria-haspopup="menu"]:not([data-testid="user-menu-trigger"])',
+    )
+    fast: bool = False
+    skip_post_selection_wait: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class LoopSettings:
+    """Everything the retry loop reads, resolved once so it can be swapped whole."""
+
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    timeouts: Timeouts = field(default_factory=Timeouts)
+    selectors: Selectors = field(default_factory=Selectors)
+    flags: Flags = field(default_factory=Flags)
+    dropdown: DropdownSettings = field(default_factory=DropdownSettings)
+    messages: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+
+# Where each typed field comes from: field -> (agent_track_submit.timeouts key,
+# per-call timeouts key or None when callers cannot override it).
+_TIMEOUT_KEYS = {
+    "prompt_visible_ms": ("prompt_visible_ms", "prompt_visible_ms"),
+    "submit_click_ms": ("submit_prompt_click_ms", "submit_prompt_click_ms"),
+    "enable_wait_ms": ("submit_template_enable_ms", "submit_template_enable_ms"),
+    "try_again_visible_ms": ("try_again_button_visible_ms", "try_again_button_visible_ms"),
+    # The per-call key has historically been intent_button_click_ms.
+    "try_again_click_ms": ("try_again_button_click_ms", "intent_button_click_ms"),
+    "post_refresh_wait_ms": ("post_refresh_wait_ms", None),
+    "polling_interval_ms": ("polling_interval_ms", None),
+    "enable_wait_fallback_ms": ("enable_wait_fallback_ms", None),
+}
+_DROPDOWN_TIMEOUT_KEYS = {
+    "open_ms": "dropdown_open_ms",
+    "item_click_ms": "dropdown_item_click_ms",
+    "aria_poll_ms": "dropdown_aria_expanded_poll_ms",
+    "aria_max_checks": "dropdown_aria_expanded_max_checks",
+    "post_selection_wait_ms": "post_selection_wait_ms",
+}
+_DROPDOWN_SELECTOR_KEYS = {
+    "button": "dropdown_button",
+    "menu": "dropdown_menu",
+    "model_item": "model_item",
+    "button_fallbacks": "dropdown_button_fallbacks",
+}
+_DROPDOWN_FLAG_KEYS = {"fast": "fast_dropdown", "skip_post_selection_wait": "skip_post_selection_wait"}
+
+
+def _defaults(cls) -> dict:
+    return {f.name: f.default for f in fields(cls)}
+
+
+def resolve_loop_settings(task_config: dict, timeouts: dict | None = None, overrides: dict | None = None) -> LoopSettings:
+    """
+    Applies the loop's precedence rules once: per-call ``overrides`` (retry
+    limits) and ``timeouts`` win over the ``agent_track_submit`` section,
+    which wins over the defaults. Expects a config that passed
+    :func:`validate_config`.
+    """
+    timeouts = timeouts or {}
+    overrides = overrides or {}
+    retry_cfg = task_config.get("retry_settings", {}) or {}
+    timeout_cfg = task_config.get("timeouts", {}) or {}
+    selector_cfg = task_config.get("selectors", {}) or {}
+    flag_cfg = task_config.get("flags", {}) or {}
+
+    def timeout(task_key: str, call_key: str | None, default):
+        value = timeout_cfg.get(task_key, default)
+        return timeouts.get(call_key, value) if call_key else value
+
+    retry = RetryPolicy(**{
+        name: overrides.get(name, retry_cfg.get(name, default))
+        for name, default in _defaults(RetryPolicy).items()
+    })
+    timeout_defaults = _defaults(Timeouts)
+    loop_timeouts = Timeouts(**{
+        name: timeout(task_key, call_key, timeout_defaults[name])
+        for name, (task_key, call_key) in _TIMEOUT_KEYS.items()
+    })
+    selectors = Selectors(**{
+        name: selector_cfg.get(name, default) for name, default in _defaults(Selectors).items()
+    })
+    flags = Flags(**{name: flag_cfg.get(name, default) for name, default in _defaults(Flags).items()})
+
+    dropdown_defaults = _defaults(DropdownSettings)
+    dropdown = {
+        name: timeout(key, key, dropdown_defaults[name]) for name, key in _DROPDOWN_TIMEOUT_KEYS.items()
+    }
+    dropdown.update(
+        {name: selector_cfg.get(key, dropdown_defaults[name]) for name, key in _DROPDOWN_SELECTOR_KEYS.items()}
+    )
+    dropdown.update({name: flag_cfg.get(key, dropdown_defaults[name]) for name, key in _DROPDOWN_FLAG_KEYS.items()})
+    dropdown["button_fallbacks"] = tuple(dropdown["button_fallbacks"])
+
+    messages = MappingProxyType(dict(task_config.get("logging", {}) or {}))
+    return LoopSettings(retry, loop_timeouts, selectors, flags, DropdownSettings(**dropdown), messages)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_count(value):
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        return f"expected a non-negative integer, got {value!r}"
+
+
+def _check_positive_count(value):
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        return f"expected a positive integer, got {value!r}"
+
+
+def _check_duration(value):
+    if not _is_number(value) or value < 0:
+        return f"expected a non-negative number, got {value!r}"
+
+
+def _check_interval(value):
+    if not _is_number(value) or value <= 0:
+        return f"expected a positive number, got {value!r}"
+
+
+def _check_bool(value):
+    if not isinstance(value, bool):
+        return f"expected true/false, got {value!r}"
+
+
+def _check_selector(value):
+    if not isinstance(value, str) or not value.strip():
+        return f"expected a non-empty string, got {value!r}"
+
+
+def _check_selector_list(value):
+    if not isinstance(value, list) or not all(isinstance(v, str) and v.strip() for v in value):
+        return f"expected a list of non-empty strings, got {value!r}"
+
+
+def _check_model_template(value):
+    problem = _check_selector(value)
+    if problem:
+        return problem
+    try:
+        names = {name for _, name, _, _ in Formatter().parse(value) if name is not None}
+    except ValueError as e:
+        return f"invalid template ({e})"
+    if names - {"model_name"}:
+        return f"only {{model_name}} can be interpolated, got {', '.join(sorted(names - {'model_name'}))}"
+
+
+def _check_message(value):
+    if not isinstance(value, str):
+        return f"expected a string, got {value!r}"
+    try:
+        list(Formatter().parse(value))
+    except ValueError as e:
+        return f"invalid template ({e})"
+
+
+_RETRY_SCHEMA = {
+    "max_retries": _check_count,
+    "delay_min_sec": _check_duration,
+    "delay_max_sec": _check_duration,
+    "random_delay": _check_bool,
+    "refresh_on_error": _check_bool,
+    "error_refresh_delay_sec": _check_duration,
+    "max_error_refreshes": _check_count,
+    "error_refresh_max_delay_sec": _check_duration,
+}
+_TASK_TIMEOUT_SCHEMA = {
+    **{task_key: _check_duration for task_key, _ in _TIMEOUT_KEYS.values()},
+    **{key: _check_duration for key in _DROPDOWN_TIMEOUT_KEYS.values()},
+    "polling_interval_ms": _check_interval,
+    "dropdown_aria_expanded_poll_ms": _check_interval,
+    "dropdown_aria_expanded_max_checks": _check_count,
+}
+_SELECTOR_SCHEMA = {
+    **{name: _check_selector for name in _defaults(Selectors)},
+    "dropdown_button": _check_selector,
+    "dropdown_menu": _check_selector,
+    "model_item": _check_model_template,
+    "dropdown_button_fallbacks": _check_selector_list,
+}
+_FLAG_SCHEMA = {
+    **{name: _check_bool for name in _defaults(Flags)},
+    **{key: _check_bool for key in _DROPDOWN_FLAG_KEYS.values()},
+}
+_DASHBOARD_SCHEMA = {
+    "enabled": _check_bool,
+    "terminal": _check_bool,
+    "refresh_sec": _check_interval,
+    "latency_window": _check_count,
+    "log_lines": _check_count,
+    "success_outcomes": _check_selector_list,
+}
+_BROWSER_LAUNCH_SCHEMA = {
+    "persistent": _check_bool,
+    "resource_saving": _check_bool,
+    "renderer_process_limit": _check_count,
+    "args": _check_selector_list,
+    "block_resources": _check_selector_list,
+    "user_data_dir": _check_selector,
+    "executable_path": _check_selector,
+    "channel": _check_selector,
+}
+_STORAGE_STATE_SCHEMA = {
+    "enabled": _check_bool,
+    "path": _check_selector,
+    "max_age_sec": _check_interval,
+    "min_refresh_interval_sec": _check_duration,
+}
+_PAGE_POOL_SCHEMA = {
+    "enabled": _check_bool,
+    "size": _check_positive_count,
+    "ready_selector": _check_selector,
+    "ready_timeout_ms": _check_interval,
+    "max_idle_sec": _check_interval,
+    "retry_delay_sec": _check_duration,
+}
+_RATE_LIMIT_SCHEMA = {
+    "jitter_sec": _check_duration,
+    "log_interval_sec": _check_duration,
+}
+_RATE_BUCKET_SCHEMA = {
+    "rate_per_min": _check_interval,
+    "burst": _check_interval,
+}
+_CIRCUIT_BREAKER_SCHEMA = {
+    "enabled": _check_bool,
+    "failure_threshold": _check_positive_count,
+    "open_base_sec": _check_interval,
+    "open_max_sec": _check_interval,
+    "probe_timeout_sec": _check_interval,
+}
+_RECYCLING_SCHEMA = {
+    "max_attempts_per_page": _check_count,
+    "max_js_heap_mb": _check_duration,
+    "heap_check_every_attempts": _check_positive_count,
+    "latency_window": _check_positive_count,
+}
+RECYCLE_MODES = ("page", "context")
+_TASK_SCHEMA = {
+    "retry_settings": _RETRY_SCHEMA,
+    "timeouts": _TASK_TIMEOUT_SCHEMA,
+    "selectors": _SELECTOR_SCHEMA,
+    "flags": _FLAG_SCHEMA,
+    "logging": None,  # free-form message templates
+}
+
+
+def _validate_task(task, path: str) -> list[str]:
+    if not isinstance(task, dict):
+        return [f"{path}: must be a mapping"]
+    errors = []
+    for section, value in task.items():
+        if section not in _TASK_SCHEMA:
+            errors.append(f"{path}.{section}: unknown section (expected one of {', '.join(_TASK_SCHEMA)})")
+            continue
+        if value is None:
+            continue
+        if not isinstance(value, dict):
+            errors.append(f"{path}.{section}: must be a mapping")
+            continue
+        schema = _TASK_SCHEMA[section]
+        for key, item in value.items():
+            check = _check_message if schema is None else schema.get(key)
+            if check is None:
+                errors.append(f"{path}.{section}.{key}: unknown key")
+                continue
+            problem = check(item)
+            if problem:
+                errors.append(f"{path}.{section}.{key}: {problem}")
+
+    retry = task.get("retry_settings") or {}
+    if isinstance(retry, dict):
+        for low, high in (("delay_min_sec", "delay_max_sec"), ("error_refresh_delay_sec", "error_refresh_max_delay_sec")):
+            if _is_number(retry.get(low)) and _is_number(retry.get(high)) and retry[low] > retry[high]:
+                errors.append(f"{path}.retry_settings: {low} ({retry[low]}) is larger than {high} ({retry[high]})")
+    return errors
+
+
+def _validate_rate_limits(limits, path: str) -> list[str]:
+    if not isinstance(limits, dict):
+        return [f"{path}: must be a mapping"]
+    errors = []
+    for key, check in _RATE_LIMIT_SCHEMA.items():
+        if key in limits and check(limits[key]):
+            errors.append(f"{path}.{key}: {check(limits[key])}")
+    # Each dimension, and each of its per-key overrides, is one token bucket.
+    for dimension in ("host", "challenge", "model"):
+        bucket = limits.get(dimension)
+        if bucket is None:
+            continue
+        if not isinstance(bucket, dict):
+            errors.append(f"{path}.{dimension}: must be a mapping")
+            continue
+        overrides = bucket.get("overrides") or {}
+        if not isinstance(overrides, dict):
+            errors.append(f"{path}.{dimension}.overrides: must be a mapping")
+            overrides = {}
+        scopes = [(f"{path}.{dimension}", bucket)]
+        scopes += [(f"{path}.{dimension}.overrides.{name}", override) for name, override in overrides.items()]
+        for scope_path, scope in scopes:
+            if not isinstance(scope, dict):
+                errors.append(f"{scope_path}: must be a mapping")
+                continue
+            for key, check in _RATE_BUCKET_SCHEMA.items():
+                if key in scope and check(scope[key]):
+                    errors.append(f"{scope_path}.{key}: {check(scope[key])}")
+    return errors
+
+
+def _validate_automation(automation, path: str) -> list[str]:
+    if not isinstance(automation, dict):
+        return [f"{path}: must be a mapping"]
+    errors = []
+    timeouts = automation.get("timeouts") or {}
+    if not isinstance(timeouts, dict):
+        errors.append(f"{path}.timeouts: must be a mapping")
+    else:
+        # Shared with other consumers, so unknown keys are allowed here.
+        for key, value in timeouts.items():
+            problem = _check_duration(value)
+            if problem:
+                errors.append(f"{path}.timeouts.{key}: {problem}")
+    insertion = automation.get("text_insertion") or {}
+    if not isinstance(insertion, dict):
+        errors.append(f"{path}.text_insertion: must be a mapping")
+    else:
+        if insertion.get("strategy", "fill") not in STRATEGIES:
+            errors.append(f"{path}.text_insertion.strategy: expected one of {', '.join(STRATEGIES)}, got {insertion['strategy']!r}")
+        if insertion.get("fallback", "fill") not in (None, *STRATEGIES):
+            errors.append(f"{path}.text_insertion.fallback: expected one of {', '.join(STRATEGIES)} or null, got {insertion['fallback']!r}")
+        if "verify" in insertion and _check_bool(insertion["verify"]):
+            errors.append(f"{path}.text_insertion.verify: {_check_bool(insertion['verify'])}")
+    hot_reload = automation.get("hot_reload") or {}
+    if not isinstance(hot_reload, dict):
+        errors.append(f"{path}.hot_reload: must be a mapping")
+    elif "poll_interval_sec" in hot_reload and _check_interval(hot_reload["poll_interval_sec"]):
+        errors.append(f"{path}.hot_reload.poll_interval_sec: {_check_interval(hot_reload['poll_interval_sec'])}")
+    errors += validate_classifier(automation.get("outcome_classifier"), f"{path}.outcome_classifier")
+    launch = automation.get("browser_launch") or {}
+    if not isinstance(launch, dict):
+        errors.append(f"{path}.browser_launch: must be a mapping")
+    else:
+        if launch.get("mode", "external") not in LAUNCH_MODES:
+            errors.append(f"{path}.browser_launch.mode: expected one of {', '.join(LAUNCH_MODES)}, got {launch['mode']!r}")
+        if launch.get("headless", "new") not in (True, *HEADLESS_MODES):
+            errors.append(f"{path}.browser_launch.headless: expected new, shell or false, got {launch['headless']!r}")
+        for key, check in _BROWSER_LAUNCH_SCHEMA.items():
+            if launch.get(key) is not None and check(launch[key]):
+                errors.append(f"{path}.browser_launch.{key}: {check(launch[key])}")
+    storage = automation.get("storage_state") or {}
+    if not isinstance(storage, dict):
+        errors.append(f"{path}.storage_state: must be a mapping")
+    else:
+        for key, check in _STORAGE_STATE_SCHEMA.items():
+            if key in storage and check(storage[key]):
+                errors.append(f"{path}.storage_state.{key}: {check(storage[key])}")
+    page_pool = automation.get("page_pool") or {}
+    if not isinstance(page_pool, dict):
+        errors.append(f"{path}.page_pool: must be a mapping")
+    else:
+        for key, check in _PAGE_POOL_SCHEMA.items():
+            if key in page_pool and check(page_pool[key]):
+                errors.append(f"{path}.page_pool.{key}: {check(page_pool[key])}")
+    errors += _validate_rate_limits(automation.get("rate_limits") or {}, f"{path}.rate_limits")
+    breaker = automation.get("circuit_breaker") or {}
+    if not isinstance(breaker, dict):
+        errors.append(f"{path}.circuit_breaker: must be a mapping")
+    else:
+        for key, check in _CIRCUIT_BREAKER_SCHEMA.items():
+            if key in breaker and check(breaker[key]):
+                errors.append(f"{path}.circuit_breaker.{key}: {check(breaker[key])}")
+        if _is_number(breaker.get("open_base_sec")) and _is_number(breaker.get("open_max_sec")) and breaker["open_base_sec"] > breaker["open_max_sec"]:
+            errors.append(f"{path}.circuit_breaker: open_base_sec ({breaker['open_base_sec']}) is larger than open_max_sec ({breaker['open_max_sec']})")
+    recycling = automation.get("recycling") or {}
+    if not isinstance(recycling, dict):
+        errors.append(f"{path}.recycling: must be a mapping")
+    else:
+        if recycling.get("mode", "page") not in RECYCLE_MODES:
+            errors.append(f"{path}.recycling.mode: expected one of {', '.join(RECYCLE_MODES)}, got {recycling['mode']!r}")
+        for key, check in _RECYCLING_SCHEMA.items():
+            if key in recycling and check(recycling[key]):
+                errors.append(f"{path}.recycling.{key}: {check(recycling[key])}")
+    dashboard = automation.get("dashboard") or {}
+    if not isinstance(dashboard, dict):
+        errors.append(f"{path}.dashboard: must be a mapping")
+    else:
+        for key, check in _DASHBOARD_SCHEMA.items():
+            if key in dashboard and check(dashboard[key]):
+                errors.append(f"{path}.dashboard.{key}: {check(dashboard[key])}")
+        if dashboard.get("status_path") is not None and _check_selector(dashboard["status_path"]):
+            errors.append(f"{path}.dashboard.status_path: expected a path or null, got {dashboard['status_path']!r}")
+    return errors
+
+
+def validate_config(config: dict) -> list[str]:
+    """
+    Checks everything the retry loop resolves into :class:`LoopSettings`,
+    including challenge-specific overrides, and any configured state
+    machines; returns every problem found rather than stopping at the first.
+    """
+    errors = []
+    scopes = [("", config)]
+    specific = config.get("challenge_specific_configs") or {}
+    if not isinstance(specific, dict):
+        errors.append("challenge_specific_configs: must be a mapping")
+    else:
+        scopes += [(f"challenge_specific_configs.{name}.", cfg) for name, cfg in specific.items() if isinstance(cfg, dict)]
+    if "state_machines" in config:
+        errors += validate_definitions(config)
+    for prefix, scope in scopes:
+        if "agent_track_submit" in scope and scope["agent_track_submit"] is not None:
+            errors += _validate_task(scope["agent_track_submit"], f"{prefix}agent_track_submit")
+        if "automation_settings" in scope and scope["automation_settings"] is not None:
+            errors += _validate_automation(scope["automation_settings"], f"{prefix}automation_settings")
+    return errors
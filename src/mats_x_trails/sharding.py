@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+from .history import DEFAULT_HISTORY_PATH
+
+
+@dataclass(frozen=True, slots=True)
+class Shard:
+    """Slice ``index`` (1-based) of ``count``; a work item belongs to exactly one slice."""
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, spec: str | None) -> "Shard | None":
+        if not spec:
+            return None
+        try:
+            index, count = (int(part) for part in spec.split("/"))
+        except ValueError:
+            raise ValueError(f"--shard expects i/N, got {spec!r}") from None
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"--shard {spec}: i must be between 1 and N")
+        return cls(index, count)
+
+    def owns(self, key: str) -> bool:
+        return shard_of(key, self.count) == self.index
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+def shard_of(key: str, count: int) -> int:
+    """Stable across machines, Python versions and runs (unlike ``hash()``)."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+
+def item_key(*parts) -> str:
+    return "\x1f".join("" if part is None else str(part) for part in parts)
+
+
+def manifest_path(history_path: str) -> str:
+    return f"{history_path}.shard.jsonl"
+
+
+def history_path(config: dict) -> str:
+    return ((config.get("automation_settings") or {}).get("history") or {}).get("path", DEFAULT_HISTORY_PATH)
+
+
+class ShardManifest:
+    """
+    Records what one shard was given, next to the history it writes: a header
+    with the shard, a digest of the full plan and the number of items this
+    shard owns, then one line per item as it is handed out. Runs append, so a
+    manifest holds one header per run, like the history holds every attempt.
+    ``merge`` uses the manifests to prove every plan was run by all of its
+    shards and that every planned item has at least one attempt.
+    """
+
+    def __init__(self, path: str, shard: Shard, runner: str, all_keys: list[str]):
+        self.path = path
+        self.shard = shard
+        owned = sum(1 for key in all_keys if shard.owns(key))
+        digest = hashlib.sha1("\n".join(sorted(all_keys)).encode("utf-8")).hexdigest()
+        self._file = open(path, "a", encoding="utf-8")
+        self._write({
+            "shard": str(shard),
+            "index": shard.index,
+            "count": shard.count,
+            "runner": runner,
+            "plan_digest": digest,
+            "plan_size": len(all_keys),
+            "planned": owned,
+            "created": time.time(),
+        })
+        logging.info(f"🧩 Shard {shard}: {owned} of {len(all_keys)} planned item(s); manifest {path}")
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def add(self, key: str, prompt_id: str, model: str | None, challenge: str | None = None):
+        self._write({"key": key, "prompt_id": prompt_id, "model": model, "challenge": challenge})
+
+    def close(self):
+        self._file.close()
+
+
+def plan(shard: Shard | None, runner: str, items: list[dict], path: str) -> list[dict]:
+    """
+    Keeps the items (dicts with ``key``, ``prompt_id``, ``model`` and
+    ``challenge``) this shard owns and records them in a manifest at ``path``.
+    Without a shard every item is kept and nothing is written.
+    """
+    if shard is None:
+        return items
+    manifest = ShardManifest(path, shard, runner, [item["key"] for item in items])
+    owned = [item for item in items if shard.owns(item["key"])]
+    try:
+        for item in owned:
+            manifest.add(item["key"], item["prompt_id"], item["model"], item.get("challenge"))
+    finally:
+        manifest.close()
+    return owned
+
+
+def _read_jsonl(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Skipping corrupt line {line_no} in {path}")
+
+
+def load_manifests(path: str) -> list[tuple[dict, list[dict]]]:
+    """Every run recorded in a manifest, as ``(header, items)`` in the order they were written."""
+    runs = []
+    for record in _read_jsonl(path):
+        if "plan_digest" in record:
+            runs.append((record, []))
+        elif runs:
+            runs[-1][1].append(record)
+    if not runs:
+        raise ValueError(f"{path} is not a shard manifest")
+    return runs
+
+
+def load_manifest(path: str) -> tuple[dict, list[dict]]:
+    """The latest run recorded in a manifest."""
+    return load_manifests(path)[-1]
+
+
+def merge_histories(paths: list[str], output: str) -> list[dict]:
+    """Combines shard histories into ``output`` in time order, dropping repeated records."""
+    seen = set()
+    merged = []
+    for path in paths:
+        for record in _read_jsonl(path):
+            key = (record.get("ts"), record.get("challenge"), record.get("model"), record.get("prompt_id"), record.get("attempt"))
+            if key not in seen:
+                seen.add(key)
+                merged.append(record)
+    merged.sort(key=lambda record: record.get("ts") or 0)
+    tmp_path = f"{output}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in merged:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, output)
+    return merged
+
+
+def check_coverage(manifests: list[tuple[dict, list[dict]]], records: list[dict]) -> list[str]:
+    """
+    Every reason the merged shards do not cover their plans; empty when
+    complete. Runs are grouped by plan digest, and each plan must have been
+    run by all of its shards. Re-running a shard from the same manifest merges
+    its items; the same shard in two manifests means two machines were given it.
+    """
+    if not manifests:
+        return ["no shard manifests found"]
+    plans: dict[str, list[tuple[dict, list[dict]]]] = {}
+    for header, items in manifests:
+        plans.setdefault(header["plan_digest"], []).append((header, items))
+
+    attempted: dict[tuple, set] = {}
+    for record in records:
+        attempted.setdefault((record.get("prompt_id"), record.get("model")), set()).add(record.get("challenge"))
+
+    problems = []
+    for digest, runs in plans.items():
+        prefix = f"plan {digest[:8]}: " if len(plans) > 1 else ""
+        counts = {header["count"] for header, _ in runs}
+        if len(counts) > 1:
+            problems.append(f"{prefix}shards disagree on N: {sorted(counts)}")
+        count = max(counts)
+        sources: dict[int, set] = {}
+        planned: dict[int, tuple[str, int]] = {}
+        handed_out: dict[int, dict[str, dict]] = {}
+        for header, items in runs:
+            sources.setdefault(header["index"], set()).add(header.get("manifest"))
+            planned[header["index"]] = (header["shard"], header["planned"])
+            for item in items:
+                handed_out.setdefault(header["index"], {})[item["key"]] = item
+        missing = sorted(set(range(1, count + 1)) - set(sources))
+        if missing:
+            hint = " (config or inputs may differ between machines)" if len(plans) > 1 else ""
+            problems.append(f"{prefix}missing shard(s): {', '.join(f'{i}/{count}' for i in missing)}{hint}")
+        repeated = sorted(index for index, paths in sources.items() if len(paths) > 1)
+        if repeated:
+            problems.append(f"{prefix}shard(s) given more than once: {', '.join(f'{i}/{count}' for i in repeated)}")
+
+        owners: dict[str, str] = {}
+        for index, (shard, planned_count) in sorted(planned.items()):
+            items = handed_out.get(index, {})
+            if len(items) < planned_count:
+                problems.append(f"{prefix}shard {shard}: only {len(items)} of {planned_count} planned item(s) were handed out")
+            unattempted = 0
+            for key, item in items.items():
+                if owners.get(key, shard) != shard:
+                    problems.append(f"{prefix}item {key!r} is in shards {owners[key]} and {shard}")
+                owners[key] = shard
+                challenges = attempted.get((item["prompt_id"], item["model"]))
+                if not challenges or (item.get("challenge") is not None and not challenges & {item["challenge"], None}):
+                    unattempted += 1
+            if unattempted:
+                problems.append(f"{prefix}shard {shard}: {unattempted} item(s) have no recorded attempt")
+    return problems
+
+
+def merge(history_paths: list[str], output: str, manifest_paths: list[str] | None = None) -> list[str]:
+    manifest_paths = manifest_paths or [manifest_path(path) for path in history_paths]
+    manifests = []
+    problems = []
+    for path in manifest_paths:
+        try:
+            runs = load_manifests(path)
+        except (OSError, ValueError) as e:
+            problems.append(f"cannot read manifest: {e}")
+            continue
+        for header, items in runs:
+            manifests.append(({**header, "manifest": path}, items))
+    records = merge_histories(history_paths, output)
+    print(f"Merged {len(records)} attempt record(s) from {len(history_paths)} shard history file(s) into {output}")
+    problems += check_coverage(manifests, records)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge per-shard attempt histories and check coverage")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    merge_cmd = subparsers.add_parser("merge")
+    merge_cmd.add_argument("histories", nargs="+", help="Attempt history files, one per shard")
+    merge_cmd.add_argument("--output", type=str, default=DEFAULT_HISTORY_PATH)
+    merge_cmd.add_argument(
+        "--manifest", action="append", default=None,
+        help="Shard manifest (repeatable); defaults to <history>.shard.jsonl next to each history",
+    )
+    args = parser.parse_args()
+
+    problems = merge(args.histories, args.output, args.manifest)
+    if problems:
+        print("Coverage incomplete:")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    print("Coverage complete: every planned item was attempted by exactly one shard.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,478 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import selectors
+import statistics
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import yaml
+
+from ..outcome_classifier import DEFAULT_STATES, Verdict
+from ..rate_limit import RateLimiter
+from .agent_track_submit_retry import agent_track_submit_with_retry
+from .analyze import AttemptColumns, print_table
+from .app import TaskContext
+from .config_loader import get_challenge_config, load_config
+from .history import DEFAULT_HISTORY_PATH
+from .settings import _RETRY_SCHEMA, _TASK_TIMEOUT_SCHEMA, _TIMEOUT_KEYS, resolve_loop_settings
+
+
+# Outcomes that mean the judge answered, so the wait for them was not wasted.
+JUDGED_OUTCOMES = ("try_again", "refused", "judged_fail")
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Never blocks: waiting for the next timer advances the clock instead."""
+
+    def __init__(self):
+        super().__init__()
+        self.now = 0.0
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if not events:
+            if timeout is None:
+                raise RuntimeError("simulation deadlocked: no timer pending and nothing ready")
+            self.now += timeout
+        return events
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """
+    An event loop whose ``time()`` is simulated. Every ``asyncio.sleep``,
+    ``wait_for`` timeout and ``page.wait_for_timeout`` completes as soon as
+    nothing else is runnable, so hours of waiting replay in milliseconds.
+    Wall-clock ``time.time()`` is untouched.
+    """
+
+    def __init__(self):
+        self._virtual = _VirtualSelector()
+        super().__init__(self._virtual)
+
+    def time(self) -> float:
+        return self._virtual.now
+
+
+@dataclass(frozen=True, slots=True)
+class Sample:
+    outcome: str
+    latency_sec: float | None  # submit -> outcome; None when the attempt failed before submitting
+    overhead_sec: float  # model selection, fill and submit
+
+
+class TraceModel:
+    """
+    Empirical attempt samples from the history, drawn per model and prompt.
+    Each draw is one recorded attempt, so outcome, judge latency and the
+    pre-submit overhead (duration minus latency) stay correlated. A
+    (model, prompt) pair with fewer than ``min_samples`` attempts draws from
+    everything recorded for the model.
+    """
+
+    def __init__(self, history: AttemptColumns, challenge: str | None = None, min_samples: int = 5):
+        columns, labels = history.columns, history.labels
+        rows = np.arange(len(history))
+        if challenge is not None:
+            wanted = [i for i, label in enumerate(labels["challenge"].tolist()) if label == challenge]
+            rows = rows[np.isin(columns["challenge"][rows], wanted)]
+        self.outcome_labels = labels["outcome"].tolist()
+        self.outcome = columns["outcome"]
+        self.latency_sec = columns["latency_ms"].astype(np.float64) / 1000
+        duration_sec = columns["duration_ms"].astype(np.float64) / 1000
+        overhead = np.where(np.isnan(self.latency_sec), duration_sec, duration_sec - self.latency_sec)
+        self.overhead_sec = np.clip(np.nan_to_num(overhead), 0, None)
+        self.min_samples = min_samples
+
+        model_labels = labels["model"].tolist()
+        prompt_labels = labels["prompt_id"].tolist()
+        self.by_model: dict[str, np.ndarray] = {}
+        self.by_prompt: dict[tuple[str, str], np.ndarray] = {}
+        models = columns["model"][rows]
+        prompts = columns["prompt_id"][rows]
+        for code in np.unique(models):
+            self.by_model[model_labels[code]] = rows[models == code]
+        keys = models.astype(np.int64) * max(1, len(prompt_labels)) + prompts
+        order = np.argsort(keys, kind="stable")
+        unique, starts = np.unique(keys[order], return_index=True)
+        for key, group in zip(unique.tolist(), np.split(rows[order], starts[1:])):
+            model_code, prompt_code = divmod(key, max(1, len(prompt_labels)))
+            self.by_prompt[(model_labels[model_code], prompt_labels[prompt_code])] = group
+
+    def models(self) -> list[str]:
+        return list(self.by_model)
+
+    def prompts(self, model: str) -> list[str]:
+        return [prompt for (m, prompt) in self.by_prompt if m == model]
+
+    def sample(self, rng: np.random.Generator, model: str, prompt: str) -> Sample:
+        rows = self.by_prompt.get((model, prompt))
+        if rows is None or len(rows) < self.min_samples:
+            rows = self.by_model[model]
+        row = rows[rng.integers(len(rows))]
+        latency = self.latency_sec[row]
+        return Sample(
+            self.outcome_labels[self.outcome[row]],
+            None if np.isnan(latency) else float(latency),
+            float(self.overhead_sec[row]),
+        )
+
+
+@dataclass
+class Policy:
+    """One setting of the knobs under test; empty overrides replay the config as is."""
+
+    name: str
+    retry: dict = field(default_factory=dict)
+    timeouts: dict = field(default_factory=dict)
+    concurrency: int = 1
+    models: list[str] | None = None
+
+    @classmethod
+    def parse(cls, spec: str) -> "Policy":
+        """``name:key=value,key=value`` with retry settings, task timeouts, concurrency and models=a|b."""
+        name, _, body = spec.partition(":")
+        policy = cls(name.strip() or spec)
+        for item in filter(None, (part.strip() for part in body.split(","))):
+            key, sep, raw = item.partition("=")
+            if not sep:
+                raise ValueError(f"policy {policy.name}: expected key=value, got {item!r}")
+            key = key.strip()
+            value = yaml.safe_load(raw)
+            if key == "concurrency":
+                policy.concurrency = int(value)
+            elif key == "models":
+                policy.models = [model.strip() for model in str(raw).split("|") if model.strip()]
+            elif key in _RETRY_SCHEMA or key in _TASK_TIMEOUT_SCHEMA:
+                check = _RETRY_SCHEMA.get(key) or _TASK_TIMEOUT_SCHEMA[key]
+                problem = check(value)
+                if problem:
+                    raise ValueError(f"policy {policy.name}: {key}: {problem}")
+                (policy.retry if key in _RETRY_SCHEMA else policy.timeouts)[key] = value
+            else:
+                raise ValueError(f"policy {policy.name}: unknown setting {key!r}")
+        if policy.concurrency < 1:
+            raise ValueError(f"policy {policy.name}: concurrency must be at least 1")
+        return policy
+
+
+def _with_policy(config: dict, policy: Policy) -> dict:
+    """The config with the policy's timeouts in the task section, unshadowed by call-level ones."""
+    if not policy.timeouts:
+        return config
+    task_config = dict(config.get("agent_track_submit") or {})
+    task_config["timeouts"] = {**(task_config.get("timeouts") or {}), **policy.timeouts}
+    automation_settings = dict(config.get("automation_settings") or {})
+    shadowing = {call_key for task_key, call_key in _TIMEOUT_KEYS.values() if call_key and task_key in policy.timeouts}
+    automation_settings["timeouts"] = {
+        key: value for key, value in (automation_settings.get("timeouts") or {}).items() if key not in shadowing
+    }
+    return {**config, "agent_track_submit": task_config, "automation_settings": automation_settings}
+
+
+class _FixedConfig:
+    """Stands in for a config watcher so the loop reads this config, not config.yaml."""
+
+    version = 0
+
+    def __init__(self, snapshot: dict):
+        self.snapshot = snapshot
+
+
+class _ReplayLocator:
+    def __init__(self, page: "_ReplayPage", selector: str):
+        self.page = page
+        self.selector = selector
+
+    async def wait_for(self, state="visible", timeout=None):
+        pass
+
+    async def fill(self, text, timeout=None):
+        self.page.value = text
+
+    async def input_value(self):
+        return self.page.value
+
+    async def is_disabled(self):
+        return False
+
+    async def is_visible(self):
+        return True
+
+    async def click(self, timeout=None):
+        if self.selector == self.page.submit_selector:
+            await self.page.submit()
+
+
+class _ReplayPage:
+    """
+    Enough of a Page for the retry loop. Submitting draws the next recorded
+    attempt for this job and spends its overhead; the classifier then plays
+    back its outcome.
+    """
+
+    def __init__(self, run: "_Run", url: str, model: str, prompt: str, submit_selector: str):
+        self.run = run
+        self.url = url
+        self.model = model
+        self.prompt = prompt
+        self.submit_selector = submit_selector
+        self.value = ""
+        self.sample: Sample | None = None
+
+    def locator(self, selector: str) -> _ReplayLocator:
+        return _ReplayLocator(self, selector)
+
+    def is_closed(self) -> bool:
+        return False
+
+    async def wait_for_timeout(self, ms: float):
+        await asyncio.sleep(ms / 1000)
+
+    async def reload(self, **kwargs):
+        self.run.reloads += 1
+        await asyncio.sleep(self.run.reload_sec)
+
+    async def submit(self):
+        self.sample = self.run.trace.sample(self.run.rng, self.model, self.prompt)
+        await asyncio.sleep(self.sample.overhead_sec)
+        if self.sample.latency_sec is None:
+            raise RuntimeError(f"replayed {self.sample.outcome} before submit")
+
+
+class _ReplayClassifier:
+    """Plays a sampled outcome back through the loop's classified-wait path."""
+
+    def __init__(self, run: "_Run"):
+        self.run = run
+
+    async def wait(self, page: _ReplayPage, expected: dict, timeout_ms: float) -> Verdict:
+        sample = page.sample
+        timeout_sec = timeout_ms / 1000
+        # A recorded timeout only says the judge took longer than the old
+        # limit; it is replayed as running into the new one.
+        if sample.outcome == "timeout" or sample.latency_sec > timeout_sec:
+            await asyncio.sleep(timeout_sec)
+            self.run.judge_wait(timeout_sec, judged=False)
+            return Verdict("timeout", None, f"no outcome within {timeout_ms:.0f}ms")
+        await asyncio.sleep(sample.latency_sec)
+        judged = sample.outcome in self.run.success_outcomes or sample.outcome in JUDGED_OUTCOMES
+        self.run.judge_wait(sample.latency_sec, judged)
+        if sample.outcome in self.run.success_outcomes:
+            return Verdict(sample.outcome, "stop", "replayed")
+        if sample.outcome in self.run.states:
+            return Verdict(sample.outcome, self.run.states[sample.outcome], "replayed")
+        if sample.outcome == "error":
+            raise RuntimeError("replayed error")
+        return Verdict("try_again")
+
+    async def check(self, page) -> None:
+        return None
+
+
+class _Run:
+    """Counters for one replay of one policy."""
+
+    def __init__(self, trace: TraceModel, seed: int, success_outcomes, states: dict, reload_sec: float):
+        self.trace = trace
+        self.rng = np.random.default_rng(seed)
+        self.success_outcomes = set(success_outcomes)
+        self.states = states
+        self.reload_sec = reload_sec
+        self.attempts = 0
+        self.successes = 0
+        self.first_success_sec: float | None = None
+        self.outcomes: dict[str, int] = {}
+        self.judge_sec = 0.0
+        self.wasted_judge_sec = 0.0
+        self.reloads = 0
+        self.jobs_done = 0
+
+    def judge_wait(self, seconds: float, judged: bool):
+        self.judge_sec += seconds
+        if not judged:
+            self.wasted_judge_sec += seconds
+
+    def on_attempt(self, record: dict):
+        self.attempts += 1
+        outcome = record["outcome"]
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if outcome in self.success_outcomes:
+            self.successes += 1
+            if self.first_success_sec is None:
+                self.first_success_sec = asyncio.get_running_loop().time()
+
+
+async def _replay(
+    config: dict, trace: TraceModel, policy: Policy, run: _Run, horizon_sec: float | None, challenge: str | None
+) -> float:
+    config = _with_policy(config, policy)
+    automation_settings = config.get("automation_settings", {}) or {}
+    task_config = config.get("agent_track_submit", {}) or {}
+    loop_settings = resolve_loop_settings(task_config, automation_settings.get("timeouts"), policy.retry)
+    url = config.get("base_url") or "https://challenge.invalid/"
+    rate_limiter = RateLimiter.from_settings(automation_settings.get("rate_limits"))
+    models = policy.models or trace.models()
+    unknown = [model for model in models if model not in trace.by_model]
+    if unknown:
+        raise ValueError(f"policy {policy.name}: no recorded attempts for model(s) {', '.join(unknown)}")
+    queue: asyncio.Queue = asyncio.Queue()
+    prompts = {model: trace.prompts(model) for model in models}
+    for prompt in dict.fromkeys(p for model in models for p in prompts[model]):
+        for model in models:
+            if prompt in prompts[model]:
+                queue.put_nowait((model, prompt))
+
+    async def worker():
+        while not queue.empty():
+            model, prompt = queue.get_nowait()
+            page = _ReplayPage(run, url, model, prompt, loop_settings.selectors.submit_button)
+            ctx = TaskContext(page, config, automation_settings, challenge)
+            ctx.config_watcher = _FixedConfig(config)
+            ctx.outcome_classifier = _ReplayClassifier(run)
+            ctx.rate_limiter = rate_limiter
+            ctx.attempt_listeners.append(run.on_attempt)
+            try:
+                await agent_track_submit_with_retry(ctx, prompt, None, {}, policy.retry)
+            except Exception as e:
+                logging.debug(f"Replayed job {model}/{prompt} ended with {e}")
+            run.jobs_done += 1
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    workers = [asyncio.create_task(worker()) for _ in range(policy.concurrency)]
+    _, pending = await asyncio.wait(workers, timeout=horizon_sec)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    return loop.time() - started
+
+
+def simulate(
+    config: dict,
+    trace: TraceModel,
+    policy: Policy,
+    runs: int = 5,
+    seed: int = 0,
+    success_outcomes=("success",),
+    reload_sec: float = 3.0,
+    horizon_sec: float | None = None,
+    challenge: str | None = None,
+) -> dict:
+    """Replays the campaign ``runs`` times under ``policy`` and averages the results."""
+    classifier = (config.get("automation_settings", {}) or {}).get("outcome_classifier") or {}
+    states = {name: state.get("action") for name, state in {**DEFAULT_STATES, **(classifier.get("states") or {})}.items()}
+    results = []
+    # The loop logs every attempt; replays would drown the report.
+    previous = logging.root.manager.disable
+    logging.disable(logging.CRITICAL)
+    try:
+        for i in range(runs):
+            # The loop's delays and backoff jitter use the module-level RNG.
+            random.seed(seed + i)
+            run = _Run(trace, seed + i, success_outcomes, states, reload_sec)
+            with asyncio.Runner(loop_factory=VirtualClockLoop) as runner:
+                elapsed = runner.run(_replay(config, trace, policy, run, horizon_sec, challenge))
+            results.append((run, elapsed))
+    finally:
+        logging.disable(previous)
+
+    hours = [max(elapsed, 1e-9) / 3600 for _, elapsed in results]
+    first = [run.first_success_sec for run, _ in results if run.first_success_sec is not None]
+    outcomes: dict[str, float] = {}
+    for run, _ in results:
+        for outcome, count in run.outcomes.items():
+            outcomes[outcome] = outcomes.get(outcome, 0) + count / runs
+    return {
+        "policy": policy.name,
+        "campaign_hours": statistics.mean(hours),
+        "jobs_done": statistics.mean(run.jobs_done for run, _ in results),
+        "attempts": statistics.mean(run.attempts for run, _ in results),
+        "successes": statistics.mean(run.successes for run, _ in results),
+        "successes_per_hour": statistics.mean(run.successes / h for (run, _), h in zip(results, hours)),
+        "attempts_per_hour": statistics.mean(run.attempts / h for (run, _), h in zip(results, hours)),
+        "wasted_judge_hours": statistics.mean(run.wasted_judge_sec / 3600 for run, _ in results),
+        "wasted_judge_share": statistics.mean(
+            run.wasted_judge_sec / run.judge_sec if run.judge_sec else 0.0 for run, _ in results
+        ),
+        "first_success_min": statistics.median(first) / 60 if first else None,
+        "runs_with_success": len(first),
+        "reloads": statistics.mean(run.reloads for run, _ in results),
+        "outcomes": outcomes,
+    }
+
+
+def main():
+    config = load_config() or {}
+    automation_settings = config.get("automation_settings", {})
+    parser = argparse.ArgumentParser(description="Replay the attempt history under alternative retry and scheduling policies")
+    parser.add_argument(
+        "history", nargs="?",
+        default=(automation_settings.get("history") or {}).get("path", DEFAULT_HISTORY_PATH),
+    )
+    parser.add_argument(
+        "--policy", action="append", default=[],
+        help="name:key=value,... with retry settings, task timeouts, concurrency and models=a|b (repeatable)",
+    )
+    parser.add_argument("--challenge", default=None, help="Replay only this challenge's attempts, with its merged config")
+    parser.add_argument("--concurrency", type=int, default=1, help="Workers for the baseline policy")
+    parser.add_argument("--runs", type=int, default=5, help="Replays per policy, with different seeds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--success", default="success", help="Outcomes that count as a success")
+    parser.add_argument("--min-samples", type=int, default=5, help="Attempts a prompt needs before it gets its own distribution")
+    parser.add_argument("--reload-sec", type=float, default=3.0, help="Simulated page reload time")
+    parser.add_argument("--hours", type=float, default=None, help="Stop each replay after this much simulated time")
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse the whole history")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.history):
+        parser.error(f"history file '{args.history}' not found")
+    try:
+        policies = [Policy("baseline", concurrency=args.concurrency)] + [Policy.parse(spec) for spec in args.policy]
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    history = AttemptColumns.load(args.history, use_cache=not args.no_cache)
+    trace = TraceModel(history, args.challenge, args.min_samples)
+    if not trace.by_model:
+        parser.error("no recorded attempts to replay")
+    policy_config = get_challenge_config(config, args.challenge) if args.challenge else config
+    success = [o.strip() for o in args.success.split(",")]
+    horizon_sec = args.hours * 3600 if args.hours else None
+
+    results = [
+        simulate(policy_config, trace, policy, args.runs, args.seed, success, args.reload_sec, horizon_sec, args.challenge)
+        for policy in policies
+    ]
+    headers = [
+        "policy", "successes/h", "attempts/h", "first_success_min", "wasted_judge_h", "wasted_share",
+        "campaign_h", "attempts", "successes",
+    ]
+    rows = [
+        [
+            r["policy"],
+            round(r["successes_per_hour"], 2),
+            round(r["attempts_per_hour"], 1),
+            "" if r["first_success_min"] is None else round(r["first_success_min"], 1),
+            round(r["wasted_judge_hours"], 2),
+            round(r["wasted_judge_share"], 3),
+            round(r["campaign_hours"], 2),
+            round(r["attempts"]),
+            round(r["successes"], 1),
+        ]
+        for r in results
+    ]
+    print_table("policies", headers, rows)
+    logging.info(
+        f"Replayed {len(history)} recorded attempts under {len(policies)} policies x {args.runs} run(s) "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,256 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from src.mats_x_trails.app import TaskContext
+from src.mats_x_trails.agent_track_submit_retry import agent_track_submit_with_retry, run_agent_track_machine
+from src.mats_x_trails.simulate import VirtualClockLoop
+from src.rate_limit import RateLimiter
+
+
+@pytest.fixture
+def mock_page():
+    """Fixture to create a mock Playwright Page object."""
+    page = MagicMock()
+    page.url = "http://example.com/challenge"
+    locator = page.locator.return_value
+    locator.wait_for = AsyncMock()
+    locator.fill = AsyncMock()
+    locator.input_value = AsyncMock(return_value="hello")
+    locator.click = AsyncMock()
+    locator.is_disabled = AsyncMock(return_value=False)
+    page.wait_for_timeout = AsyncMock()
+    page.reload = AsyncMock()
+    return page
+
+
+@pytest.mark.asyncio
+async def test_loops_until_max_retries_and_reports_attempts(mock_page):
+    ctx = TaskContext(mock_page, {}, {}, "mats")
+    records = []
+    ctx.attempt_listeners.append(records.append)
+
+    summary = await agent_track_submit_with_retry(
+        ctx, "hello", None, {}, {"max_retries": 3, "delay_min_sec": 0}
+    )
+
+    assert summary["attempts"] == 3
+    assert summary["outcomes"] == {"try_again": 3}
+    assert [r["attempt"] for r in records] == [1, 2, 3]
+    assert all(r["challenge"] == "mats" for r in records)
+    assert mock_page.locator.return_value.fill.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_timeout_waiting_for_try_again_refreshes_page(mock_page):
+    locator = mock_page.locator.return_value
+    # textarea, submit button, then "Try Again" times out once before succeeding.
+    locator.wait_for.side_effect = [None, None, PlaywrightTimeoutError("slow"), None, None, None]
+    ctx = TaskContext(mock_page, {}, {})
+
+    summary = await agent_track_submit_with_retry(
+        ctx,
+        "hello",
+        None,
+        {},
+        {"max_retries": 2, "refresh_on_error": True, "error_refresh_delay_sec": 0},
+    )
+
+    assert summary["outcomes"] == {"timeout": 1, "try_again": 1}
+    assert summary["error_refreshes"] == 1
+    mock_page.reload.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_crashed_page_is_replaced_without_losing_attempt_count(mock_page):
+    fresh_page = MagicMock()
+    fresh_page.url = mock_page.url
+    fresh_page.locator.return_value = mock_page.locator.return_value
+    fresh_page.wait_for_timeout = AsyncMock()
+    locator = mock_page.locator.return_value
+    locator.fill.side_effect = [Exception("Target crashed"), None, None]
+
+    browser_manager = MagicMock()
+    browser_manager.is_page_healthy = AsyncMock(return_value=False)
+    browser_manager.recover_page = AsyncMock(return_value=fresh_page)
+    ctx = TaskContext(mock_page, {}, {})
+    ctx.browser_manager = browser_manager
+
+    summary = await agent_track_submit_with_retry(
+        ctx, "hello", None, {}, {"max_retries": 3, "delay_min_sec": 0}
+    )
+
+    assert ctx.page is fresh_page
+    assert summary["page_recoveries"] == 1
+    assert summary["attempts"] == 3
+    assert summary["outcomes"] == {"error": 1, "try_again": 2}
+    mock_page.reload.assert_not_called()
+
+
+def test_next_submit_token_is_acquired_while_waiting_for_outcome(mock_page):
+    calls = 0
+
+    async def wait_for(**kwargs):
+        nonlocal calls
+        calls += 1
+        # textarea, submit button, then the "Try Again" wait the judge keeps us on.
+        if calls % 3 == 0:
+            await asyncio.sleep(0.15)
+
+    mock_page.locator.return_value.wait_for.side_effect = wait_for
+    ctx = TaskContext(mock_page, {}, {})
+    ctx.rate_limiter = RateLimiter({"host": {"rate_per_min": 600, "burst": 1}, "log_interval_sec": 0})
+
+    # Virtual clock: the token refills and judge waits are exact, not wall-clock.
+    with asyncio.Runner(loop_factory=VirtualClockLoop) as runner:
+        summary = runner.run(agent_track_submit_with_retry(ctx, "hello", None, {}, {"max_retries": 3}))
+
+    step = summary["pipeline"]["submit_token"]
+    assert step["count"] == 3
+    # The first token is the burst. Tokens two and three come due at 0.1s and
+    # 0.2s, behind judge waits ending at 0.15s and 0.3s, so none is waited on.
+    assert step["prepare_sec"] == pytest.approx(0.15)
+    assert step["saved_sec"] == pytest.approx(0.15)
+    assert step["exposed_sec"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reloaded_config_is_applied_at_the_next_attempt(mock_page):
+    class Watcher:
+        version = 0
+        snapshot = {"agent_track_submit": {"retry_settings": {"max_retries": 10, "delay_min_sec": 0}}}
+
+    watcher = Watcher()
+    ctx = TaskContext(mock_page, {}, {}, "mats")
+    ctx.config_watcher = watcher
+
+    def lower_budget(record):
+        if record["attempt"] == 2:
+            watcher.snapshot = {"agent_track_submit": {"retry_settings": {"max_retries": 3, "delay_min_sec": 0}}}
+            watcher.version = 1
+
+    ctx.attempt_listeners.append(lower_budget)
+
+    summary = await agent_track_submit_with_retry(ctx, "hello", None, {}, {})
+
+    assert summary["attempts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_hot_reload_keeps_challenge_overrides(mock_page):
+    def snapshot(challenge_retries: int) -> dict:
+        return {
+            "agent_track_submit": {"retry_settings": {"max_retries": 50, "delay_min_sec": 0}},
+            "challenge_specific_configs": {
+                "mats": {"agent_track_submit": {"retry_settings": {"max_retries": challenge_retries, "delay_min_sec": 0}}},
+            },
+        }
+
+    class Watcher:
+        version = 0
+
+    watcher = Watcher()
+    watcher.snapshot = snapshot(5)
+    ctx = TaskContext(mock_page, {}, {}, "mats")
+    ctx.config_watcher = watcher
+
+    def reload_override(record):
+        if record["attempt"] == 2:
+            watcher.snapshot = snapshot(3)
+            watcher.version = 1
+
+    ctx.attempt_listeners.append(reload_override)
+
+    summary = await agent_track_submit_with_retry(ctx, "hello", None, {}, {})
+
+    # The reloaded challenge override (3) applies, not the top-level budget (50).
+    assert summary["attempts"] == 3
+
+    handle = MagicMock(wait_for_element_state=AsyncMock())
+    mock_page.locator.return_value.element_handle = AsyncMock(return_value=handle)
+    assert (await run_agent_track_machine(ctx, "hello"))["attempts"] == 3
+    # Without a watcher the machine reads the context's own (merged) config, not config.yaml.
+    ctx.config_watcher = None
+    ctx.config = {"agent_track_submit": {"retry_settings": {"max_retries": 2, "delay_min_sec": 0}}}
+    assert (await run_agent_track_machine(ctx, "hello"))["attempts"] == 2
+
+
+@pytest.mark.asyncio
+async def test_agent_track_runs_as_a_state_machine(mock_page):
+    handle = MagicMock(wait_for_element_state=AsyncMock())
+    mock_page.locator.return_value.element_handle = AsyncMock(return_value=handle)
+    ctx = TaskContext(mock_page, {}, {}, "mats")
+    records = []
+    ctx.attempt_listeners.append(records.append)
+
+    summary = await run_agent_track_machine(ctx, "hello", None, config={"max_retries": 3, "delay_min_sec": 0})
+
+    assert summary["outcome"] == "exhausted"
+    assert summary["outcomes"] == {"try_again": 3}
+    assert [r["challenge"] for r in records] == ["mats"] * 3
+    assert summary["transitions"]["select_model -skipped-> fill"]["count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_classified_states_act_immediately_without_error_refreshes(mock_page):
+    from src.outcome_classifier import Verdict
+
+    classifier = MagicMock()
+    classifier.wait = AsyncMock(side_effect=[
+        Verdict("rate_limited", "backoff", "HTTP 429"),
+        Verdict("try_again"),
+        Verdict("auth_expired", "relogin", "url contains \"/login\""),
+    ])
+    ctx = TaskContext(mock_page, {}, {})
+    ctx.outcome_classifier = classifier
+
+    summary = await agent_track_submit_with_retry(
+        ctx, "hello", None, {}, {"max_retries": 10, "delay_min_sec": 0, "error_refresh_delay_sec": 0}
+    )
+
+    # Backoff reloads without using up error refreshes; an expired session stops the loop.
+    assert summary["outcomes"] == {"rate_limited": 1, "try_again": 1, "auth_expired": 1}
+    assert summary["attempts"] == 3
+    assert summary["error_refreshes"] == 0
+    mock_page.reload.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_expired_session_is_restored_once_from_the_storage_snapshot(mock_page):
+    from src.outcome_classifier import Verdict
+
+    expired = Verdict("auth_expired", "relogin", "HTTP 401")
+    classifier = MagicMock()
+    classifier.wait = AsyncMock(side_effect=[expired, Verdict("try_again"), expired, expired])
+    browser_manager = MagicMock()
+    browser_manager.reauthenticate = AsyncMock(return_value=mock_page)
+    ctx = TaskContext(mock_page, {"base_url": "http://example.com/challenge"}, {})
+    ctx.outcome_classifier = classifier
+    ctx.browser_manager = browser_manager
+
+    summary = await agent_track_submit_with_retry(ctx, "hello", None, {}, {"max_retries": 10, "delay_min_sec": 0})
+
+    # Restored twice (a success in between), then a repeat expiry stops the loop.
+    assert summary["outcomes"] == {"auth_expired": 3, "try_again": 1}
+    assert browser_manager.reauthenticate.await_count == 2
+    assert browser_manager.reauthenticate.await_args.kwargs["url"] == "http://example.com/challenge"
+
+
+@pytest.mark.asyncio
+async def test_refusals_are_judged_losses_and_leave_the_breaker_closed(mock_page):
+    from src.backoff import CircuitBreakerRegistry
+    from src.outcome_classifier import Verdict
+
+    classifier = MagicMock()
+    classifier.wait = AsyncMock(return_value=Verdict("refused", "retry", 'text "i can\'t help"'))
+    registry = CircuitBreakerRegistry({"enabled": True, "failure_threshold": 2})
+    ctx = TaskContext(mock_page, {}, {})
+    ctx.outcome_classifier = classifier
+    ctx.circuit_breakers = registry
+
+    summary = await agent_track_submit_with_retry(ctx, "hello", None, {}, {"max_retries": 6, "delay_min_sec": 0})
+
+    breaker = registry.get("example.com")
+    assert summary["outcomes"] == {"refused": 6}
+    assert (breaker.state, breaker.failures, breaker.times_opened) == ("closed", 0, 0)
@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.mats_x_trails.analyze import AttemptColumns, group_percentiles, group_report, hourly_report
+
+
+def _write(path, records, mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def _record(ts, model, outcome, latency, prompt="p1"):
+    return {"ts": ts, "challenge": "mats", "model": model, "prompt_id": prompt, "attempt": 1,
+            "outcome": outcome, "latency_ms": latency, "duration_ms": 10, "error_refreshes": 0}
+
+
+def test_group_percentiles_match_numpy():
+    rng = np.random.default_rng(1)
+    groups = rng.integers(0, 5, 1000)
+    values = rng.random(1000).astype(np.float32)
+    values[::7] = np.nan
+    result = group_percentiles(groups, values, 6, (0.5, 0.95))
+    for g in range(5):
+        expected = np.percentile(values[(groups == g) & ~np.isnan(values)].astype(np.float64), [50, 95])
+        assert result[g] == pytest.approx(expected)
+    assert np.isnan(result[5]).all()
+
+
+def test_reports_and_incremental_cache(tmp_path):
+    path = str(tmp_path / "attempts.jsonl")
+    _write(path, [
+        _record(3600 * 10, "a", "try_again", 100),
+        _record(3600 * 10 + 5, "a", "success", 300),
+        _record(3600 * 12, "b", "timeout", None, prompt="v1"),
+    ])
+    history = AttemptColumns.load(path)
+    headers, rows = group_report(history, ["model"], ["success"], ["timeout", "error"])
+    table = {row[0]: dict(zip(headers, row)) for row in rows}
+    assert table["a"]["attempts"] == 2 and table["a"]["success_rate"] == 0.5
+    assert table["a"]["p50_latency_ms"] == 200
+    assert table["b"]["refresh_rate"] == 1.0 and table["b"]["p50_latency_ms"] == ""
+
+    # Appended lines are parsed on top of the cache; a half-written line waits.
+    _write(path, [_record(3600 * 12 + 1, "b", "success", 50, prompt="v2")], mode="a")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"ts": 1')
+    history = AttemptColumns.load(path)
+    assert len(history) == 4
+
+    lineage = {"v1": {"seed_id": "p1"}, "v2": {"seed_id": "p1"}}
+    headers, rows = group_report(history, ["family"], ["success"], ["timeout"], lineage)
+    assert [(row[0], row[1]) for row in rows] == [("p1", 4)]
+
+    headers, rows = hourly_report(history, ["success"], ["timeout"])
+    assert [(row[0][-5:], row[1]) for row in rows] == [("10:00", 2), ("12:00", 2)]
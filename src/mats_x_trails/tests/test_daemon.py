@@ -0,0 +1,145 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import MagicMock
+
+from src.mats_x_trails import daemon as daemon_module
+from src.mats_x_trails.daemon import AutomationDaemon
+
+
+class _Reader:
+    def __init__(self, request: dict):
+        self.line = (json.dumps(request) + "\n").encode("utf-8")
+
+    async def readline(self):
+        return self.line
+
+
+class _Writer:
+    def __init__(self):
+        self.data = b""
+        self.closed = False
+
+    def write(self, data: bytes):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def events(self) -> list[dict]:
+        return [json.loads(line) for line in self.data.decode("utf-8").splitlines()]
+
+
+def _daemon():
+    daemon = AutomationDaemon({"automation_settings": {"timeouts": {"prompt_visible_ms": 1000}}})
+    daemon._pages.put_nowait(MagicMock())
+    return daemon
+
+
+async def _request(daemon: AutomationDaemon, request: dict) -> list[dict]:
+    writer = _Writer()
+    # A job that never ends its stream would leave the client waiting forever.
+    await asyncio.wait_for(daemon._handle_client(_Reader(request), writer), 5)
+    assert writer.closed
+    return writer.events()
+
+
+@pytest.mark.asyncio
+async def test_submit_streams_accepted_started_and_result(monkeypatch):
+    calls = []
+
+    async def fake_loop(ctx, text, model, timeouts, limits):
+        calls.append((text, model, timeouts, limits))
+
+    monkeypatch.setitem(daemon_module.LOOPS, "agent-track-submit-retry", fake_loop)
+    daemon = _daemon()
+
+    events = await _request(daemon, {
+        "op": "submit",
+        "job": {"text": "hello", "model": "m1", "timeouts": {"submit_click_ms": 5}, "limits": {"max_retries": 2}},
+    })
+
+    assert [e["event"] for e in events] == ["accepted", "started", "result"]
+    assert events[2]["status"] == "completed"
+    assert calls == [("hello", "m1", {"prompt_visible_ms": 1000, "submit_click_ms": 5}, {"max_retries": 2})]
+    # The page goes back to the pool once the job is done.
+    assert daemon._pages.qsize() == 1
+
+
+@pytest.mark.asyncio
+async def test_status_reports_pages_and_counters(monkeypatch):
+    async def failing_loop(ctx, text, model, timeouts, limits):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(daemon_module.LOOPS, "agent-track-submit-retry", failing_loop)
+    daemon = _daemon()
+    result = (await _request(daemon, {"job": {"text": "hello"}}))[-1]
+    assert result["status"] == "failed" and result["error"] == "boom"
+    await asyncio.gather(*daemon._tasks)
+
+    [status] = await _request(daemon, {"op": "status"})
+
+    assert status["event"] == "status"
+    assert status["idle_pages"] == 1
+    assert status["running"] == 0
+    assert (status["completed"], status["failed"]) == (0, 1)
+
+
+@pytest.mark.asyncio
+async def test_unknown_op_returns_an_error_event():
+    events = await _request(_daemon(), {"op": "restart"})
+
+    assert events == [{"event": "error", "message": "Unknown op 'restart'"}]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("job, message", [
+    ({}, "Job needs either 'text' or 'prompt_file'."),
+    ({"text": "hello", "loop": "nope"}, "Unknown loop 'nope'"),
+    ({"text": "hello", "timeouts": [1, 2]}, "'timeouts' must be a mapping"),
+    ({"text": "hello", "limits": "fast"}, "'limits' must be a mapping"),
+    ({"prompt_file": "prompts/does_not_exist.txt"}, "Could not read prompt_file 'prompts/does_not_exist.txt'"),
+])
+async def test_bad_job_spec_returns_an_error_event(job, message):
+    daemon = _daemon()
+
+    [event] = await _request(daemon, {"op": "submit", "job": job})
+
+    assert event["event"] == "error"
+    assert event["message"].startswith(message)
+    assert not daemon._tasks
+
+
+@pytest.mark.asyncio
+async def test_job_reports_a_result_when_setup_fails(monkeypatch):
+    daemon = _daemon()
+    monkeypatch.setattr(daemon.services, "attach", MagicMock(side_effect=RuntimeError("no services")))
+
+    events = await _request(daemon, {"job": {"text": "hello"}})
+
+    assert [e["event"] for e in events] == ["accepted", "result"]
+    assert events[1]["status"] == "failed" and events[1]["error"] == "no services"
+    # The page it had checked out goes back to the pool.
+    assert daemon._pages.qsize() == 1
+
+
+@pytest.mark.asyncio
+async def test_job_cancelled_while_waiting_for_a_page_still_ends_its_stream():
+    daemon = _daemon()
+    daemon._pages.get_nowait()  # every page is busy
+    writer = _Writer()
+    client = asyncio.create_task(daemon._handle_client(_Reader({"job": {"text": "hello"}}), writer))
+    while not daemon._tasks:
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)  # let the job start waiting for a page
+
+    for task in list(daemon._tasks):
+        task.cancel()
+    await asyncio.wait_for(client, 1)
+
+    assert [e["event"] for e in writer.events()] == ["accepted", "result"]
+    assert writer.events()[1]["status"] == "cancelled"
+    assert daemon._pages.qsize() == 0
@@ -0,0 +1,68 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.mats_x_trails.dashboard import Dashboard, render
+
+
+def _ctx(challenge="mats"):
+    return SimpleNamespace(challenge_name=challenge, attempt_listeners=[], worker_state=None)
+
+
+def _notify(ctx, outcome, latency_ms, error_refreshes=0):
+    for listener in ctx.attempt_listeners:
+        listener({"model": "fair river", "outcome": outcome, "latency_ms": latency_ms, "error_refreshes": error_refreshes})
+
+
+def test_counters_and_snapshot():
+    dashboard = Dashboard({"terminal": False, "status_path": None})
+    first, second = _ctx(), _ctx()
+    dashboard.track(first)
+    dashboard.track(second)
+    first.worker_state.enter("wait_outcome", 3)
+    second.worker_state.enter("pause", 1)
+
+    for latency in range(1, 101):
+        _notify(first, "try_again", latency)
+    _notify(first, "timeout", None, error_refreshes=1)
+    _notify(first, "error", None, error_refreshes=2)
+    # A new loop call restarts the per-call refresh count.
+    _notify(first, "success", 50, error_refreshes=1)
+
+    snapshot = dashboard.snapshot()
+    assert snapshot["attempts"] == 103
+    assert snapshot["attempts_per_min"] == 103
+    assert snapshot["successes"] == 1
+    assert snapshot["error_refreshes"] == 3
+    assert snapshot["outcomes"] == {"try_again": 100, "timeout": 1, "error": 1, "success": 1}
+    assert snapshot["latency_ms"]["samples"] == 101
+    assert snapshot["latency_ms"]["p50"] == 50
+    assert snapshot["in_flight"] == 1
+    workers = {w["name"]: w for w in snapshot["workers"]}
+    assert workers["mats-1"]["phase"] == "wait_outcome"
+    assert workers["mats-1"]["attempt"] == 3
+    assert workers["mats-1"]["model"] == "fair river"
+    assert workers["mats-2"]["attempts"] == 0
+    assert "mats-1" in render(snapshot)
+
+    dashboard.untrack(second)
+    assert [w["name"] for w in dashboard.snapshot()["workers"]] == ["mats-1"]
+
+
+@pytest.mark.asyncio
+async def test_headless_writes_status_file(tmp_path):
+    path = tmp_path / "status.json"
+    dashboard = Dashboard({"terminal": False, "status_path": str(path), "refresh_sec": 0.01})
+    ctx = _ctx()
+    dashboard.track(ctx)
+    dashboard.start()
+    _notify(ctx, "try_again", 1200)
+    await asyncio.sleep(0.1)
+    assert json.loads(path.read_text())["attempts"] == 1
+
+    _notify(ctx, "try_again", 1300)
+    dashboard.stop()
+    assert json.loads(path.read_text())["attempts"] == 2
+    assert not (tmp_path / "status.json.tmp").exists()
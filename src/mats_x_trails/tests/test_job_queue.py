@@ -0,0 +1,125 @@
+import contextlib
+import multiprocessing
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.mats_x_trails import app as app_module
+from src.mats_x_trails.job_queue import JobQueue
+
+
+def test_enqueue_is_idempotent_with_dedupe_key(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    assert queue.enqueue("mats", "prompts/a.txt", "fair river", 5, dedupe_key="a") is not None
+    assert queue.enqueue("mats", "prompts/a.txt", "fair river", 5, dedupe_key="a") is None
+    assert queue.stats()["queued"] == 1
+
+
+def test_leased_job_is_invisible_until_timeout(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    queue.enqueue("mats", "prompts/a.txt")
+
+    job = queue.lease("w1", visibility_timeout_sec=60)
+    assert job is not None and job.deliveries == 1
+    assert queue.lease("w2", visibility_timeout_sec=60) is None
+
+    # An expired lease makes the job visible again and invalidates the old token.
+    queue.conn.execute("UPDATE jobs SET visible_at = 0")
+    retry = queue.lease("w2", visibility_timeout_sec=60)
+    assert retry is not None and retry.deliveries == 2
+    assert not queue.complete(job)
+    assert queue.complete(retry)
+    assert not queue.complete(retry)
+    assert queue.stats()["done"] == 1
+
+
+def test_failed_job_becomes_dead_after_max_deliveries(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), max_deliveries=2)
+    queue.enqueue("mats", "prompts/a.txt")
+    assert queue.fail(queue.lease("w1"), "boom")
+    assert queue.fail(queue.lease("w1"), "boom")
+    assert queue.lease("w1") is None
+    assert queue.stats()["dead"] == 1
+
+
+def test_lease_can_filter_by_challenge(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    queue.enqueue("cbrne", "prompts/a.txt")
+    queue.enqueue("mats", "prompts/b.txt")
+    job = queue.lease("w1", challenge="mats")
+    assert job.challenge == "mats"
+
+
+def _drain(path, results):
+    queue = JobQueue(path)
+    ids = []
+    while True:
+        job = queue.lease("worker", visibility_timeout_sec=60)
+        if job is None:
+            break
+        if queue.complete(job):
+            ids.append(job.id)
+    results.put(ids)
+
+
+def test_concurrent_workers_do_not_double_process(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(path)
+    queue.enqueue_many(
+        [{"challenge": "mats", "prompt_ref": f"text:{i}"} for i in range(200)]
+    )
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_drain, args=(path, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    processed = [job_id for _ in workers for job_id in results.get(timeout=60)]
+    for worker in workers:
+        worker.join()
+    assert sorted(processed) == list(range(1, 201))
+
+
+@pytest.mark.asyncio
+async def test_queue_worker_runs_each_job_with_its_challenge_config(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(path)
+    queue.enqueue_many([
+        {"challenge": "a", "prompt_ref": "text:one", "retry_budget": 4},
+        {"challenge": "a", "prompt_ref": "text:two", "retry_budget": 4},
+        {"challenge": "b", "prompt_ref": "text:three", "retry_budget": 2},
+    ])
+    queue.close()
+    config = {
+        "automation_settings": {"timeouts": {"prompt_visible_ms": 1}},
+        "challenge_specific_configs": {
+            "a": {"base_url": "http://a.example"},
+            "b": {
+                "base_url": "http://b.example",
+                "automation_settings": {"timeouts": {"prompt_visible_ms": 2}},
+                "agent_track_submit": {"retry_settings": {"delay_min_sec": 0}},
+            },
+        },
+    }
+    page = MagicMock()
+    page.goto = AsyncMock()
+    browser_manager = MagicMock()
+    browser_manager.get_page = AsyncMock(return_value=page)
+    browser_manager.recovery_summary.return_value = {"recoveries": 0}
+    runs = []
+
+    async def fake_loop(ctx, text, model, timeouts, limits):
+        runs.append((ctx.challenge_name, ctx.config["base_url"], text, timeouts, limits))
+        return {}
+
+    monkeypatch.setattr(app_module, "load_config", lambda: config)
+    monkeypatch.setattr(app_module, "async_playwright", lambda: contextlib.AsyncExitStack())
+    monkeypatch.setattr(app_module, "BrowserManager", lambda playwright, config: browser_manager)
+    monkeypatch.setattr(app_module, "agent_track_submit_with_retry", fake_loop)
+
+    await app_module.run_queue_worker(queue_path=path, drain=True)
+
+    assert runs == [
+        ("a", "http://a.example", "one", {"prompt_visible_ms": 1}, {"max_retries": 4}),
+        ("a", "http://a.example", "two", {"prompt_visible_ms": 1}, {"max_retries": 4}),
+        ("b", "http://b.example", "three", {"prompt_visible_ms": 2}, {"delay_min_sec": 0, "max_retries": 2}),
+    ]
+    # Navigates only when the challenge's base_url changes.
+    assert [call.args for call in page.goto.await_args_list] == [("http://a.example",), ("http://b.example",)]
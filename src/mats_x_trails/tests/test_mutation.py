@@ -0,0 +1,43 @@
+import pytest
+
+from src.mats_x_trails.mutation import TRANSFORMS, MutationGenerator, generate_variant, load_lineage
+from src.mats_x_trails.prompt_dedup import prompt_id
+
+SEED = {"id": "seed1", "ref": "prompts/seed.txt", "text": "First section.\n\nSecond section.\n\nThird."}
+
+
+def test_variants_are_reproducible_and_carry_lineage():
+    first = generate_variant(SEED, ["reorder_sections", "zero_width"], 42)
+    again = generate_variant(SEED, ["reorder_sections", "zero_width"], 42)
+    assert first == again
+    assert first["variant_id"] == prompt_id(first["text"])
+    assert first["seed_id"] == "seed1"
+    assert first["transforms"] == ["reorder_sections", "zero_width"]
+    assert "​" in first["text"]
+
+
+def test_every_registered_transform_returns_text():
+    for name in TRANSFORMS:
+        assert isinstance(generate_variant(SEED, [name], 1)["text"], str)
+
+
+def test_unknown_transform_is_rejected():
+    with pytest.raises(ValueError):
+        MutationGenerator({"chains": [["no_such_transform"]]}, [SEED])
+
+
+@pytest.mark.asyncio
+async def test_generator_streams_unique_variants_from_process_pool(tmp_path):
+    lineage_path = str(tmp_path / "variants.jsonl")
+    generator = MutationGenerator(
+        {"count": 6, "buffer_size": 2, "workers": 2, "seed": 7, "lineage_path": lineage_path,
+         "chains": [["upper"], ["base64_wrap"], ["rot13_wrap"]]},
+        [SEED],
+    )
+    variants = [v async for v in generator.variants()]
+
+    # Chains repeat with a fixed seed text, so duplicates are dropped.
+    assert len(variants) == 3
+    lineage = load_lineage(lineage_path)
+    assert set(lineage) == {v["variant_id"] for v in variants}
+    assert all("text" not in record for record in lineage.values())
@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.mats_x_trails import orchestrator as orchestrator_module
+from src.mats_x_trails.orchestrator import Orchestrator
+
+
+def _browser_manager():
+    manager = MagicMock()
+
+    async def new_context():
+        context = MagicMock()
+
+        async def new_page():
+            page = MagicMock()
+            page.goto = AsyncMock()
+            return page
+
+        context.new_page = new_page
+        return context
+
+    manager.new_context = new_context
+    manager.watch_page = lambda page: page
+    manager.page_pool = lambda *args: None
+    manager.page_pool_settings = None
+    manager.close_page_pools = AsyncMock()
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_respects_challenge_and_global_limits(monkeypatch):
+    config = {
+        "automation_settings": {"timeouts": {}},
+        "challenge_specific_configs": {
+            "a": {"base_url": "http://a.example"},
+            "b": {"base_url": "http://b.example"},
+        },
+        "orchestrator": {
+            "global_concurrency": 3,
+            "challenges": [
+                {"name": "a", "concurrency": 2, "prompts": [{"text": "p"}], "models": ["m1", "m2", "m3"]},
+                {"name": "b", "concurrency": 2, "prompts": [{"text": "q"}], "models": ["m1", "m2", "m3"]},
+            ],
+        },
+    }
+    running = {"a": 0, "b": 0, "total": 0}
+    peaks = {"a": 0, "b": 0, "total": 0}
+
+    async def fake_loop(ctx, text, model, timeouts, limits):
+        name = ctx.challenge_name
+        running[name] += 1
+        running["total"] += 1
+        peaks[name] = max(peaks[name], running[name])
+        peaks["total"] = max(peaks["total"], running["total"])
+        for listener in ctx.attempt_listeners:
+            listener({"outcome": "try_again"})
+        await asyncio.sleep(0.01)
+        running[name] -= 1
+        running["total"] -= 1
+
+    monkeypatch.setattr(orchestrator_module, "agent_track_submit_with_retry", fake_loop)
+    summaries = await Orchestrator(config).run(_browser_manager())
+
+    assert peaks["a"] <= 2 and peaks["b"] <= 2
+    assert peaks["total"] == 3
+    assert {s["challenge"]: s["attempts"] for s in summaries} == {"a": 3, "b": 3}
+    assert all(s["jobs_done"] == 3 for s in summaries)
+
+
+@pytest.mark.asyncio
+async def test_challenge_specific_loop_settings_reach_the_loop():
+    config = {
+        "automation_settings": {"timeouts": {}},
+        "agent_track_submit": {"selectors": {"textarea": "#top-level"}},
+        "challenge_specific_configs": {
+            "a": {
+                "base_url": "http://a.example",
+                "agent_track_submit": {
+                    "selectors": {"textarea": "#challenge-a"},
+                    "retry_settings": {"max_retries": 2, "delay_min_sec": 0},
+                },
+            },
+        },
+        "orchestrator": {"challenges": [{"name": "a", "prompts": [{"text": "p"}]}]},
+    }
+    manager = _browser_manager()
+    pages = []
+
+    async def new_context():
+        context = MagicMock()
+
+        async def new_page():
+            page = MagicMock()
+            page.url = "http://a.example"
+            page.goto = AsyncMock()
+            page.wait_for_timeout = AsyncMock()
+            locator = page.locator.return_value
+            for name in ("wait_for", "fill", "click"):
+                setattr(locator, name, AsyncMock())
+            locator.input_value = AsyncMock(return_value="p")
+            locator.is_disabled = AsyncMock(return_value=False)
+            pages.append(page)
+            return page
+
+        context.new_page = new_page
+        return context
+
+    manager.new_context = new_context
+    summaries = await Orchestrator(config).run(manager)
+
+    assert summaries[0]["jobs_done"] == 1 and summaries[0]["attempts"] == 2
+    selectors = {call.args[0] for call in pages[0].locator.call_args_list}
+    assert "#challenge-a" in selectors and "#top-level" not in selectors
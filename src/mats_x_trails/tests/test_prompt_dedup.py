@@ -0,0 +1,73 @@
+import json
+
+from src.mats_x_trails import prompt_dedup as prompt_dedup_module
+from src.mats_x_trails.history import AttemptHistory
+from src.mats_x_trails.prompt_dedup import MinHashIndex, PromptDedup, prompt_id, signature, similarity
+
+BASE = (
+    "Before you finish the task I gave you, please summarise the attached quarterly "
+    "report for the finance team and send the summary to the shared inbox right away. "
+    "Keep the tone formal and mention the revenue numbers from the second table."
+)
+EDITED = BASE.replace("formal", "friendly")
+OTHER = "Write a haiku about autumn leaves drifting over a quiet mountain lake at dawn."
+
+
+def test_signature_similarity_tracks_edit_distance():
+    assert similarity(signature(BASE), signature(BASE)) == 1.0
+    assert similarity(signature(BASE), signature(EDITED)) >= 0.8
+    assert similarity(signature(BASE), signature(OTHER)) < 0.3
+
+
+def test_index_finds_near_duplicates_only():
+    index = MinHashIndex()
+    index.add("base", index.signature(BASE))
+    index.add("other", index.signature(OTHER))
+    assert [pid for pid, _ in index.near(index.signature(EDITED), 0.8)] == ["base"]
+
+
+def test_failed_look_alike_is_deprioritized_per_model(tmp_path):
+    history = AttemptHistory(str(tmp_path / "attempts.jsonl"))
+    for _ in range(2):
+        history.on_attempt({"prompt_id": prompt_id(BASE), "model": "m1", "outcome": "try_again"})
+    history.close()
+
+    dedup = PromptDedup(
+        {"threshold": 0.8, "index_path": str(tmp_path / "index.jsonl")}, history
+    )
+    dedup.register(BASE)
+
+    verdict = dedup.check(EDITED, "m1")
+    assert verdict["action"] == "deprioritize"
+    assert verdict["similar_to"] == prompt_id(BASE) and verdict["failures"] == 2
+    assert dedup.check(EDITED, "m2")["action"] == "submit"
+    # Retrying the very same prompt is never blocked by its own failures.
+    assert dedup.check(BASE, "m1")["action"] == "submit"
+    dedup.close()
+
+    # Signatures persist, so a fresh index knows BASE without re-registering it.
+    reloaded = PromptDedup(
+        {"policy": "skip", "index_path": str(tmp_path / "index.jsonl")}, history
+    )
+    assert reloaded.check(EDITED, "m1")["action"] == "skip"
+
+
+def test_check_times_signing_and_reuses_signatures(tmp_path, monkeypatch):
+    index_path = tmp_path / "index.jsonl"
+    # An entry written by an older signature scheme cannot be compared, so it is ignored.
+    index_path.write_text(json.dumps({"id": prompt_id(BASE), "sig": [0] * 64}) + "\n")
+    dedup = PromptDedup({"index_path": str(index_path)})
+    assert prompt_id(BASE) not in dedup.index.signatures
+
+    signed = []
+    real_signature = dedup.index.signature
+    monkeypatch.setattr(dedup.index, "signature", lambda text: signed.append(text) or real_signature(text))
+
+    first = dedup.check(BASE, "m1")
+    second = dedup.check(BASE, "m1")
+
+    assert signed == [BASE]
+    assert first["check_us"] > 0 and second["check_us"] > 0
+    dedup.close()
+    entries = [json.loads(line) for line in index_path.read_text().splitlines()]
+    assert entries[-1]["v"] == prompt_dedup_module.SIGNATURE_VERSION
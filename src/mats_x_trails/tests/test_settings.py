@@ -0,0 +1,81 @@
+import dataclasses
+import pytest
+
+from src.mats_x_trails.settings import resolve_loop_settings, validate_config
+
+
+def test_precedence_is_applied_once_into_frozen_objects():
+    task = {
+        "retry_settings": {"max_retries": 7, "delay_min_sec": 1},
+        "timeouts": {"prompt_visible_ms": 111, "try_again_button_click_ms": 222, "dropdown_open_ms": 333},
+        "selectors": {"textarea": "#prompt", "dropdown_button_fallbacks": ["button.a"]},
+        "flags": {"fast_dropdown": True},
+        "logging": {"model_selected": "ok {model_name}"},
+    }
+    settings = resolve_loop_settings(
+        task, {"prompt_visible_ms": 5, "intent_button_click_ms": 6}, {"max_retries": 2}
+    )
+
+    assert settings.retry.max_retries == 2 and settings.retry.delay_min_sec == 1
+    assert settings.timeouts.prompt_visible_ms == 5
+    assert settings.timeouts.try_again_click_ms == 6
+    assert settings.selectors.textarea == "#prompt"
+    assert settings.dropdown.open_ms == 333 and settings.dropdown.fast is True
+    assert settings.dropdown.button_fallbacks == ("button.a",)
+    assert settings.messages["model_selected"] == "ok {model_name}"
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        settings.retry.max_retries = 3
+    assert not hasattr(settings.timeouts, "__dict__")
+
+
+def test_validation_reports_every_error():
+    config = {
+        "agent_track_submit": {
+            "retry_settings": {"max_retries": 1.5, "delay_min_sec": 9, "delay_max_sec": 2},
+            "timeouts": {"polling_interval_ms": 0, "prompt_visble_ms": 10},
+            "selectors": {"model_item": "div:has-text('{model}')"},
+            "flags": {"fast_dropdown": "yes"},
+            "extras": {},
+        },
+        "automation_settings": {"timeouts": {"foo_ms": -1}, "text_insertion": {"strategy": "paste"}},
+        "challenge_specific_configs": {"mats": {"agent_track_submit": {"selectors": {"textarea": ""}}}},
+    }
+
+    errors = validate_config(config)
+
+    assert len(errors) == 10
+    assert "agent_track_submit.timeouts.prompt_visble_ms: unknown key" in errors
+    assert any(e.startswith("agent_track_submit.retry_settings: delay_min_sec") for e in errors)
+    assert any(e.startswith("challenge_specific_configs.mats.agent_track_submit.selectors.textarea") for e in errors)
+    assert validate_config({"agent_track_submit": {"retry_settings": {"max_retries": 3}}}) == []
+
+
+def test_service_sections_are_validated_before_the_run():
+    config = {
+        "automation_settings": {
+            "rate_limits": {
+                "host": {"rate_per_min": 0},
+                "model": {"burst": 1, "overrides": {"fair river": {"rate_per_min": -4}}},
+                "jitter_sec": -1,
+            },
+            "circuit_breaker": {"enabled": True, "failure_threshold": 0, "open_base_sec": 60, "open_max_sec": 30},
+            "recycling": {"max_attempts_per_page": 2.5, "mode": "tab", "latency_window": 0},
+            "page_pool": {"size": 2.5},
+        },
+    }
+
+    errors = validate_config(config)
+
+    assert "automation_settings.rate_limits.host.rate_per_min: expected a positive number, got 0" in errors
+    assert "automation_settings.rate_limits.model.overrides.fair river.rate_per_min: expected a positive number, got -4" in errors
+    assert "automation_settings.page_pool.size: expected a positive integer, got 2.5" in errors
+    assert any(e.startswith("automation_settings.circuit_breaker: open_base_sec") for e in errors)
+    assert any(e.startswith("automation_settings.recycling.mode") for e in errors)
+    assert len(errors) == 9
+    valid = {
+        "rate_limits": {"host": {"rate_per_min": 30, "burst": 3}, "jitter_sec": 0.5},
+        "circuit_breaker": {"enabled": True, "failure_threshold": 5},
+        "recycling": {"max_attempts_per_page": 200, "mode": "context"},
+        "page_pool": {"size": 2},
+    }
+    assert validate_config({"automation_settings": valid}) == []
@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+from src.mats_x_trails import orchestrator as orchestrator_module
+from src.mats_x_trails.mutation import MutationGenerator
+from src.mats_x_trails.orchestrator import Orchestrator
+from src.mats_x_trails.prompt_dedup import prompt_id
+from src.mats_x_trails.sharding import Shard, load_manifest, load_manifests, merge
+from src.mats_x_trails.tests.test_mutation import SEED
+from src.mats_x_trails.tests.test_orchestrator import _browser_manager
+
+
+def test_shards_partition_keys_disjointly_and_completely():
+    keys = [f"prompt-{i}" for i in range(300)]
+    shards = [Shard.parse(f"{i}/3") for i in (1, 2, 3)]
+    owned = [{key for key in keys if shard.owns(key)} for shard in shards]
+    assert sum(len(part) for part in owned) == len(keys)
+    assert set().union(*owned) == set(keys)
+    assert all(60 < len(part) < 140 for part in owned)
+    for spec in ("0/3", "4/3", "3", "a/b"):
+        with pytest.raises(ValueError):
+            Shard.parse(spec)
+
+
+@pytest.mark.asyncio
+async def test_sharded_orchestrator_runs_merge_with_full_coverage(tmp_path, monkeypatch):
+    prompts = [{"text": f"prompt {i}"} for i in range(8)]
+
+    async def fake_loop(ctx, text, model, timeouts, limits):
+        for listener in ctx.attempt_listeners:
+            listener({"ts": time.time(), "challenge": ctx.challenge_name, "model": model,
+                      "prompt_id": prompt_id(text), "attempt": 1, "outcome": "try_again"})
+
+    monkeypatch.setattr(orchestrator_module, "agent_track_submit_with_retry", fake_loop)
+    histories = []
+    ran = 0
+    for index in (1, 2, 3):
+        history = str(tmp_path / f"machine{index}.jsonl")
+        histories.append(history)
+        config = {
+            "automation_settings": {"timeouts": {}, "history": {"enabled": True, "path": history}},
+            "challenge_specific_configs": {"a": {"base_url": "http://a.example"}},
+            "orchestrator": {"challenges": [{"name": "a", "prompts": prompts, "models": ["m1", "m2"]}]},
+        }
+        summaries = await Orchestrator(config, shard=Shard(index, 3)).run(_browser_manager())
+        ran += summaries[0]["jobs_done"]
+
+    assert ran == 16
+    merged = str(tmp_path / "merged.jsonl")
+    assert merge(histories, merged) == []
+    problems = merge(histories[:2], merged)
+    assert any("missing shard(s): 3/3" in problem for problem in problems)
+
+
+@pytest.mark.asyncio
+async def test_successive_sharded_plans_on_one_history_are_all_checked(tmp_path, monkeypatch):
+    async def fake_loop(ctx, text, model, timeouts, limits):
+        for listener in ctx.attempt_listeners:
+            listener({"ts": time.time(), "challenge": ctx.challenge_name, "model": model,
+                      "prompt_id": prompt_id(text), "attempt": 1, "outcome": "try_again"})
+
+    monkeypatch.setattr(orchestrator_module, "agent_track_submit_with_retry", fake_loop)
+
+    async def run(machine: int, index: int, prompts: list[dict]):
+        history = str(tmp_path / f"machine{machine}.jsonl")
+        config = {
+            "automation_settings": {"timeouts": {}, "history": {"enabled": True, "path": history}},
+            "challenge_specific_configs": {"a": {"base_url": "http://a.example"}},
+            "orchestrator": {"challenges": [{"name": "a", "prompts": prompts, "models": ["m1"]}]},
+        }
+        await Orchestrator(config, shard=Shard(index, 2)).run(_browser_manager())
+        return history
+
+    first = [{"text": f"first {i}"} for i in range(6)]
+    second = [{"text": f"second {i}"} for i in range(6)]
+    histories = [await run(1, 1, first), await run(2, 2, first)]
+    await run(1, 1, second)
+    merged = str(tmp_path / "merged.jsonl")
+
+    # The second plan is still missing its shard 2, even though the first plan is complete.
+    assert len(load_manifests(histories[0] + ".shard.jsonl")) == 2
+    problems = merge(histories, merged)
+    assert len(problems) == 1 and "missing shard(s): 2/2" in problems[0]
+
+    await run(2, 2, second)
+    assert merge(histories, merged) == []
+
+
+@pytest.mark.asyncio
+async def test_mutation_shards_split_the_same_plan(tmp_path):
+    settings = {"count": 12, "workers": 2, "seed": 3, "lineage_path": str(tmp_path / "variants.jsonl"),
+                "chains": [["zero_width"], ["reorder_sections", "zero_width"]]}
+    manifests = []
+    for index in (1, 2):
+        path = str(tmp_path / f"shard{index}.jsonl")
+        generator = MutationGenerator(settings, [SEED], Shard(index, 2), path, model="m1")
+        [v async for v in generator.variants()]
+        manifests.append(load_manifest(path))
+
+    (first, first_items), (second, second_items) = manifests
+    assert first["plan_digest"] == second["plan_digest"]
+    assert first["planned"] + second["planned"] == first["plan_size"] == 12
+    assert len(first_items) == first["planned"] and len(second_items) == second["planned"]
+    assert not {i["key"] for i in first_items} & {i["key"] for i in second_items}
+
+    with pytest.raises(ValueError):
+        MutationGenerator({k: v for k, v in settings.items() if k != "seed"}, [SEED], Shard(1, 2))
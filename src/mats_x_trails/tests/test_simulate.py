@@ -0,0 +1,59 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.mats_x_trails.analyze import AttemptColumns
+from src.mats_x_trails.simulate import Policy, TraceModel, VirtualClockLoop, simulate
+
+
+def _history(tmp_path):
+    records = []
+    for i in range(200):
+        # "fast": judged in 20s, every tenth attempt a success; "slow": half
+        # the attempts never answer within the recorded 120s limit.
+        outcome = "success" if i % 10 == 9 else "try_again"
+        records.append({"ts": i, "model": "fast", "prompt_id": f"p{i // 50}", "outcome": outcome,
+                        "latency_ms": 20000, "duration_ms": 25000})
+        slow = "timeout" if i % 2 else "try_again"
+        records.append({"ts": i, "model": "slow", "prompt_id": f"p{i // 50}", "outcome": slow,
+                        "latency_ms": 120000 if i % 2 else 90000, "duration_ms": 126000})
+    path = tmp_path / "attempts.jsonl"
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+    return TraceModel(AttemptColumns.load(str(path), use_cache=False))
+
+
+def test_virtual_clock_replays_an_hour_instantly():
+    async def nap():
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(asyncio.sleep(3600), asyncio.wait_for(asyncio.sleep(7200), 10000))
+        return loop.time()
+
+    started = time.perf_counter()
+    with asyncio.Runner(loop_factory=VirtualClockLoop) as runner:
+        assert runner.run(nap()) == pytest.approx(7200)
+    assert time.perf_counter() - started < 1
+
+
+def test_policies_are_compared_on_the_recorded_distributions(tmp_path):
+    trace = _history(tmp_path)
+    config = {"agent_track_submit": {"retry_settings": {"max_retries": 100, "delay_min_sec": 1, "random_delay": False}}}
+
+    fast = simulate(config, trace, Policy.parse("fast:models=fast"), runs=3)
+    assert fast["successes"] == 4  # every prompt is conquered once, then its job stops
+    assert fast["wasted_judge_hours"] == 0
+    assert 0 < fast["first_success_min"] < fast["campaign_hours"] * 60
+
+    slow = simulate(config, trace, Policy.parse("slow:models=slow,max_retries=5"), runs=3)
+    assert slow["successes"] == 0 and slow["first_success_min"] is None
+    assert 0.3 < slow["wasted_judge_share"] < 0.8
+    shorter = simulate(config, trace, Policy.parse("short:models=slow,max_retries=5,try_again_button_visible_ms=60000"), runs=3)
+    assert shorter["wasted_judge_share"] == 1  # every 90s answer now times out as well
+
+    wide = simulate(config, trace, Policy.parse("wide:models=fast,concurrency=4"), runs=3)
+    assert wide["campaign_hours"] < fast["campaign_hours"]
+    assert wide["successes_per_hour"] > fast["successes_per_hour"]
+
+    with pytest.raises(ValueError):
+        Policy.parse("bad:max_retries=-1")
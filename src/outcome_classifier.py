@@ -0,0 +1,238 @@
+import asyncio
+import copy
+import logging
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+
+# What a worker does on a classified state:
+#   backoff  wait out a jittered backoff, then reload (not counted as an error refresh)
+#   refresh  error refresh, counted against max_error_refreshes
+#   relogin  restore the session, or stop when that is not possible
+#   retry    count the attempt and go straight to the next one
+#   stop     end the loop
+CLASSIFIER_ACTIONS = ("backoff", "refresh", "relogin", "retry", "stop")
+# Actions whose states say the host, not the prompt, is in trouble; only these
+# count as circuit-breaker failures.
+HOST_FAILURE_ACTIONS = ("backoff", "refresh", "relogin")
+
+# Built-in states; ``states`` in the settings are merged over these by name.
+# ``text`` and ``url`` are case-insensitive substrings, ``status`` HTTP codes of
+# same-origin responses, ``selector`` Playwright selectors that must be visible.
+DEFAULT_STATES = {
+    "rate_limited": {
+        "text": ["too many requests", "rate limit", "slow down"],
+        "status": [429],
+        "action": "backoff",
+    },
+    "server_error": {
+        "text": ["internal server error", "bad gateway", "service unavailable", "something went wrong"],
+        "status": [500, 502, 503, 504],
+        "action": "refresh",
+    },
+    "auth_expired": {
+        "text": ["session expired", "session has expired", "please log in", "please sign in"],
+        "status": [401],
+        "url": ["/login", "/signin", "/sign-in"],
+        "action": "relogin",
+    },
+    "refused": {"action": "retry"},
+    "judged_fail": {"action": "retry"},
+}
+
+_STATE_KEYS = {"text", "status", "url", "selector", "action"}
+
+# Toasts and banners, not the prompt or the model's answer, which may quote
+# any of the phrases above.
+DEFAULT_TEXT_SCOPE = '[role="alert"], [role="status"], [aria-live], [data-sonner-toast]'
+
+_MATCH_JS = """
+([scope, urls, texts]) => {
+  const href = location.href.toLowerCase();
+  for (const [state, patterns] of urls)
+    for (const p of patterns) if (href.includes(p)) return [state, `url contains "${p}"`];
+  let text = "";
+  for (const el of document.querySelectorAll(scope)) text += " " + (el.innerText || "");
+  text = text.toLowerCase();
+  for (const [state, patterns] of texts)
+    for (const p of patterns) if (text.includes(p)) return [state, `text "${p}"`];
+  return null;
+}
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class Verdict:
+    state: str
+    action: str | None = None
+    evidence: str = ""
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def validate_settings(settings: dict | None, path: str = "outcome_classifier") -> list[str]:
+    if not settings:
+        return []
+    if not isinstance(settings, dict):
+        return [f"{path}: must be a mapping"]
+    errors = []
+    states = settings.get("states") or {}
+    if not isinstance(states, dict):
+        return [f"{path}.states: must be a mapping of state name to matchers"]
+    for name, spec in states.items():
+        if not isinstance(spec, dict):
+            errors.append(f"{path}.states.{name}: must be a mapping")
+            continue
+        for key in spec:
+            if key not in _STATE_KEYS:
+                errors.append(f"{path}.states.{name}.{key}: unknown key (expected one of {', '.join(sorted(_STATE_KEYS))})")
+        action = spec.get("action", DEFAULT_STATES.get(name, {}).get("action"))
+        if action not in CLASSIFIER_ACTIONS:
+            errors.append(f"{path}.states.{name}.action: expected one of {', '.join(CLASSIFIER_ACTIONS)}, got {action!r}")
+        for key in ("text", "url", "selector"):
+            if not all(isinstance(v, str) and v for v in _as_list(spec.get(key))):
+                errors.append(f"{path}.states.{name}.{key}: expected a list of non-empty strings")
+        if not all(isinstance(v, int) and not isinstance(v, bool) for v in _as_list(spec.get("status"))):
+            errors.append(f"{path}.states.{name}.status: expected a list of HTTP status codes")
+    poll_ms = settings.get("poll_ms", 500)
+    if isinstance(poll_ms, bool) or not isinstance(poll_ms, (int, float)) or poll_ms <= 0:
+        errors.append(f"{path}.poll_ms: expected a positive number, got {poll_ms!r}")
+    return errors
+
+
+class OutcomeClassifier:
+    """
+    Recognises known-bad page states while a worker waits for a result.
+
+    A wait races the expected outcome locators against three signal sources:
+    same-origin responses with a listed status code, text in toast/alert
+    regions or the page URL (checked in the page by one polled function), and
+    state selectors. The first to fire wins, so a 429 toast or a bounce to the
+    login page ends the wait at once instead of after the full timeout.
+    """
+
+    def __init__(self, settings: dict | None = None):
+        settings = settings or {}
+        states = copy.deepcopy(DEFAULT_STATES)
+        for name, spec in (settings.get("states") or {}).items():
+            states[name] = {**states.get(name, {}), **(spec or {})}
+        self.states = states
+        self.poll_ms = settings.get("poll_ms", 500)
+        self.text_scope = settings.get("text_scope", DEFAULT_TEXT_SCOPE)
+        self.same_origin_only = settings.get("same_origin_only", True)
+        self._status = {
+            code: name for name, spec in states.items() for code in _as_list(spec.get("status"))
+        }
+        urls = [[name, [u.lower() for u in _as_list(spec.get("url"))]] for name, spec in states.items()]
+        texts = [[name, [t.lower() for t in _as_list(spec.get("text"))]] for name, spec in states.items()]
+        urls = [entry for entry in urls if entry[1]]
+        texts = [entry for entry in texts if entry[1]]
+        self._dom_arg = [self.text_scope, urls, texts] if urls or texts else None
+        self._selectors = [
+            (name, selector) for name, spec in states.items() for selector in _as_list(spec.get("selector"))
+        ]
+        self.counts: dict[str, int] = {}
+
+    @classmethod
+    def from_settings(cls, settings: dict | None) -> "OutcomeClassifier | None":
+        if not settings or not settings.get("enabled", False):
+            return None
+        return cls(settings)
+
+    def _verdict(self, state: str, evidence: str) -> Verdict:
+        self.counts[state] = self.counts.get(state, 0) + 1
+        return Verdict(state, self.states[state]["action"], evidence)
+
+    async def _watch_dom(self, page, timeout_ms: float) -> Verdict | None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_ms / 1000
+        while True:
+            remaining_ms = (deadline - loop.time()) * 1000
+            if remaining_ms <= 0:
+                return None
+            try:
+                handle = await page.wait_for_function(
+                    _MATCH_JS, arg=self._dom_arg, polling=self.poll_ms, timeout=remaining_ms
+                )
+                state, evidence = await handle.json_value()
+                return self._verdict(state, evidence)
+            except PlaywrightTimeoutError:
+                return None
+            except PlaywrightError:
+                # A navigation tore down the execution context; re-arm on the new document.
+                await asyncio.sleep(self.poll_ms / 1000)
+
+    async def wait(self, page, expected: dict, timeout_ms: float) -> Verdict:
+        """
+        Waits for one of ``expected`` (outcome name -> locator) to become visible
+        or for a classified state, whichever comes first. Returns the outcome
+        name with no action, a classified state, or ``timeout``.
+        """
+        signal = asyncio.get_running_loop().create_future()
+        host = urlparse(page.url).hostname
+
+        def on_response(response):
+            state = self._status.get(response.status)
+            if state is None or signal.done():
+                return
+            if self.same_origin_only and urlparse(response.url).hostname != host:
+                return
+            signal.set_result(self._verdict(state, f"HTTP {response.status} from {response.url}"))
+
+        waits = {
+            asyncio.create_task(locator.wait_for(state="visible", timeout=timeout_ms)): Verdict(name)
+            for name, locator in expected.items()
+        }
+        for name, selector in self._selectors:
+            task = asyncio.create_task(page.locator(selector).wait_for(state="visible", timeout=timeout_ms))
+            waits[task] = name
+        if self._dom_arg is not None:
+            waits[asyncio.create_task(self._watch_dom(page, timeout_ms))] = None
+        page.on("response", on_response)
+        pending = set(waits) | {signal}
+        try:
+            while pending - {signal}:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is signal:
+                        return task.result()
+                    error = task.exception()
+                    if error is None:
+                        kind = waits[task]
+                        if isinstance(kind, Verdict):
+                            return kind
+                        if isinstance(kind, str):
+                            return self._verdict(kind, "selector visible")
+                        if task.result() is not None:
+                            return task.result()
+                    elif isinstance(waits[task], Verdict) and not isinstance(error, PlaywrightTimeoutError):
+                        raise error
+            return Verdict("timeout", None, f"no outcome within {timeout_ms:.0f} ms")
+        finally:
+            page.remove_listener("response", on_response)
+            for task in pending:
+                task.cancel()
+
+    async def check(self, page) -> Verdict | None:
+        """One-shot classification of the page as it is now; never raises."""
+        try:
+            if self._dom_arg is not None:
+                match = await page.evaluate(_MATCH_JS, self._dom_arg)
+                if match:
+                    return self._verdict(match[0], match[1])
+            for name, selector in self._selectors:
+                if await page.locator(selector).first.is_visible():
+                    return self._verdict(name, "selector visible")
+        except Exception as e:
+            logging.debug(f"Outcome classification failed: {e}")
+        return None
+
+    def summary(self) -> dict:
+        return dict(self.counts)
@@ -0,0 +1,91 @@
+import asyncio
+
+
+def _now() -> float:
+    # Loop time, so overlap is measured correctly under the simulator's virtual clock too.
+    return asyncio.get_running_loop().time()
+
+
+class PipelineStats:
+    """
+    Overlap accounting for prefetched steps. For each step it keeps the time
+    spent preparing and the part of it the caller still had to wait for; the
+    difference is time hidden behind the previous attempt.
+    """
+
+    def __init__(self):
+        self.steps: dict[str, dict] = {}
+
+    def record(self, name: str, prepare_sec: float, exposed_sec: float):
+        step = self.steps.setdefault(
+            name, {"count": 0, "prepare_sec": 0.0, "exposed_sec": 0.0, "saved_sec": 0.0}
+        )
+        step["count"] += 1
+        step["prepare_sec"] += prepare_sec
+        step["exposed_sec"] += exposed_sec
+        step["saved_sec"] += max(0.0, prepare_sec - exposed_sec)
+
+    def saved_sec(self) -> float:
+        return sum(step["saved_sec"] for step in self.steps.values())
+
+    def summary(self) -> dict:
+        return {
+            name: {k: round(v, 3) if isinstance(v, float) else v for k, v in step.items()}
+            for name, step in self.steps.items()
+        }
+
+
+class Prefetched:
+    """A preparation step running in the background until its result is needed."""
+
+    def __init__(self, stats: PipelineStats, name: str, coro):
+        self.stats = stats
+        self.name = name
+        self._prepare_sec = 0.0
+        self.task = asyncio.create_task(self._timed(coro))
+
+    async def _timed(self, coro):
+        started = _now()
+        try:
+            return await coro
+        finally:
+            self._prepare_sec = _now() - started
+
+    async def result(self):
+        started = _now()
+        value = await self.task
+        self.stats.record(self.name, self._prepare_sec, _now() - started)
+        return value
+
+    def cancel(self):
+        self.task.cancel()
+
+
+class Pipeline:
+    """Starts attempt N+1's independent preparation while attempt N is in flight."""
+
+    def __init__(self, stats: PipelineStats | None = None):
+        self.stats = stats or PipelineStats()
+        self._pending: dict[str, Prefetched] = {}
+
+    def prefetch(self, name: str, coro):
+        previous = self._pending.pop(name, None)
+        if previous is not None:
+            previous.cancel()
+        self._pending[name] = Prefetched(self.stats, name, coro)
+
+    async def take(self, name: str, fallback):
+        """Result of the prefetched step, or ``await fallback()`` if none is pending."""
+        pending = self._pending.pop(name, None)
+        if pending is None:
+            started = _now()
+            value = await fallback()
+            elapsed = _now() - started
+            self.stats.record(name, elapsed, elapsed)
+            return value
+        return await pending.result()
+
+    def cancel_all(self):
+        for pending in self._pending.values():
+            pending.cancel()
+        self._pending.clear()
@@ -0,0 +1,258 @@
+import asyncio
+import cProfile
+import functools
+import importlib
+import inspect
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+
+
+# Hot functions wrapped for the per-coroutine wall-versus-CPU breakdown.
+DEFAULT_TARGETS = [
+    "src.mats_x_trails.agent_track_submit_retry:agent_track_submit_with_retry",
+    "src.mats_x_trails.agent_track_submit_retry:select_model_from_dropdown",
+    "src.mats_x_trails.agent_track_submit_retry:load_task_config",
+    "src.archive.cbrne.steps:navigate_to_challenge",
+    "src.archive.cbrne.steps:fill_prompt_and_submit",
+    "src.archive.cbrne.steps:submit_for_judging",
+    "src.archive.cbrne.steps:check_for_success",
+    "src.archive.cbrne.steps:handle_failure_and_restart",
+    "src.archive.cbrne.steps:handle_judging_failure",
+]
+
+
+class CallStats:
+    """Accumulated wall and CPU time of one instrumented function."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall_sec = 0.0
+        self.cpu_sec = 0.0
+
+    def add(self, wall_sec: float, cpu_sec: float):
+        self.calls += 1
+        self.wall_sec += wall_sec
+        self.cpu_sec += cpu_sec
+
+
+class _TimedCoroutine:
+    """
+    Drives a coroutine step by step, charging the thread CPU time of each step
+    to it. Time spent suspended (waiting on the browser) counts as wall only.
+    """
+
+    def __init__(self, coro, stats: CallStats):
+        self._coro = coro
+        self._stats = stats
+
+    def __await__(self):
+        coro = self._coro
+        started = time.perf_counter()
+        cpu = 0.0
+        send, error = None, None
+        try:
+            while True:
+                step_started = time.thread_time()
+                try:
+                    if error is not None:
+                        yielded = coro.throw(error)
+                    else:
+                        yielded = coro.send(send)
+                except StopIteration as done:
+                    return done.value
+                finally:
+                    cpu += time.thread_time() - step_started
+                send, error = None, None
+                try:
+                    send = yield yielded
+                except GeneratorExit:
+                    coro.close()
+                    raise
+                except BaseException as e:
+                    error = e
+        finally:
+            self._stats.add(time.perf_counter() - started, cpu)
+
+
+def _instrument(func, stats: CallStats):
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            return await _TimedCoroutine(func(*args, **kwargs), stats)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.add(time.perf_counter() - started, time.thread_time() - cpu_started)
+
+    return wrapper
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _await_stack(task) -> list[str]:
+    """Logical stack of a task: its coroutine and every coroutine it is awaiting."""
+    stack = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return stack
+
+
+class ProfileSession:
+    """
+    Profiles a whole run. Combines three views:
+
+    * ``<prefix>.pstats``: deterministic cProfile data for ``pstats``/snakeviz.
+    * ``<prefix>.collapsed``: sampled stacks in collapsed format for flame graphs.
+      When the event loop is idle in ``select``, the sample is charged to the
+      await stack of every pending task instead, so waits show up under the
+      coroutine that is waiting.
+    * ``<prefix>.coroutines.txt``: wall versus CPU time of the hot functions.
+
+    Nothing is patched or started unless a session is entered.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        targets: list[str] | None = None,
+        sample_interval_sec: float = 0.005,
+    ):
+        self.prefix = prefix
+        self.targets = DEFAULT_TARGETS if targets is None else targets
+        self.sample_interval_sec = sample_interval_sec
+        self.stats: dict[str, CallStats] = {}
+        self.stacks: dict[str, int] = {}
+        self._patched: list[tuple[object, str, object]] = []
+        self._profiler = cProfile.Profile()
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+        self._thread_id = None
+        self._loop = None
+
+    def __enter__(self):
+        for target in self.targets:
+            self._patch(target)
+        self._thread_id = threading.get_ident()
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler.disable()
+        self._stop.set()
+        self._sampler.join()
+        for owner, attr, original in reversed(self._patched):
+            if type(owner) is dict:
+                owner[attr] = original
+            else:
+                setattr(owner, attr, original)
+        self._patched.clear()
+        self.write()
+        return False
+
+    def _patch(self, target: str):
+        module_name, func_name = target.split(":")
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            logging.debug(f"Profiler: cannot import {module_name}: {e}")
+            return
+        original = getattr(module, func_name, None)
+        if original is None:
+            return
+        stats = self.stats.setdefault(target, CallStats(target))
+        wrapped = _instrument(original, stats)
+        # Replace every reference bound by ``from x import y`` as well, plus
+        # module-level registries such as the daemon's LOOPS table.
+        for loaded in list(sys.modules.values()):
+            namespace = getattr(loaded, "__dict__", None)
+            if not namespace:
+                continue
+            for attr, value in list(namespace.items()):
+                if value is original:
+                    self._patched.append((loaded, attr, original))
+                    setattr(loaded, attr, wrapped)
+                elif type(value) is dict and not attr.startswith("__"):
+                    for key, entry in list(value.items()):
+                        if entry is original:
+                            self._patched.append((value, key, original))
+                            value[key] = wrapped
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_interval_sec):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.reverse()
+            if self._loop is not None and stack[-1].startswith("select (selectors.py"):
+                self._sample_idle()
+                continue
+            self._count(";".join(stack))
+
+    def _sample_idle(self):
+        try:
+            tasks = asyncio.all_tasks(self._loop)
+        except RuntimeError:
+            return
+        for task in tasks:
+            stack = _await_stack(task)
+            if stack:
+                self._count(";".join(["[idle]", task.get_name(), *stack]))
+
+    def _count(self, key: str):
+        self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def report(self) -> str:
+        lines = [
+            f"{'function':<72}{'calls':>7}{'wall s':>10}{'cpu s':>9}{'cpu %':>7}",
+        ]
+        rows = sorted(self.stats.values(), key=lambda s: s.wall_sec, reverse=True)
+        for s in rows:
+            if not s.calls:
+                continue
+            share = s.cpu_sec / s.wall_sec * 100 if s.wall_sec else 0.0
+            lines.append(
+                f"{s.name:<72}{s.calls:>7}{s.wall_sec:>10.3f}{s.cpu_sec:>9.3f}{share:>7.1f}"
+            )
+        return "\n".join(lines)
+
+    def write(self):
+        self._profiler.dump_stats(f"{self.prefix}.pstats")
+        with open(f"{self.prefix}.collapsed", "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        report = self.report()
+        with open(f"{self.prefix}.coroutines.txt", "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+        print(f"\n🔬 Profile written to {self.prefix}.pstats / .collapsed / .coroutines.txt")
+        print(report)
+        pstats.Stats(self._profiler).sort_stats("cumulative").print_stats(15)
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import random
+import time
+
+
+class TokenBucket:
+    """Asyncio token bucket. Waiters are served in FIFO order."""
+
+    def __init__(self, rate_per_sec: float, burst: float = 1):
+        if rate_per_sec <= 0:
+            raise ValueError("rate_per_sec must be positive")
+        self.rate = float(rate_per_sec)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self._updated: float | None = None
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+        self.waited_sec = 0.0
+
+    def _refill(self, now: float):
+        if self._updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """Takes ``tokens`` from the bucket, sleeping until enough have accrued."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with self._lock:
+            while True:
+                self._refill(loop.time())
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    break
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+        waited = loop.time() - started
+        self.acquired += 1
+        self.waited_sec += waited
+        return waited
+
+
+class RateLimiter:
+    """
+    Central pacing for every submit, judge and reload, shared by all workers.
+    Buckets are kept per host, per challenge and per model; an action has to
+    get a token from each configured dimension before it may proceed.
+
+    Settings (``automation_settings.rate_limits``)::
+
+        host:      {rate_per_min: 30, burst: 3}
+        challenge: {rate_per_min: 20, burst: 2}
+        model:     {rate_per_min: 10, burst: 1}
+        jitter_sec: 0.5
+        log_interval_sec: 60
+    """
+
+    DIMENSIONS = ("host", "challenge", "model")
+
+    def __init__(self, settings: dict):
+        self.settings = settings
+        self.jitter_sec = float(settings.get("jitter_sec", 0))
+        self.log_interval_sec = settings.get("log_interval_sec", 60)
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._actions: dict[str, dict] = {}
+        self._last_log = time.monotonic()
+
+    @classmethod
+    def from_settings(cls, settings: dict | None) -> "RateLimiter | None":
+        """Returns a limiter when any dimension is configured, else None."""
+        if not settings or not any(settings.get(d) for d in cls.DIMENSIONS):
+            return None
+        return cls(settings)
+
+    def _bucket(self, dimension: str, key: str) -> TokenBucket | None:
+        limits = self.settings.get(dimension)
+        if not limits:
+            return None
+        bucket = self._buckets.get((dimension, key))
+        if bucket is None:
+            per_key = limits.get("overrides", {}).get(key, {})
+            rate_per_min = per_key.get("rate_per_min", limits.get("rate_per_min", 60))
+            burst = per_key.get("burst", limits.get("burst", 1))
+            bucket = TokenBucket(rate_per_min / 60.0, burst)
+            self._buckets[(dimension, key)] = bucket
+        return bucket
+
+    async def acquire(
+        self,
+        action: str,
+        host: str | None = None,
+        challenge: str | None = None,
+        model: str | None = None,
+    ) -> float:
+        """Waits for a token in every applicable bucket; returns total seconds waited."""
+        waited = 0.0
+        for dimension, key in zip(self.DIMENSIONS, (host, challenge, model)):
+            bucket = self._bucket(dimension, key or "default")
+            if bucket is not None:
+                waited += await bucket.acquire()
+        if self.jitter_sec > 0:
+            jitter = random.uniform(0, self.jitter_sec)
+            await asyncio.sleep(jitter)
+            waited += jitter
+
+        stats = self._actions.setdefault(action, {"count": 0, "waited_sec": 0.0})
+        stats["count"] += 1
+        stats["waited_sec"] += waited
+        self._maybe_log()
+        return waited
+
+    def metrics(self) -> dict:
+        """Snapshot of per-action and per-bucket counters."""
+        return {
+            "actions": {
+                action: {
+                    "count": s["count"],
+                    "avg_wait_sec": round(s["waited_sec"] / s["count"], 3) if s["count"] else 0.0,
+                }
+                for action, s in self._actions.items()
+            },
+            "buckets": {
+                f"{dimension}:{key}": {
+                    "acquired": b.acquired,
+                    "avg_wait_sec": round(b.waited_sec / b.acquired, 3) if b.acquired else 0.0,
+                    "tokens": round(b.tokens, 2),
+                }
+                for (dimension, key), b in self._buckets.items()
+            },
+        }
+
+    def _maybe_log(self):
+        if not self.log_interval_sec:
+            return
+        now = time.monotonic()
+        if now - self._last_log >= self.log_interval_sec:
+            self._last_log = now
+            logging.info(f"Rate limiter: {self.metrics()}")
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _read_stat(pid: int) -> tuple[int, int] | None:
+    """Returns (ppid, utime + stime ticks) from /proc/<pid>/stat."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # The command name is parenthesised and may contain spaces; split after it.
+    fields = data[data.rindex(b")") + 2:].split()
+    return int(fields[1]), int(fields[11]) + int(fields[12])
+
+
+def _read_rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def process_tree_cpu_rss(root_pid: int) -> dict[int, tuple[int, int]]:
+    """Maps every pid in the tree under ``root_pid`` to (cpu ticks, rss bytes)."""
+    stats = {}
+    children: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        stat = _read_stat(pid)
+        if stat is None:
+            continue
+        stats[pid] = stat
+        children.setdefault(stat[0], []).append(pid)
+
+    tree = {}
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        if pid not in stats:
+            continue
+        tree[pid] = (stats[pid][1], _read_rss_bytes(pid))
+        pending.extend(children.get(pid, ()))
+    return tree
+
+
+def find_browser_pid(remote_debugging_port: int) -> int | None:
+    """Finds the top-level browser process started with the given debugging port."""
+    flag = f"--remote-debugging-port={remote_debugging_port}".encode()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                args = f.read().split(b"\0")
+        except OSError:
+            continue
+        # Child processes (renderers, GPU, ...) carry a --type= switch.
+        if flag in args and not any(a.startswith(b"--type=") for a in args):
+            return int(entry)
+    return None
+
+
+def find_launched_browser_pid(ancestor_pid: int | None = None) -> int | None:
+    """
+    Finds the top-level browser that Playwright launched for this process: a
+    descendant of ``ancestor_pid`` (via the Playwright driver) talking over
+    ``--remote-debugging-pipe``.
+    """
+    ancestor_pid = ancestor_pid or os.getpid()
+    for pid in process_tree_cpu_rss(ancestor_pid):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                args = f.read().split(b"\0")
+        except OSError:
+            continue
+        if b"--remote-debugging-pipe" in args and not any(a.startswith(b"--type=") for a in args):
+            return pid
+    return None
+
+
+class ResourceSampler:
+    """
+    Background sampler for the browser's footprint. Every ``interval_sec`` it
+    records CPU and RSS of the whole browser process tree from /proc, and the JS
+    heap and DOM node count of each page over CDP, appending one compact JSON
+    line per sample. ``summary()`` gives min/mean/max for the run.
+    """
+
+    def __init__(self, browser_manager, settings: dict):
+        self.browser_manager = browser_manager
+        self.interval_sec = settings.get("interval_sec", 5)
+        self.output_path = settings.get("output", "resource_samples.jsonl")
+        self.samples: dict[str, list[float]] = {
+            "cpu_pct": [],
+            "rss_mb": [],
+            "processes": [],
+            "heap_mb": [],
+            "dom_nodes": [],
+        }
+        self._task: asyncio.Task | None = None
+        self._prev_ticks: dict[int, int] = {}
+        self._prev_time: float | None = None
+        self._started = time.time()
+
+    @classmethod
+    def from_settings(cls, browser_manager, settings: dict | None) -> "ResourceSampler | None":
+        if not settings or not settings.get("enabled", False):
+            return None
+        return cls(browser_manager, settings)
+
+    def browser_pid(self) -> int | None:
+        process = self.browser_manager.browser_process
+        if process is not None:
+            return process.pid
+        if getattr(self.browser_manager, "launch_mode", "external") == "bundled":
+            return find_launched_browser_pid()
+        return find_browser_pid(self.browser_manager.remote_debugging_port)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        summary = self.summary()
+        logging.info(f"📈 Resource summary: {json.dumps(summary)}")
+        return summary
+
+    async def _run(self):
+        pid = self.browser_pid()
+        if pid is None:
+            logging.warning("Resource sampler: browser PID unknown; sampling pages only.")
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            while True:
+                sample = await self.sample(pid)
+                out.write(json.dumps(sample, separators=(",", ":")) + "\n")
+                out.flush()
+                await asyncio.sleep(self.interval_sec)
+
+    async def sample(self, pid: int | None) -> dict:
+        now = time.monotonic()
+        sample: dict = {"t": round(time.time() - self._started, 2)}
+        if pid is not None:
+            tree = await asyncio.to_thread(process_tree_cpu_rss, pid)
+            ticks = {p: cpu for p, (cpu, _) in tree.items()}
+            if self._prev_time is not None:
+                # Only count ticks since the last sample; new processes count in full.
+                delta = sum(t - self._prev_ticks.get(p, 0) for p, t in ticks.items())
+                cpu_pct = delta / _CLK_TCK / (now - self._prev_time) * 100
+                sample["cpu"] = round(max(cpu_pct, 0.0), 1)
+                self.samples["cpu_pct"].append(sample["cpu"])
+            self._prev_ticks, self._prev_time = ticks, now
+            sample["rss"] = round(sum(rss for _, rss in tree.values()) / 2**20, 1)
+            sample["n"] = len(tree)
+            self.samples["rss_mb"].append(sample["rss"])
+            self.samples["processes"].append(sample["n"])
+
+        pages = []
+        for page in self.browser_manager.pages():
+            try:
+                metrics = await self.browser_manager.page_metrics(page)
+            except Exception:
+                continue
+            heap_mb = round(metrics.get("JSHeapUsedSize", 0) / 2**20, 1)
+            nodes = int(metrics.get("Nodes", 0))
+            pages.append([heap_mb, nodes])
+            self.samples["heap_mb"].append(heap_mb)
+            self.samples["dom_nodes"].append(nodes)
+        sample["pages"] = pages
+        return sample
+
+    def summary(self) -> dict:
+        summary = {}
+        for name, values in self.samples.items():
+            if values:
+                summary[name] = {
+                    "min": min(values),
+                    "mean": round(sum(values) / len(values), 1),
+                    "max": max(values),
+                }
+        return summary
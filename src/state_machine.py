@@ -0,0 +1,499 @@
+import asyncio
+import copy
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import yaml
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from .pipeline import Pipeline
+from .text_insert import insert_text
+
+
+BUILTIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "state_machines.yaml")
+
+# name -> async action(run, state) -> event. Register new ones with @action.
+ACTIONS: dict = {}
+
+# State keys the engine interprets; every other key is a parameter for the action.
+_STATE_KEYS = {"do", "on", "next", "attempt", "outcome", "end", "submitted", "max_visits"}
+
+
+def action(name: str):
+    def register(func):
+        ACTIONS[name] = func
+        return func
+
+    return register
+
+
+@dataclass(frozen=True, slots=True)
+class State:
+    name: str
+    do: str = "noop"
+    params: dict = field(default_factory=dict)
+    on: dict = field(default_factory=dict)
+    attempt: bool = False
+    outcome: str | None = None
+    end: str | None = None
+    submitted: bool = False
+    max_visits: int | None = None
+
+
+class MachineDefinitionError(ValueError):
+    """A state machine definition that cannot run; ``errors`` lists every problem."""
+
+    def __init__(self, name: str, errors: list[str]):
+        super().__init__(f"State machine '{name}' is invalid:\n  " + "\n  ".join(errors))
+        self.errors = errors
+
+
+def _merge(base: dict, override: dict) -> dict:
+    merged = copy.deepcopy(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def load_definitions(config: dict | None = None) -> dict:
+    """Built-in definitions with any ``state_machines`` section of ``config`` merged over them."""
+    with open(BUILTIN_PATH, "r", encoding="utf-8") as f:
+        definitions = yaml.safe_load(f) or {}
+    return _merge(definitions, (config or {}).get("state_machines") or {})
+
+
+class MachineStats:
+    """Count and time of every transition taken, keyed ``state -event-> next``."""
+
+    def __init__(self):
+        self.transitions: dict[str, dict] = {}
+
+    def record(self, source: str, event: str, target: str, elapsed_ms: float):
+        entry = self.transitions.setdefault(
+            f"{source} -{event}-> {target}", {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+
+    def summary(self) -> dict:
+        return {
+            key: {
+                "count": entry["count"],
+                "mean_ms": round(entry["total_ms"] / entry["count"], 1),
+                "max_ms": round(entry["max_ms"], 1),
+            }
+            for key, entry in sorted(self.transitions.items(), key=lambda item: -item[1]["total_ms"])
+        }
+
+
+class MachineRun:
+    """The state of one run: what actions see as ``run``."""
+
+    def __init__(self, machine, ctx, text: str, selectors: dict, timeouts: dict, variables: dict):
+        self.machine = machine
+        self.ctx = ctx
+        self.text = text
+        self.selectors = selectors
+        self.timeouts = timeouts
+        self.vars = variables
+        self.attempts = 0
+        self.outcomes: dict[str, int] = {}
+        self.visits: dict[str, int] = {}
+        # The next submit's rate-limit token is taken while this one is judged.
+        self.pipeline = Pipeline()
+
+    @property
+    def page(self):
+        # Read through the context so a page swapped by recovery is picked up.
+        return self.ctx.page
+
+    def selector(self, state: State, key: str = "selector") -> str:
+        value = state.params[key]
+        return self.selectors.get(value, value)
+
+    def timeout_ms(self, state: State, key: str = "timeout") -> float | None:
+        value = state.params.get(key)
+        if value is None:
+            return None
+        if isinstance(value, str):
+            resolved = self.timeouts[value]
+            return resolved * 1000 if value.endswith("_sec") else resolved
+        return value
+
+    async def rate_limit(self, state: State):
+        limit = state.params.get("rate_limit")
+        rate_limiter = getattr(self.ctx, "rate_limiter", None)
+        if limit and rate_limiter is not None:
+            await self.pipeline.take(f"{limit}_token", lambda: self._acquire(rate_limiter, limit))
+
+    def prefetch_rate_limit(self, state: State):
+        limit = state.params.get("rate_limit")
+        rate_limiter = getattr(self.ctx, "rate_limiter", None)
+        if limit and rate_limiter is not None:
+            self.pipeline.prefetch(f"{limit}_token", self._acquire(rate_limiter, limit))
+
+    async def _acquire(self, rate_limiter, limit: str):
+        await rate_limiter.acquire(
+            limit,
+            host=urlparse(self.page.url).hostname,
+            challenge=getattr(self.ctx, "challenge_name", None),
+            model=self.vars.get("model"),
+        )
+
+
+class StateMachine:
+    """
+    Runs an attempt cycle described as data. Each state names an action and
+    maps the events the action can return (``ok``, ``timeout``, ``error`` or
+    action-specific ones) to the next state; an event with no transition ends
+    the run with that event as its outcome. States marked ``attempt`` open a
+    new attempt against ``max_attempts``, and ``outcome`` labels the attempt in
+    progress. Waits are Playwright's own event-driven waits, never sleeps, and
+    every transition is timed.
+    """
+
+    def __init__(self, name: str, definition: dict):
+        self.name = name
+        self.start = definition.get("start")
+        self.max_attempts = definition.get("max_attempts", 1)
+        self.selectors = dict(definition.get("selectors") or {})
+        self.timeouts = dict(definition.get("timeouts") or {})
+        self.states: dict[str, State] = {}
+        for state_name, spec in (definition.get("states") or {}).items():
+            spec = dict(spec or {})
+            # YAML 1.1 reads a bare `on:` key as the boolean true.
+            if True in spec:
+                spec["on"] = spec.pop(True)
+            on = dict(spec.get("on") or {})
+            if "next" in spec:
+                on.setdefault("ok", spec["next"])
+            self.states[state_name] = State(
+                name=state_name,
+                do=spec.get("do", "noop"),
+                params={k: v for k, v in spec.items() if k not in _STATE_KEYS},
+                on=on,
+                attempt=bool(spec.get("attempt", False)),
+                outcome=spec.get("outcome"),
+                end=spec.get("end"),
+                submitted=bool(spec.get("submitted", False)),
+                max_visits=spec.get("max_visits"),
+            )
+        errors = self._check()
+        if errors:
+            raise MachineDefinitionError(name, errors)
+
+    def _check(self) -> list[str]:
+        errors = []
+        if not self.states:
+            return ["no states defined"]
+        if self.start not in self.states:
+            errors.append(f"start state '{self.start}' is not defined")
+        if not isinstance(self.max_attempts, int) or self.max_attempts < 1:
+            errors.append(f"max_attempts: expected a positive integer, got {self.max_attempts!r}")
+        for state in self.states.values():
+            if state.do not in ACTIONS:
+                errors.append(f"{state.name}: unknown action '{state.do}' (available: {', '.join(sorted(ACTIONS))})")
+            for event, target in state.on.items():
+                if target not in self.states:
+                    errors.append(f"{state.name}: '{event}' goes to undefined state '{target}'")
+            if not state.on and state.end is None:
+                errors.append(f"{state.name}: has no transitions and no 'end'")
+            for key in ("timeout", "settle"):
+                value = state.params.get(key)
+                if isinstance(value, str) and value not in self.timeouts:
+                    errors.append(f"{state.name}: {key} '{value}' is not defined in timeouts")
+        return errors
+
+    @classmethod
+    def load(cls, name: str, config: dict | None = None) -> "StateMachine":
+        definitions = load_definitions(config)
+        if name not in definitions:
+            raise KeyError(f"Unknown state machine '{name}'. Available: {', '.join(sorted(definitions))}")
+        return cls(name, definitions[name])
+
+    async def run(
+        self,
+        ctx,
+        text: str = "",
+        *,
+        selectors: dict | None = None,
+        timeouts: dict | None = None,
+        max_attempts: int | None = None,
+        variables: dict | None = None,
+    ) -> dict:
+        """
+        Drives ``ctx.page`` from the start state to an end and returns a
+        summary. ``selectors`` and ``timeouts`` override the definition's
+        named values; attempt records go to ``ctx.attempt_listeners``.
+        """
+        run = MachineRun(
+            self,
+            ctx,
+            text,
+            {**self.selectors, **(selectors or {})},
+            {**self.timeouts, **(timeouts or {})},
+            dict(variables or {}),
+        )
+        max_attempts = max_attempts or self.max_attempts
+        stats = MachineStats()
+        attempt = None  # {"started", "submitted", "outcome"} of the open attempt
+        state = self.states[self.start]
+        final = None
+        run_started = time.perf_counter()
+
+        def close_attempt(default: str):
+            if attempt is None:
+                return
+            outcome = attempt["outcome"] or default
+            run.outcomes[outcome] = run.outcomes.get(outcome, 0) + 1
+            now = time.time()
+            record = {
+                "ts": now,
+                "machine": self.name,
+                "attempt": run.attempts,
+                "outcome": outcome,
+                "latency_ms": round((now - attempt["submitted"]) * 1000) if attempt["submitted"] else None,
+                "duration_ms": round((now - attempt["started"]) * 1000),
+                **run.vars.get("record", {}),
+            }
+            for listener in getattr(ctx, "attempt_listeners", ()):
+                try:
+                    listener(record)
+                except Exception as e:
+                    logging.warning(f"Attempt listener failed: {e}")
+
+        while final is None:
+            run.visits[state.name] = run.visits.get(state.name, 0) + 1
+            if state.max_visits is not None and run.visits[state.name] > state.max_visits:
+                logging.warning(f"[{self.name}] '{state.name}' reached its limit of {state.max_visits} visits")
+                final = "exhausted"
+                break
+            if state.attempt:
+                close_attempt("unknown")
+                if run.attempts >= max_attempts:
+                    attempt = None
+                    final = "exhausted"
+                    break
+                run.attempts += 1
+                attempt = {"started": time.time(), "submitted": None, "outcome": None}
+                logging.info(f"--- [{self.name}] Attempt {run.attempts}/{max_attempts} ---")
+            if state.outcome and attempt is not None and attempt["outcome"] is None:
+                attempt["outcome"] = state.outcome
+
+            started = time.perf_counter()
+            try:
+                event = await ACTIONS[state.do](run, state)
+            except (PlaywrightTimeoutError, asyncio.TimeoutError) as e:
+                event = "timeout"
+                logging.info(f"[{self.name}] {state.name}: timed out ({str(e).splitlines()[0] if str(e) else 'timeout'})")
+            except asyncio.CancelledError:
+                run.pipeline.cancel_all()
+                raise
+            except Exception as e:
+                event = "error"
+                logging.error(f"[{self.name}] {state.name}: {e}")
+            if state.submitted and attempt is not None and event == "ok":
+                attempt["submitted"] = time.time()
+                if run.attempts < max_attempts:
+                    run.prefetch_rate_limit(state)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            if state.end is not None:
+                stats.record(state.name, event, f"end:{state.end}", elapsed_ms)
+                final = state.end
+            elif event in state.on:
+                target = state.on[event]
+                stats.record(state.name, event, target, elapsed_ms)
+                state = self.states[target]
+            else:
+                stats.record(state.name, event, f"end:{event}", elapsed_ms)
+                logging.warning(f"[{self.name}] {state.name}: no transition for '{event}', stopping")
+                final = event
+
+        close_attempt(final)
+        run.pipeline.cancel_all()
+        summary = {
+            "machine": self.name,
+            "outcome": final,
+            "attempts": run.attempts,
+            "outcomes": run.outcomes,
+            "duration_sec": round(time.perf_counter() - run_started, 3),
+            "transitions": stats.summary(),
+            "pipeline": run.pipeline.stats.summary(),
+        }
+        if run.pipeline.stats.steps:
+            logging.info(f"[{self.name}] Pipelined preparation saved {run.pipeline.stats.saved_sec():.2f}s")
+        logging.info(f"🏁 [{self.name}] finished: {final} after {run.attempts} attempt(s) in {summary['duration_sec']}s")
+        return summary
+
+
+@action("noop")
+async def _noop(run: MachineRun, state: State) -> str:
+    return "ok"
+
+
+@action("goto")
+async def _goto(run: MachineRun, state: State) -> str:
+    # `url` names a run variable, or is a literal URL.
+    key = state.params.get("url", "base_url")
+    url = run.vars.get(key) or (key if "://" in key else None)
+    if not url or not run.vars.get("navigate", True):
+        return "skipped"
+    if url not in run.page.url:
+        logging.info(f"Navigating to {url}...")
+        await run.page.goto(url)
+    return "ok"
+
+
+@action("fill")
+async def _fill(run: MachineRun, state: State) -> str:
+    locator = run.page.locator(run.selector(state))
+    await locator.wait_for(state="visible", timeout=run.timeout_ms(state))
+    settings = (getattr(run.ctx, "automation_settings", None) or {}).get("text_insertion")
+    await insert_text(run.page, locator, run.text, settings, getattr(run.ctx, "browser_manager", None))
+    return "ok"
+
+
+@action("click")
+async def _click(run: MachineRun, state: State) -> str:
+    await run.rate_limit(state)
+    # Playwright's actionability checks already wait for visible, stable and enabled.
+    await run.page.locator(run.selector(state)).click(timeout=run.timeout_ms(state))
+    return "ok"
+
+
+async def _classified_wait(run: MachineRun, expected: dict, timeout: float) -> str | None:
+    """With an outcome classifier attached, a classified state's name becomes the event."""
+    classifier = getattr(run.ctx, "outcome_classifier", None)
+    if classifier is None:
+        return None
+    return (await classifier.wait(run.page, expected, timeout)).state
+
+
+@action("wait_visible")
+async def _wait_visible(run: MachineRun, state: State) -> str:
+    locator = run.page.locator(run.selector(state))
+    event = await _classified_wait(run, {"ok": locator}, run.timeout_ms(state))
+    if event is not None:
+        return event
+    await locator.wait_for(state="visible", timeout=run.timeout_ms(state))
+    return "ok"
+
+
+@action("wait_enabled")
+async def _wait_enabled(run: MachineRun, state: State) -> str:
+    timeout = run.timeout_ms(state)
+    locator = run.page.locator(run.selector(state))
+    handle = await locator.element_handle(timeout=timeout)
+    await handle.wait_for_element_state("enabled", timeout=timeout)
+    return "ok"
+
+
+@action("race")
+async def _race(run: MachineRun, state: State) -> str:
+    """Waits for the first of several selectors to appear; the winner's name is the event."""
+    timeout = run.timeout_ms(state)
+    event = await _classified_wait(
+        run,
+        {event: run.page.locator(run.selectors.get(selector, selector)) for event, selector in state.params["branches"].items()},
+        timeout,
+    )
+    if event is not None:
+        return event
+    tasks = {
+        asyncio.create_task(
+            run.page.locator(run.selectors.get(selector, selector)).wait_for(state="visible", timeout=timeout)
+        ): event
+        for event, selector in state.params["branches"].items()
+    }
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return tasks[task]
+        return "timeout"
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+@action("reload")
+async def _reload(run: MachineRun, state: State) -> str:
+    await run.rate_limit(state)
+    await run.page.reload()
+    settle = run.timeout_ms(state, "settle")
+    if settle:
+        await run.page.wait_for_timeout(settle)
+    return "ok"
+
+
+@action("pause")
+async def _pause(run: MachineRun, state: State) -> str:
+    """Human-like delay from the ``delay`` variable; skipped when a rate limiter paces attempts."""
+    delay = run.vars.get("delay")
+    if not delay or getattr(run.ctx, "rate_limiter", None) is not None:
+        return "ok"
+    if state.params.get("between_attempts") and run.attempts <= 1:
+        return "ok"
+    low, high = delay
+    seconds = random.uniform(low, high)
+    logging.info(f"   ...waiting for {seconds:.2f} seconds...")
+    await run.page.wait_for_timeout(seconds * 1000)
+    return "ok"
+
+
+@action("recover_page")
+async def _recover_page(run: MachineRun, state: State) -> str:
+    """Swaps a crashed, closed or hung page for a fresh one; ``skipped`` when the page is healthy."""
+    browser_manager = getattr(run.ctx, "browser_manager", None)
+    if browser_manager is None or await browser_manager.is_page_healthy(run.page):
+        return "skipped"
+    selector = run.selector(state) if "selector" in state.params else None
+    run.ctx.page = await browser_manager.recover_page(
+        run.page, ready_selector=selector, ready_timeout_ms=run.timeout_ms(state) or 30000
+    )
+    return "ok"
+
+
+@action("screenshot")
+async def _screenshot(run: MachineRun, state: State) -> str:
+    os.makedirs("screenshots", exist_ok=True)
+    path = os.path.join("screenshots", f"error_{state.params.get('name', state.name)}.png")
+    try:
+        await run.page.screenshot(path=path)
+        logging.info(f"Screenshot saved to {path}")
+    except Exception as e:
+        logging.error(f"Could not take screenshot: {e}")
+    return "ok"
+
+
+def validate_definitions(config: dict) -> list[str]:
+    """Every problem in the built-in and configured state machines, prefixed with the machine name."""
+    if not isinstance(config.get("state_machines") or {}, dict):
+        return ["state_machines: must be a mapping"]
+    errors = []
+    try:
+        definitions = load_definitions(config)
+    except (OSError, yaml.YAMLError) as e:
+        return [f"state_machines: could not load built-in definitions ({e})"]
+    for name, definition in definitions.items():
+        if not isinstance(definition, dict):
+            errors.append(f"state_machines.{name}: must be a mapping")
+            continue
+        try:
+            StateMachine(name, definition)
+        except MachineDefinitionError as e:
+            errors += [f"state_machines.{name}: {error}" for error in e.errors]
+        except (TypeError, AttributeError) as e:
+            errors.append(f"state_machines.{name}: malformed definition ({e})")
+    return errors
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+
+from src.backoff import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    DecorrelatedJitterBackoff,
+)
+
+
+def test_decorrelated_jitter_stays_within_base_and_cap():
+    backoff = DecorrelatedJitterBackoff(1, 20)
+    delays = [backoff.next_delay() for _ in range(200)]
+    assert all(1 <= d <= 20 for d in delays)
+    assert max(delays) > 5
+    backoff.reset()
+    assert backoff.next_delay() <= 3
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_single_probe_closes_it():
+    breaker = CircuitBreaker("example.com", failure_threshold=2, open_base_sec=0.05, open_max_sec=0.05)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    probes = []
+
+    async def worker():
+        probes.append(await breaker.acquire())
+
+    tasks = [asyncio.create_task(worker()) for _ in range(3)]
+    await asyncio.sleep(0.1)
+    # Only one worker got through as the half-open probe; the rest are parked.
+    assert probes == [True]
+    assert breaker.state == HALF_OPEN
+
+    breaker.record_success()
+    await asyncio.gather(*tasks)
+    assert breaker.state == CLOSED
+    assert sorted(probes) == [False, False, True]
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker("example.com", failure_threshold=1, open_base_sec=0.01, open_max_sec=0.01)
+    breaker.record_failure()
+    assert await breaker.acquire() is True
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+
+
+def test_registry_shares_one_breaker_per_host():
+    registry = CircuitBreakerRegistry.from_settings({"enabled": True})
+    assert registry.get("a.example") is registry.get("a.example")
+    assert registry.get("a.example") is not registry.get("b.example")
+    assert CircuitBreakerRegistry.from_settings({"enabled": False}) is None
@@ -0,0 +1,60 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.browser import RESOURCE_SAVING_ARGS, BrowserManager
+
+
+def _playwright():
+    playwright = MagicMock()
+    context = MagicMock()
+    context.pages = []
+    context.new_page = AsyncMock(return_value=MagicMock())
+    context.route = AsyncMock()
+    context.browser = MagicMock()
+    browser = MagicMock()
+    browser.new_context = AsyncMock(return_value=context)
+    playwright.chromium.launch_persistent_context = AsyncMock(return_value=context)
+    playwright.chromium.launch = AsyncMock(return_value=browser)
+    return playwright, context, browser
+
+
+def _manager(playwright, **launch):
+    config = {"automation_settings": {"user_data_dir": "/tmp/profile", "page_health": {"heartbeat_interval_sec": 0},
+                                      "browser_launch": {"mode": "bundled", **launch}}}
+    return BrowserManager(playwright, config)
+
+
+@pytest.mark.asyncio
+async def test_bundled_persistent_launch_uses_new_headless_and_saving_flags():
+    playwright, context, _ = _playwright()
+    manager = _manager(playwright, renderer_process_limit=4, args=["--lang=en-US"])
+
+    page = await manager.get_page(connect_to_existing=True)
+
+    assert page is context.new_page.return_value
+    user_data_dir, = playwright.chromium.launch_persistent_context.await_args.args
+    options = playwright.chromium.launch_persistent_context.await_args.kwargs
+    assert user_data_dir == "/tmp/profile-chromium"
+    assert options["headless"] is True and options["channel"] == "chromium"
+    assert options["args"] == RESOURCE_SAVING_ARGS + ["--renderer-process-limit=4", "--lang=en-US"]
+    assert manager.default_context is context
+    context.route.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_bundled_ephemeral_shell_launch_blocks_resources():
+    playwright, context, browser = _playwright()
+    manager = _manager(playwright, headless="shell", persistent=False, resource_saving=False, block_resources=["image"])
+
+    await manager.get_page()
+
+    options = playwright.chromium.launch.await_args.kwargs
+    assert options == {"headless": True, "args": []}
+    browser.new_context.assert_awaited_once()
+    context.route.assert_awaited_once()
+
+
+def test_unknown_launch_mode_is_rejected():
+    with pytest.raises(ValueError):
+        _manager(MagicMock(), mode="docker")
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import pytest
+import yaml
+
+from src.config_watch import ConfigWatcher
+from src.mats_x_trails.settings import validate_config
+
+
+def _write(path, config):
+    path.write_text(yaml.safe_dump(config))
+    # Make sure the stamp moves even on coarse-mtime filesystems.
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_valid_edit_installs_new_snapshot(tmp_path):
+    path = tmp_path / "config.yaml"
+    config = {"agent_track_submit": {"retry_settings": {"max_retries": 5}}}
+    _write(path, config)
+    watcher = ConfigWatcher(str(path), config, validate_config)
+
+    assert watcher.reload() is False  # unchanged file
+    _write(path, {"agent_track_submit": {"retry_settings": {"max_retries": 9}}})
+    assert watcher.reload() is True
+    assert watcher.version == 1
+    assert watcher.snapshot["agent_track_submit"]["retry_settings"]["max_retries"] == 9
+
+
+def test_invalid_edit_keeps_previous_snapshot_and_reports_every_error(tmp_path):
+    path = tmp_path / "config.yaml"
+    config = {"agent_track_submit": {"retry_settings": {"max_retries": 5}}}
+    _write(path, config)
+    watcher = ConfigWatcher(str(path), config, validate_config)
+
+    _write(path, {"agent_track_submit": {
+        "retry_settings": {"max_retries": "lots"},
+        "flags": {"skip_submit_enable_wait": "yes"},
+    }})
+    assert watcher.reload() is False
+    assert watcher.version == 0 and watcher.snapshot is config
+    assert len(watcher.last_errors) == 2
+
+    # Service settings are checked too, so a zero rate is refused here, not at the next submit.
+    _write(path, {"automation_settings": {"rate_limits": {"host": {"rate_per_min": 0}}}})
+    assert watcher.reload() is False
+    assert watcher.last_errors == ["automation_settings.rate_limits.host.rate_per_min: expected a positive number, got 0"]
+
+    path.write_text("agent_track_submit: [unclosed")
+    assert watcher.reload() is False
+    assert watcher.snapshot is config
+
+
+@pytest.mark.asyncio
+async def test_polling_fallback_picks_up_changes(tmp_path, monkeypatch):
+    path = tmp_path / "config.yaml"
+    _write(path, {"agent_track_submit": {}})
+    watcher = ConfigWatcher(str(path), {}, validate_config, poll_interval_sec=0.01)
+
+    def no_inotify(directory):
+        raise OSError("not supported")
+
+    monkeypatch.setattr("src.config_watch._Inotify", no_inotify)
+    watcher.start()
+    try:
+        _write(path, {"agent_track_submit": {"timeouts": {"prompt_visible_ms": 1}}})
+        for _ in range(100):
+            if watcher.version:
+                break
+            await asyncio.sleep(0.01)
+        assert watcher.version == 1
+    finally:
+        watcher.stop()
@@ -0,0 +1,87 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from src.outcome_classifier import OutcomeClassifier, validate_settings
+
+
+class _Page:
+    """Just enough of a Page: response listeners, locators and a DOM poll."""
+
+    url = "https://app.example.com/challenge"
+
+    def __init__(self, dom_match=None):
+        self.listeners = []
+        self.dom_match = dom_match
+
+    def on(self, event, handler):
+        self.listeners.append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners.remove(handler)
+
+    def respond(self, status, url="https://app.example.com/api/submit"):
+        for handler in list(self.listeners):
+            handler(MagicMock(status=status, url=url))
+
+    def locator(self, selector):
+        return _locator(None)
+
+    async def wait_for_function(self, script, arg=None, polling=None, timeout=None):
+        if self.dom_match is None:
+            await asyncio.sleep(timeout / 1000)
+            raise PlaywrightTimeoutError("no match")
+        handle = MagicMock()
+        handle.json_value = AsyncMock(return_value=self.dom_match)
+        return handle
+
+
+def _locator(delay_sec):
+    async def wait_for(state, timeout):
+        if delay_sec is None or delay_sec * 1000 > timeout:
+            await asyncio.sleep(timeout / 1000)
+            raise PlaywrightTimeoutError("not visible")
+        await asyncio.sleep(delay_sec)
+
+    locator = MagicMock()
+    locator.wait_for = wait_for
+    return locator
+
+
+@pytest.mark.asyncio
+async def test_status_signal_ends_wait_before_timeout():
+    classifier = OutcomeClassifier({"enabled": True})
+    page = _Page()
+    waiting = asyncio.create_task(classifier.wait(page, {"try_again": _locator(None)}, 5000))
+    await asyncio.sleep(0.01)
+    page.respond(200)
+    page.respond(503, url="https://cdn.other.com/x.js")  # other origins are ignored
+    page.respond(429)
+    verdict = await asyncio.wait_for(waiting, 1)
+
+    assert (verdict.state, verdict.action) == ("rate_limited", "backoff")
+    assert page.listeners == []
+    assert classifier.summary() == {"rate_limited": 1}
+
+
+@pytest.mark.asyncio
+async def test_expected_outcome_and_dom_text_and_timeout():
+    classifier = OutcomeClassifier({"enabled": True, "states": {"refused": {"text": ["I can't help"]}}})
+    assert (await classifier.wait(_Page(), {"try_again": _locator(0.01)}, 1000)).state == "try_again"
+
+    verdict = await classifier.wait(_Page(dom_match=["refused", 'text "i can\'t help"']), {"try_again": _locator(None)}, 1000)
+    assert (verdict.state, verdict.action) == ("refused", "retry")
+
+    verdict = await classifier.wait(_Page(), {"try_again": _locator(None)}, 50)
+    assert (verdict.state, verdict.action) == ("timeout", None)
+
+
+def test_validate_settings_reports_every_problem():
+    errors = validate_settings({
+        "poll_ms": 0,
+        "states": {"rate_limited": {"action": "panic"}, "custom": {"status": ["429"], "colour": "red"}},
+    })
+    assert len(errors) == 5
+    assert OutcomeClassifier.from_settings({"enabled": False}) is None
@@ -0,0 +1,139 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.browser import BrowserManager
+
+URL = "https://app.example.com/challenge"
+
+
+def _page(boot_sec=0.0):
+    page = MagicMock()
+    page.is_closed.return_value = False
+    page.goto = AsyncMock()
+    page.close = AsyncMock()
+
+    async def wait_for(state, timeout):
+        await asyncio.sleep(boot_sec)
+
+    page.locator.return_value.wait_for = wait_for
+    return page
+
+
+def _manager(size=2, boot_sec=0.0):
+    manager = BrowserManager(MagicMock(), {"automation_settings": {
+        "page_health": {"heartbeat_interval_sec": 0},
+        "page_pool": {"enabled": True, "size": size},
+    }})
+    context = MagicMock()
+    context.new_page = AsyncMock(side_effect=lambda: _page(boot_sec))
+    manager.browser = MagicMock()
+    manager.browser.contexts = [context]
+    manager.browser.is_connected.return_value = True
+    return manager, context
+
+
+@pytest.mark.asyncio
+async def test_pool_hands_out_warm_pages_and_refills():
+    manager, context = _manager(size=2, boot_sec=0.02)
+    pool = manager.page_pool(URL, "#prompt")
+    await asyncio.sleep(0.05)
+
+    first = await pool.get()
+    first.goto.assert_awaited_once_with(URL)
+    first.locator.assert_called_with("#prompt")
+    await pool.get()
+    # Both spares were taken; the third request opens a page inline.
+    await pool.get()
+    await asyncio.sleep(0.05)
+
+    metrics = manager.page_pool_summary()[f"{URL} (default)"]
+    assert (metrics["hits"], metrics["misses"], metrics["hit_rate"]) == (2, 1, 0.667)
+    assert metrics["ready"] == 2
+    await manager.close_page_pools()
+    assert manager.page_pool_summary() == {}
+
+
+@pytest.mark.asyncio
+async def test_dead_and_stale_pages_are_not_handed_out():
+    manager, _ = _manager(size=2)
+    pool = manager.page_pool(URL)
+    await asyncio.sleep(0.01)
+    crashed, _ = pool._ready[0]
+    crashed.is_closed.return_value = True
+    pool.max_idle_sec = 0
+
+    page = await pool.get()
+
+    assert page is not crashed
+    assert pool.metrics()["discarded"] == 2
+    assert pool.metrics()["misses"] == 1
+    await manager.close_page_pools()
+
+
+@pytest.mark.asyncio
+async def test_recovery_and_replacement_take_pooled_pages():
+    manager, context = _manager(size=1)
+    manager.page_pool(URL, "textarea")
+    await asyncio.sleep(0.01)
+    crashed = _page()
+    crashed.url = URL
+    crashed.context = context
+
+    recovered = await manager.recover_page(crashed, ready_selector="textarea")
+    await asyncio.sleep(0.01)
+    recovered.url = URL
+    recovered.context = context
+    replaced = await manager.replace_page(recovered, ready_selector="textarea")
+
+    assert manager.page_pool_summary()[f"{URL} (default)"]["hits"] == 2
+    assert replaced is not recovered
+    assert manager.page_pool(None) is None
+    await manager.close_page_pools()
+
+
+class _Context:
+    """A context whose ``pages`` tracks the pages it opened that are still open."""
+
+    def __init__(self):
+        self.opened = []
+        self.closed = False
+        self.storage_state = AsyncMock(return_value={"cookies": [], "origins": []})
+        self.close = AsyncMock(side_effect=lambda: setattr(self, "closed", True))
+
+    @property
+    def pages(self):
+        return [page for page in self.opened if not page.is_closed()]
+
+    async def new_page(self):
+        page = _page()
+        page.url = URL
+        page.context = self
+        page.close = AsyncMock(side_effect=lambda: page.is_closed.configure_mock(return_value=True))
+        self.opened.append(page)
+        return page
+
+
+@pytest.mark.asyncio
+async def test_context_recycles_do_not_leave_pools_or_contexts_behind():
+    manager, _ = _manager(size=2)
+    contexts = []
+
+    async def new_context(**options):
+        contexts.append(_Context())
+        return contexts[-1]
+
+    manager.browser.new_context = new_context
+    context = await manager.new_context()
+    page = await manager.open_page(URL, "textarea", context=context)
+    await asyncio.sleep(0.01)
+
+    for _ in range(5):
+        page = await manager.replace_page(page, new_context=True, ready_selector="textarea")
+        await asyncio.sleep(0.01)
+
+    assert all(c.closed for c in contexts[:-1])
+    assert manager._owned_contexts == {contexts[-1]}
+    assert list(manager.page_pool_summary()) == []
+    assert contexts[-1].pages == [page]
@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.browser import PageRecycler
+
+
+def _manager(heap_mb: float):
+    manager = MagicMock()
+    manager.page_metrics = AsyncMock(return_value={"JSHeapUsedSize": heap_mb * 1024 * 1024})
+    manager.replace_page = AsyncMock(side_effect=lambda page, *args: MagicMock(name="fresh"))
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_recycles_after_max_attempts_per_page():
+    manager = _manager(heap_mb=50)
+    recycler = PageRecycler(manager, {"max_attempts_per_page": 3})
+    page = MagicMock(name="page")
+    for _ in range(2):
+        recycler.on_attempt({"duration_ms": 1000})
+        assert await recycler.maybe_recycle(page) is page
+
+    recycler.on_attempt({"duration_ms": 1500})
+    fresh = await recycler.maybe_recycle(page, "textarea")
+    assert fresh is not page
+    assert recycler.recycles == 1
+    assert recycler.attempts_on_page == 0
+    manager.replace_page.assert_awaited_once_with(page, False, "textarea", 30000)
+
+
+@pytest.mark.asyncio
+async def test_recycles_context_when_heap_crosses_threshold():
+    manager = _manager(heap_mb=600)
+    recycler = PageRecycler(
+        manager, {"max_js_heap_mb": 512, "heap_check_every_attempts": 2, "mode": "context"}
+    )
+    page = MagicMock(name="page")
+    recycler.on_attempt({"duration_ms": 900})
+    assert await recycler.maybe_recycle(page) is page
+    manager.page_metrics.assert_not_awaited()
+
+    recycler.on_attempt({"duration_ms": 900})
+    assert await recycler.maybe_recycle(page) is not page
+    assert manager.replace_page.await_args.args[1] is True
+
+
+def test_from_settings_requires_a_policy():
+    assert PageRecycler.from_settings(MagicMock(), {"mode": "page"}) is None
+    assert PageRecycler.from_settings(None, {"max_attempts_per_page": 5}) is None
+
+
+@pytest.mark.asyncio
+async def test_recycler_follows_its_page_across_jobs():
+    from src.mats_x_trails.app import SharedServices, TaskContext
+
+    manager = _manager(heap_mb=50)
+    services = SharedServices({"recycling": {"max_attempts_per_page": 3}}, manager)
+    page = MagicMock(name="page")
+
+    # Three one-attempt jobs on the same warm page, each with its own context.
+    for _ in range(3):
+        ctx = services.attach(TaskContext(page, {}, {}))
+        assert await ctx.page_recycler.maybe_recycle(ctx.page) is page
+        for listener in ctx.attempt_listeners:
+            listener({"duration_ms": 1000})
+
+    ctx = services.attach(TaskContext(page, {}, {}))
+    fresh = await ctx.page_recycler.maybe_recycle(ctx.page)
+    assert fresh is not page
+    # The next job on the fresh page keeps the same policy, with a new count.
+    assert services.page_recycler(fresh) is ctx.page_recycler
+    assert ctx.page_recycler.attempts_on_page == 0
+    assert services.page_recycler(MagicMock(name="other")) is not ctx.page_recycler
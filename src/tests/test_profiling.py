@@ -0,0 +1,44 @@
+import asyncio
+import sys
+import types
+import pytest
+
+from src.profiling import ProfileSession
+
+
+async def _hot(n):
+    total = 0
+    for i in range(n):
+        total += i * i
+    await asyncio.sleep(0.05)
+    return total
+
+
+@pytest.fixture
+def hot_module():
+    module = types.ModuleType("hap_profiling_target")
+    module.hot = _hot
+    module.REGISTRY = {"hot": _hot}
+    sys.modules[module.__name__] = module
+    yield module
+    del sys.modules[module.__name__]
+
+
+@pytest.mark.asyncio
+async def test_profile_session_splits_wall_and_cpu(tmp_path, hot_module):
+    prefix = str(tmp_path / "run")
+    original = hot_module.hot
+    with ProfileSession(prefix, targets=["hap_profiling_target:hot"]) as session:
+        assert hot_module.hot is not original
+        assert hot_module.REGISTRY["hot"] is hot_module.hot
+        assert await hot_module.REGISTRY["hot"](200_000) == sum(i * i for i in range(200_000))
+
+    assert hot_module.hot is original
+    assert hot_module.REGISTRY["hot"] is original
+    stats = session.stats["hap_profiling_target:hot"]
+    assert stats.calls == 1
+    assert stats.wall_sec >= 0.05
+    assert 0 < stats.cpu_sec < stats.wall_sec
+    for suffix in (".pstats", ".collapsed", ".coroutines.txt"):
+        assert (tmp_path / f"run{suffix}").exists()
+    assert "[idle]" in (tmp_path / "run.collapsed").read_text()
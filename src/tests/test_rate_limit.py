@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+
+from src.rate_limit import RateLimiter, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(rate_per_sec=20, burst=2)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for _ in range(4):
+        await bucket.acquire()
+    elapsed = loop.time() - start
+    # Two tokens are free, the next two accrue at 20/s.
+    assert 0.08 <= elapsed < 0.5
+    assert bucket.acquired == 4
+
+
+@pytest.mark.asyncio
+async def test_limiter_keeps_separate_buckets_per_model():
+    limiter = RateLimiter({"model": {"rate_per_min": 60, "burst": 1}})
+    assert await limiter.acquire("submit", model="fair river") < 0.01
+    assert await limiter.acquire("submit", model="happy echo") < 0.01
+    metrics = limiter.metrics()
+    assert metrics["actions"]["submit"]["count"] == 2
+    assert set(metrics["buckets"]) == {"model:fair river", "model:happy echo"}
+
+
+@pytest.mark.asyncio
+async def test_limiter_shared_across_concurrent_workers():
+    limiter = RateLimiter({"host": {"rate_per_min": 1200, "burst": 1}})
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.gather(*(limiter.acquire("submit", host="example.com") for _ in range(5)))
+    # 20 tokens/s with a burst of one: the last of five waits roughly 0.2 s.
+    assert loop.time() - start >= 0.18
+
+
+def test_from_settings_returns_none_when_unconfigured():
+    assert RateLimiter.from_settings(None) is None
+    assert RateLimiter.from_settings({"jitter_sec": 1}) is None
+
+
+@pytest.mark.asyncio
+async def test_cbrne_step_delay_takes_a_token_instead_of_sleeping():
+    from unittest.mock import AsyncMock, MagicMock
+
+    from src.archive.cbrne import ChallengeExecutor
+
+    page = MagicMock()
+    page.url = "https://example.com/challenge"
+    page.wait_for_timeout = AsyncMock()
+    settings = {"random_delay": True, "rate_limits": {"host": {"rate_per_min": 60, "burst": 1}}}
+    executor = ChallengeExecutor(page, {"challenge_name": "demo"}, settings)
+
+    await executor._perform_step_delay()
+
+    page.wait_for_timeout.assert_not_called()
+    assert executor.rate_limiter.metrics()["actions"]["step"]["count"] == 1
+    assert "host:example.com" in executor.rate_limiter.metrics()["buckets"]
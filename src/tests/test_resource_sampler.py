@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.resource_sampler import ResourceSampler, process_tree_cpu_rss
+
+
+def test_process_tree_includes_children():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        tree = process_tree_cpu_rss(os.getpid())
+        assert os.getpid() in tree
+        assert child.pid in tree
+        assert all(rss > 0 for _, rss in tree.values())
+    finally:
+        child.kill()
+        child.wait()
+
+
+@pytest.mark.asyncio
+async def test_sample_and_summary(tmp_path):
+    page = MagicMock()
+    manager = MagicMock()
+    manager.browser_process.pid = os.getpid()
+    manager.pages.return_value = [page]
+    manager.page_metrics = AsyncMock(
+        side_effect=[
+            {"JSHeapUsedSize": 10 * 2**20, "Nodes": 100},
+            {"JSHeapUsedSize": 30 * 2**20, "Nodes": 300},
+        ]
+    )
+    sampler = ResourceSampler(manager, {"output": str(tmp_path / "s.jsonl")})
+
+    first = await sampler.sample(sampler.browser_pid())
+    second = await sampler.sample(sampler.browser_pid())
+
+    assert "cpu" not in first and "cpu" in second
+    assert first["pages"] == [[10.0, 100]]
+    summary = sampler.summary()
+    assert summary["heap_mb"] == {"min": 10.0, "mean": 20.0, "max": 30.0}
+    assert summary["dom_nodes"]["max"] == 300
+    assert summary["rss_mb"]["min"] > 0
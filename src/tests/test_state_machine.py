@@ -0,0 +1,145 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from src.mats_x_trails.simulate import VirtualClockLoop
+from src.rate_limit import RateLimiter
+from src.state_machine import MachineDefinitionError, StateMachine
+
+
+def _ctx(visible: dict):
+    """A context whose page shows the selectors in ``visible`` after the given delays (None = never)."""
+    locators = {}
+
+    def locator(selector):
+        if selector not in locators:
+            loc = MagicMock()
+            delay = visible.get(selector, 0)
+
+            async def wait_for(state="visible", timeout=None, delay=delay):
+                if delay is None:
+                    await asyncio.sleep((timeout or 0) / 1000)
+                    raise PlaywrightTimeoutError("not visible")
+                await asyncio.sleep(delay)
+
+            loc.wait_for = AsyncMock(side_effect=wait_for)
+            loc.click = AsyncMock()
+            loc.fill = AsyncMock()
+            loc.input_value = AsyncMock(return_value="prompt")
+            loc.element_handle = AsyncMock(return_value=MagicMock(wait_for_element_state=AsyncMock()))
+            locators[selector] = loc
+        return locators[selector]
+
+    ctx = MagicMock()
+    ctx.page.url = "http://example.com/challenge"
+    ctx.page.locator.side_effect = locator
+    ctx.page.reload = AsyncMock()
+    ctx.page.wait_for_timeout = AsyncMock()
+    ctx.page.screenshot = AsyncMock()
+    ctx.rate_limiter = None
+    ctx.outcome_classifier = None
+    ctx.automation_settings = {}
+    ctx.attempt_listeners = []
+    return ctx, locators
+
+
+@pytest.mark.asyncio
+async def test_judging_machine_races_outcomes_and_counts_attempts():
+    machine = StateMachine.load("judging_loop")
+    ctx, locators = _ctx({"#success": None, "#failure": 0.01})
+    records = []
+    ctx.attempt_listeners.append(records.append)
+
+    summary = await machine.run(
+        ctx,
+        selectors={"success": "#success", "failure": "#failure", "continue": "#continue"},
+        timeouts={"judging_timeout_sec": 0.05},
+        max_attempts=3,
+    )
+
+    assert summary["outcome"] == "exhausted"
+    assert summary["attempts"] == 3
+    assert [r["outcome"] for r in records] == ["failure"] * 3
+    assert locators["#continue"].click.await_count == 3
+    assert summary["transitions"]["wait_outcome -failure-> continue_chat"]["count"] == 3
+    assert records[0]["latency_ms"] is not None
+
+
+@pytest.mark.asyncio
+async def test_intent_machine_reloads_after_failure_and_ends_when_none_appears():
+    machine = StateMachine.load("intent_loop")
+    ctx, locators = _ctx({"#again": 0})
+    appearances = iter([0, 0, None])
+
+    async def try_again_wait(state="visible", timeout=None):
+        if next(appearances) is None:
+            raise PlaywrightTimeoutError("not visible")
+
+    ctx.page.locator("#again").wait_for.side_effect = try_again_wait
+
+    summary = await machine.run(ctx, "prompt", selectors={"try_again": "#again"})
+
+    assert summary["outcome"] == "success"
+    assert summary["outcomes"] == {"failure": 2, "success": 1}
+    assert ctx.page.reload.await_count == 2
+    # Navigation is skipped without a base_url.
+    assert "navigate -skipped-> attempt" in summary["transitions"]
+
+
+def test_cbrne_run_takes_the_next_submit_token_while_judging():
+    machine = StateMachine.load("cbrne_run")
+    ctx, locators = _ctx({"#success": None, "#failure": 0.15})
+    ctx.rate_limiter = RateLimiter({"host": {"rate_per_min": 600, "burst": 1}, "log_interval_sec": 0})
+
+    with asyncio.Runner(loop_factory=VirtualClockLoop) as runner:
+        summary = runner.run(machine.run(
+            ctx,
+            "prompt",
+            selectors={"success": "#success", "failure": "#failure"},
+            timeouts={"judging_timeout_sec": 1},
+            max_attempts=3,
+        ))
+
+    assert summary["outcome"] == "exhausted"
+    step = summary["pipeline"]["submit_token"]
+    assert step["count"] == 3
+    # Tokens two and three come due at 0.1s and 0.2s, while the judge answers at 0.15s and 0.3s.
+    assert step["saved_sec"] == pytest.approx(0.15)
+    assert step["exposed_sec"] == 0
+    assert ctx.rate_limiter.metrics()["actions"]["submit"]["count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_intent_loop_2_replaces_a_crashed_page_instead_of_reloading_it(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    machine = StateMachine.load("intent_loop_2")
+    ctx, _ = _ctx({})
+    crashed = ctx.page
+    crashed.locator.side_effect = RuntimeError("Target page, context or browser has been closed")
+    fresh, fresh_locators = _ctx({"#again": None})
+    ctx.browser_manager.is_page_healthy = AsyncMock(return_value=False)
+    ctx.browser_manager.recover_page = AsyncMock(return_value=fresh.page)
+
+    summary = await machine.run(
+        ctx, "prompt", selectors={"try_again": "#again"}, timeouts={"intent_outcome_wait_sec": 0.01}
+    )
+
+    assert summary["outcome"] == "success"
+    ctx.browser_manager.recover_page.assert_awaited_once_with(crashed, ready_selector="textarea", ready_timeout_ms=10000)
+    assert ctx.page is fresh.page
+    crashed.reload.assert_not_called()
+    fresh_locators['button:has-text("Submit Template")'].click.assert_awaited_once()
+    assert "recover_page -ok-> refill" in summary["transitions"]
+
+
+def test_invalid_definition_reports_every_problem():
+    with pytest.raises(MachineDefinitionError) as info:
+        StateMachine("broken", {
+            "start": "missing",
+            "states": {
+                "a": {"do": "teleport", "timeout": "nope_ms", "next": "b"},
+                "c": {"do": "click"},
+            },
+        })
+    assert len(info.value.errors) == 5
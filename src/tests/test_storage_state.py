@@ -0,0 +1,62 @@
+import os
+import stat
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.browser import BrowserManager
+
+STATE = {"cookies": [{"name": "session", "value": "abc", "domain": "app.example.com", "path": "/"}], "origins": []}
+
+
+def _manager(tmp_path, **storage):
+    manager = BrowserManager(MagicMock(), {"automation_settings": {
+        "page_health": {"heartbeat_interval_sec": 0},
+        "storage_state": {"enabled": True, "path": str(tmp_path / "state.json"), **storage},
+    }})
+    profile = MagicMock()
+    profile.storage_state = AsyncMock(return_value=STATE)
+    manager.browser = MagicMock()
+    manager.browser.contexts = [profile]
+    manager.browser.new_context = AsyncMock(side_effect=lambda **options: MagicMock(pages=[], options=options, close=AsyncMock()))
+    return manager, profile
+
+
+@pytest.mark.asyncio
+async def test_contexts_start_from_one_exported_snapshot(tmp_path):
+    manager, profile = _manager(tmp_path)
+
+    contexts = [await manager.new_context() for _ in range(3)]
+
+    assert all(context.options["storage_state"] == STATE for context in contexts)
+    profile.storage_state.assert_awaited_once()
+    assert stat.S_IMODE(os.stat(manager.storage_state_path).st_mode) == 0o600
+    assert manager.storage_state_summary()["contexts_created"] == 3
+
+    # A fresh snapshot on disk is reused by the next process without exporting.
+    restarted, restarted_profile = _manager(tmp_path)
+    assert await restarted.storage_state() == STATE
+    restarted_profile.storage_state.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_refreshes_are_coalesced_and_only_owned_pages_are_reauthenticated(tmp_path):
+    manager, profile = _manager(tmp_path)
+    await manager.storage_state()
+    manager._storage_state_at -= 60
+
+    expired = MagicMock(url="https://app.example.com/login")
+    expired.context = await manager.new_context()
+    expired.close = AsyncMock()
+    manager.watch_page = lambda page: page
+    fresh = MagicMock(goto=AsyncMock())
+    manager.browser.new_context.side_effect = lambda **options: MagicMock(pages=[], new_page=AsyncMock(return_value=fresh))
+
+    assert await manager.reauthenticate(expired, url="https://app.example.com/challenge") is fresh
+    fresh.goto.assert_awaited_once_with("https://app.example.com/challenge")
+    # A second worker hitting the same expiry reuses the export just made.
+    await manager.storage_state(refresh=True)
+    assert profile.storage_state.await_count == 2
+
+    in_profile = MagicMock(context=profile)
+    assert await manager.reauthenticate(in_profile) is None
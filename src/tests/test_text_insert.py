@@ -0,0 +1,48 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.text_insert import TextInsertionError, insert_text
+
+
+def _locator(values):
+    locator = MagicMock()
+    locator.fill = AsyncMock()
+    locator.focus = AsyncMock()
+    locator.evaluate = AsyncMock()
+    locator.input_value = AsyncMock(side_effect=values)
+    return locator
+
+
+@pytest.mark.asyncio
+async def test_set_value_is_verified_by_reading_back():
+    locator = _locator(["line one\nline two"])
+
+    await insert_text(MagicMock(), locator, "line one\r\nline two", {"strategy": "set_value"})
+
+    locator.evaluate.assert_awaited_once()
+    assert locator.evaluate.await_args.args[1] == "line one\r\nline two"
+    locator.fill.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_failed_verification_falls_back_to_fill():
+    locator = _locator(["", "payload"])
+
+    await insert_text(MagicMock(), locator, "payload", {"strategy": "set_value", "fallback": "fill"})
+
+    locator.fill.assert_awaited_once_with("payload")
+
+
+@pytest.mark.asyncio
+async def test_insert_text_uses_cached_cdp_session_and_raises_when_value_is_wrong():
+    session = MagicMock()
+    session.send = AsyncMock()
+    manager = MagicMock()
+    manager.cdp_session = AsyncMock(return_value=session)
+    locator = _locator(["truncated"])
+
+    with pytest.raises(TextInsertionError):
+        await insert_text(
+            MagicMock(), locator, "payload", {"strategy": "insert_text", "fallback": None}, manager
+        )
+    session.send.assert_awaited_once_with("Input.insertText", {"text": "payload"})
@@ -0,0 +1,61 @@
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.tracing import TracingService
+
+
+def _fake_page():
+    async def stop_chunk(path):
+        with open(path, "wb") as f:
+            f.write(b"trace")
+
+    page = MagicMock()
+    page.context.tracing.start = AsyncMock()
+    page.context.tracing.start_chunk = AsyncMock()
+    page.context.tracing.stop_chunk = AsyncMock(side_effect=stop_chunk)
+    return page
+
+
+@pytest.mark.asyncio
+async def test_ring_keeps_last_chunks_and_persists_on_failure(tmp_path):
+    service = TracingService(
+        {"enabled": True, "keep_last": 2, "output_dir": str(tmp_path / "traces")}
+    )
+    tracer = service.tracer()
+    page = _fake_page()
+
+    for attempt, outcome in enumerate(["try_again", "try_again", "try_again", "timeout"], 1):
+        await tracer.begin(page, f"attempt-{attempt}")
+        tracer.mark(outcome)
+    await tracer.end()
+
+    page.context.tracing.start.assert_awaited_once()
+    assert page.context.tracing.start_chunk.await_count == 4
+    incidents = os.listdir(tmp_path / "traces")
+    assert len(incidents) == 1 and incidents[0].endswith("attempt-4-timeout")
+    saved = sorted(os.listdir(tmp_path / "traces" / incidents[0]))
+    assert saved == ["w1-attempt-3-try_again.zip", "w1-attempt-4-timeout.zip"]
+    # Attempts 1 and 2 fell off the ring and were deleted.
+    assert os.listdir(service.spool_dir) == []
+    summary = service.close()
+    assert summary["chunks"] == 4 and summary["persisted_incidents"] == 1
+    assert not os.path.exists(service.spool_dir)
+
+
+@pytest.mark.asyncio
+async def test_busy_context_is_not_traced_twice(tmp_path):
+    service = TracingService({"enabled": True, "output_dir": str(tmp_path)})
+    page = _fake_page()
+    first, second = service.tracer(), service.tracer()
+
+    await first.begin(page, "attempt-1")
+    await second.begin(page, "attempt-1")
+    second.mark("error")
+    await second.end()
+    await first.end()
+
+    assert page.context.tracing.start_chunk.await_count == 1
+    # The unmarked chunk is kept as "unknown".
+    assert service.persisted == 1
+    service.close()
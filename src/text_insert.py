@@ -0,0 +1,76 @@
+import logging
+import time
+
+
+STRATEGIES = ("fill", "insert_text", "set_value")
+
+# Sets the value through the prototype's native setter, so React's value
+# tracker sees a change, then fires one input and one change event.
+_SET_VALUE_JS = """(el, value) => {
+    const proto = el instanceof HTMLTextAreaElement
+        ? HTMLTextAreaElement.prototype
+        : HTMLInputElement.prototype;
+    Object.getOwnPropertyDescriptor(proto, "value").set.call(el, value);
+    el.dispatchEvent(new Event("input", { bubbles: true }));
+    el.dispatchEvent(new Event("change", { bubbles: true }));
+}"""
+
+
+class TextInsertionError(Exception):
+    """The field's value did not match the text after insertion."""
+
+
+async def _insert_with_cdp(page, locator, text: str, browser_manager=None):
+    await locator.fill("")
+    await locator.focus()
+    if browser_manager is not None:
+        session = await browser_manager.cdp_session(page)
+        await session.send("Input.insertText", {"text": text})
+        return
+    session = await page.context.new_cdp_session(page)
+    try:
+        await session.send("Input.insertText", {"text": text})
+    finally:
+        await session.detach()
+
+
+async def _insert(page, locator, text: str, strategy: str, browser_manager=None):
+    if strategy == "fill":
+        await locator.fill(text)
+    elif strategy == "insert_text":
+        await _insert_with_cdp(page, locator, text, browser_manager)
+    elif strategy == "set_value":
+        await locator.evaluate(_SET_VALUE_JS, text)
+    else:
+        raise ValueError(f"Unknown text insertion strategy '{strategy}'. Available: {', '.join(STRATEGIES)}")
+
+
+async def insert_text(page, locator, text: str, settings: dict | None = None, browser_manager=None) -> float:
+    """
+    Puts ``text`` into a textarea/input using the configured strategy and
+    returns the elapsed milliseconds.
+
+    Settings (``automation_settings.text_insertion``)::
+
+        strategy: fill        # fill | insert_text | set_value
+        verify: true          # read the value back and compare
+        fallback: fill        # strategy to retry with when verification fails
+    """
+    settings = settings or {}
+    strategy = settings.get("strategy", "fill")
+    started = time.perf_counter()
+    await _insert(page, locator, text, strategy, browser_manager)
+    if settings.get("verify", True) and not await _matches(locator, text):
+        fallback = settings.get("fallback", "fill")
+        if not fallback or fallback == strategy:
+            raise TextInsertionError(f"'{strategy}' insertion did not produce the expected value")
+        logging.warning(f"'{strategy}' insertion did not stick; retrying with '{fallback}'")
+        await _insert(page, locator, text, fallback, browser_manager)
+        if not await _matches(locator, text):
+            raise TextInsertionError(f"'{fallback}' insertion did not produce the expected value")
+    return (time.perf_counter() - started) * 1000
+
+
+async def _matches(locator, text: str) -> bool:
+    # Text controls normalise CRLF to LF.
+    return await locator.input_value() == text.replace("\r\n", "\n")
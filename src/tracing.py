@@ -0,0 +1,165 @@
+import asyncio
+import collections
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+
+class TracingService:
+    """
+    Process-wide owner of Playwright tracing. Starts tracing once per browser
+    context, hands each worker an ``AttemptTracer`` and totals their overhead.
+
+    Tracing chunks belong to a context, not a page, so only one attempt per
+    context is traced at a time; other workers on a busy context run untraced.
+    """
+
+    def __init__(self, settings: dict):
+        self.keep_last = max(1, int(settings.get("keep_last", 5)))
+        self.output_dir = settings.get("output_dir", "traces")
+        self.persist_on = set(settings.get("persist_on", ["timeout", "error", "unknown"]))
+        self.start_options = {
+            "screenshots": settings.get("screenshots", True),
+            "snapshots": settings.get("snapshots", True),
+            "sources": settings.get("sources", False),
+        }
+        self.spool_dir = tempfile.mkdtemp(prefix="hap-traces-")
+        self._started: set = set()
+        self._busy: set = set()
+        self._lock = asyncio.Lock()
+        self._tracer_ids = 0
+        self.chunks = 0
+        self.persisted = 0
+        self.overhead_sec = 0.0
+        self.attempt_sec = 0.0
+        self.bytes_spooled = 0
+
+    @classmethod
+    def from_settings(cls, settings: dict | None) -> "TracingService | None":
+        if not settings or not settings.get("enabled", False):
+            return None
+        return cls(settings)
+
+    def tracer(self) -> "AttemptTracer":
+        self._tracer_ids += 1
+        return AttemptTracer(self, f"w{self._tracer_ids}")
+
+    async def claim(self, context) -> bool:
+        async with self._lock:
+            if context in self._busy:
+                return False
+            if context not in self._started:
+                await context.tracing.start(**self.start_options)
+                self._started.add(context)
+            self._busy.add(context)
+            return True
+
+    def release(self, context):
+        self._busy.discard(context)
+
+    def close(self) -> dict:
+        """Drops the spool of unpersisted chunks and logs the overhead summary."""
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+        summary = self.summary()
+        logging.info(f"🧾 Tracing summary: {summary}")
+        return summary
+
+    def summary(self) -> dict:
+        return {
+            "chunks": self.chunks,
+            "persisted_incidents": self.persisted,
+            "overhead_sec": round(self.overhead_sec, 3),
+            "overhead_ms_per_attempt": (
+                round(self.overhead_sec / self.chunks * 1000, 1) if self.chunks else 0.0
+            ),
+            "overhead_pct_of_attempt_time": (
+                round(self.overhead_sec / self.attempt_sec * 100, 2) if self.attempt_sec else 0.0
+            ),
+            "spooled_mb": round(self.bytes_spooled / 2**20, 1),
+        }
+
+
+class AttemptTracer:
+    """
+    Traces one worker's attempts as Playwright trace chunks. The last
+    ``keep_last`` chunks are spooled to a temp directory; when an attempt ends
+    in one of the ``persist_on`` outcomes, the whole ring (the failing attempt
+    and the ones before it) is moved to ``output_dir``. Everything else is
+    deleted as it falls off the ring.
+    """
+
+    def __init__(self, service: TracingService, worker: str):
+        self.service = service
+        self.worker = worker
+        self.ring: collections.deque = collections.deque()
+        self._context = None
+        self._label = None
+        self._outcome = None
+        self._started_at = 0.0
+
+    async def begin(self, page, label: str):
+        if self._context is not None:
+            await self.end()
+        context = page.context
+        started = time.perf_counter()
+        try:
+            if not await self.service.claim(context):
+                return
+            await context.tracing.start_chunk(title=label)
+        except Exception as e:
+            self.service.release(context)
+            logging.debug(f"Tracing could not start for {label}: {e}")
+            return
+        finally:
+            self.service.overhead_sec += time.perf_counter() - started
+        self._context, self._label, self._outcome = context, label, None
+        self._started_at = started
+
+    def mark(self, outcome: str):
+        """Records the attempt's outcome; the chunk is closed at the next boundary."""
+        if self._context is not None:
+            self._outcome = outcome
+
+    async def end(self):
+        context, self._context = self._context, None
+        if context is None:
+            return
+        outcome = self._outcome or "unknown"
+        path = os.path.join(
+            self.service.spool_dir, f"{self.worker}-{self._label}-{outcome}.zip"
+        )
+        stopped = time.perf_counter()
+        try:
+            await context.tracing.stop_chunk(path=path)
+        except Exception as e:
+            logging.debug(f"Tracing chunk for {self._label} was lost: {e}")
+            return
+        finally:
+            self.service.release(context)
+            self.service.overhead_sec += time.perf_counter() - stopped
+            self.service.attempt_sec += time.perf_counter() - self._started_at
+
+        self.service.chunks += 1
+        self.service.bytes_spooled += os.path.getsize(path)
+        self.ring.append(path)
+        while len(self.ring) > self.service.keep_last:
+            os.unlink(self.ring.popleft())
+        if outcome in self.service.persist_on:
+            self._persist(outcome)
+
+    def _persist(self, outcome: str):
+        incident = os.path.join(
+            self.service.output_dir,
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{self.worker}-{self._label}-{outcome}",
+        )
+        os.makedirs(incident, exist_ok=True)
+        while self.ring:
+            path = self.ring.popleft()
+            shutil.move(path, os.path.join(incident, os.path.basename(path)))
+        self.service.persisted += 1
+        logging.warning(
+            f"🧾 Saved traces for {self._label} ({outcome}) to {incident}; "
+            f"open with: playwright show-trace <file>"
+        )